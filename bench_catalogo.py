@@ -0,0 +1,69 @@
+# bench_catalogo.py
+"""
+Compara memoria y latencia del catálogo columnar (catalogo.py) con el
+DataFrame de pandas que usaba antes el bot.
+
+    python bench_catalogo.py --csv movies_clean.csv --repetir 10
+"""
+import argparse
+import random
+import time
+import pandas as pd
+from catalogo import Catalogo
+
+
+def medir_construccion(construir):
+    inicio = time.perf_counter()
+    objeto = construir()
+    return objeto, time.perf_counter() - inicio
+
+def medir_latencia(funcion, filas):
+    inicio = time.perf_counter()
+    for fila in filas:
+        funcion(fila)
+    return (time.perf_counter() - inicio) / len(filas) * 1e6
+
+def tarjeta_df(df, fila):
+    item = df.iloc[fila]
+    return f"{item['title']} ({item['year']}) {item['type']} {item['platform']} {item['rating']} {item['genre']}"
+
+def tarjeta_catalogo(catalogo, fila):
+    item = catalogo[fila]
+    return f"{item['title']} ({item['year']}) {item['type']} {item['platform']} {item['rating']} {item['genre']}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DataFrame vs catálogo columnar")
+    parser.add_argument("--csv", default="movies_clean.csv")
+    parser.add_argument("--repetir", type=int, default=1, help="Replica el CSV para simular catálogos más grandes")
+    parser.add_argument("--consultas", type=int, default=20000)
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.csv)
+    if args.repetir > 1:
+        base = pd.concat([base] * args.repetir, ignore_index=True)
+    csv_texto = base.to_csv(index=False)
+    del base
+
+    def construir_df():
+        from io import StringIO
+        return pd.read_csv(StringIO(csv_texto))
+
+    df, df_segundos = medir_construccion(construir_df)
+    catalogo, cat_segundos = medir_construccion(lambda: Catalogo.desde_dataframe(df))
+
+    filas = [random.randrange(len(df)) for _ in range(args.consultas)]
+    lat_df = medir_latencia(lambda f: tarjeta_df(df, f), filas)
+    lat_cat = medir_latencia(lambda f: tarjeta_catalogo(catalogo, f), filas)
+
+    df_bytes = df.memory_usage(deep=True).sum()
+    cat_bytes = catalogo.nbytes()
+
+    print(f"📊 Registros: {len(df)}")
+    print("(la construcción del catálogo parte del DataFrame ya leído)")
+    print(f"{'':22}{'DataFrame':>14}{'Catálogo':>14}")
+    print(f"{'Memoria':22}{df_bytes / 1e6:>12.2f}MB{cat_bytes / 1e6:>12.2f}MB")
+    print(f"{'Construcción':22}{df_segundos * 1e3:>12.1f}ms{cat_segundos * 1e3:>12.1f}ms")
+    print(f"{'Tarjeta por fila':22}{lat_df:>12.1f}µs{lat_cat:>12.1f}µs")
+
+if __name__ == "__main__":
+    main()
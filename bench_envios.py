@@ -0,0 +1,83 @@
+# bench_envios.py
+"""
+Ráfaga de envíos contra la API de Telegram falsa (fake_telegram.py), con y
+sin el planificador de envios.py.
+
+    python bench_envios.py --usuarios 200 --ediciones 3
+
+Cada usuario simula lo que provoca un toque en un botón: responde al
+callback, edita varias veces el mismo mensaje (el bot navegando rápido) y
+manda un mensaje nuevo, todo a la vez que el resto de usuarios. Informa
+del tiempo total, las llamadas que acabaron en error 429, las ediciones
+fusionadas y el retraso p50/p95 en la cola del planificador.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+from telegram.request import HTTPXRequest
+import fake_telegram
+from envios import PlanificadorEnvios
+
+
+async def usuario(bot, chat_id, ediciones):
+    errores = 0
+    llamadas = [bot.answer_callback_query(f"q{chat_id}")]
+    llamadas += [bot.edit_message_text(f"Página {i}", chat_id=chat_id, message_id=1) for i in range(ediciones)]
+    llamadas.append(bot.send_message(chat_id, "🎬 Nuevo mensaje"))
+    for resultado in await asyncio.gather(*llamadas, return_exceptions=True):
+        if isinstance(resultado, RetryAfter):
+            errores += 1
+        elif isinstance(resultado, Exception):
+            raise resultado
+    return errores
+
+async def rafaga(puerto, usuarios, ediciones, planificador):
+    bot = ExtBot(
+        "123:falso",
+        base_url=f"http://127.0.0.1:{puerto}/bot",
+        request=HTTPXRequest(connection_pool_size=64, pool_timeout=60, read_timeout=60, write_timeout=60),
+        rate_limiter=planificador,
+    )
+    async with bot:
+        inicio = time.perf_counter()
+        errores = await asyncio.gather(*(usuario(bot, 1000 + u, ediciones) for u in range(usuarios)))
+        return time.perf_counter() - inicio, sum(errores)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ráfaga de envíos contra la API de Telegram falsa")
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--ediciones", type=int, default=3, help="Ediciones seguidas del mismo mensaje por usuario")
+    parser.add_argument("--puerto", type=int, default=8766)
+    parser.add_argument("--por-segundo", type=float, default=30)
+    parser.add_argument("--por-chat", type=float, default=1.0)
+    args = parser.parse_args()
+
+    llamadas = args.usuarios * (args.ediciones + 2)
+    print(f"📨 {args.usuarios} usuarios · {llamadas} llamadas · límite {args.por_segundo:g}/s global, "
+          f"{args.por_chat:g}/s por chat")
+    print(f"{'Modo':18}{'Tiempo':>10}{'Errores 429':>14}{'429 recibidos':>15}{'Fusionadas':>12}{'p50':>9}{'p95':>9}")
+
+    for nombre in ("sin planificador", "con planificador"):
+        srv = fake_telegram.crear_servidor(args.puerto, args.por_segundo, args.por_chat)
+        hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+        hilo.start()
+        planificador = PlanificadorEnvios(args.por_segundo, args.por_chat) if nombre == "con planificador" else None
+        try:
+            tiempo, errores = asyncio.run(rafaga(args.puerto, args.usuarios, args.ediciones, planificador))
+        finally:
+            srv.shutdown()
+            srv.server_close()
+
+        recibidos = srv.estadisticas()["respuestas_429"]
+        if planificador:
+            e = planificador.estadisticas()
+            extra = f"{e['fusionadas']:>12}{e['retraso_p50']:>8.2f}s{e['retraso_p95']:>8.2f}s"
+        else:
+            extra = f"{'-':>12}{'-':>9}{'-':>9}"
+        print(f"{nombre:18}{tiempo:>9.2f}s{errores:>14}{recibidos:>15}{extra}")
+
+if __name__ == "__main__":
+    main()
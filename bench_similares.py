@@ -0,0 +1,117 @@
+# bench_similares.py
+"""
+Calidad y latencia de "Ver similares" con distintas configuraciones de
+vectores (ver vectores.py).
+
+    python bench_similares.py --csv movies_clean.csv --consultas 500 --k 10
+    python bench_similares.py --pesos "titulo:1,sinopsis:0.3" --pesos "titulo:1,genero:1"
+
+Para cada configuración mide:
+- construcción: tiempo de ajustar los vectores sobre el catálogo ya leído
+- acierto por género: fracción del top-k que comparte algún género con el título consultado
+- Jaccard de géneros medio entre el título y sus recomendaciones
+- latencia p50/p95 de recomendar_por_indice (el cálculo al vuelo de "Ver similares")
+
+Con peso de género mayor que 0 el acierto por género mide en parte lo que
+el propio bloque favorece: compáralo con las configuraciones de solo texto.
+
+Con --backends compara además los backends de similitud (similitud.py)
+sobre los vectores por defecto: construcción, memoria extra, recall@k
+frente al exacto y latencia p50/p95.
+
+    python bench_similares.py --backends exacto,ivf --listas 256 --sondeos 16
+"""
+import argparse
+import random
+import time
+import numpy as np
+import pandas as pd
+import similitud
+import utils_db
+from catalogo import Catalogo
+from vectores import VectorizadorMultiCampo, leer_pesos, partir_valores
+
+CONFIGURACIONES = {
+    "solo título": "titulo:1,sinopsis:0,genero:0,plataforma:0",
+    "título + sinopsis": "titulo:1,sinopsis:0.5,genero:0,plataforma:0",
+    "completo (por defecto)": "",
+}
+
+
+def generos_por_fila(catalogo):
+    por_categoria = [frozenset(partir_valores(valor)) for valor in catalogo.generos]
+    return [por_categoria[c] for c in catalogo.genero_codigos]
+
+def evaluar(catalogo, pesos, consultas, k, generos):
+    inicio = time.perf_counter()
+    vectorizador, matriz = VectorizadorMultiCampo.ajustar(catalogo, pesos, utils_db.obtener_stopwords())
+    construccion = time.perf_counter() - inicio
+
+    estado = utils_db.EstadoCatalogo(catalogo, matriz, vectorizador, None, "bench")
+    aciertos, jaccard, latencias = [], [], []
+    for fila in consultas:
+        inicio = time.perf_counter()
+        vecinos = utils_db.recomendar_por_indice(fila, k, actual=estado)
+        latencias.append(time.perf_counter() - inicio)
+
+        propios = generos[fila]
+        if not propios or not vecinos:
+            continue
+        aciertos.append(np.mean([bool(propios & generos[v]) for v in vecinos]))
+        jaccard.append(np.mean([len(propios & generos[v]) / len(propios | generos[v]) for v in vecinos]))
+
+    return {
+        "construccion": construccion,
+        "columnas": matriz.shape[1],
+        "acierto": float(np.mean(aciertos)) if aciertos else 0.0,
+        "jaccard": float(np.mean(jaccard)) if jaccard else 0.0,
+        "p50": float(np.percentile(latencias, 50)),
+        "p95": float(np.percentile(latencias, 95)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de calidad/latencia de los vectores de similitud")
+    parser.add_argument("--csv", default="movies_clean.csv")
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pesos", action="append",
+                        help="Configuración a evaluar (se puede repetir); por defecto solo título, título + sinopsis y completo")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--backends", help="Backends de similitud a comparar, p. ej. exacto,ivf")
+    parser.add_argument("--listas", type=int, default=None, help="Listas del backend ivf (por defecto √n)")
+    parser.add_argument("--sondeos", type=int, default=16, help="Listas que revisa cada consulta del backend ivf")
+    args = parser.parse_args()
+
+    catalogo = Catalogo.desde_dataframe(pd.read_csv(args.csv))
+    generos = generos_por_fila(catalogo)
+    random.seed(args.semilla)
+    consultas = random.sample(range(len(catalogo)), min(args.consultas, len(catalogo)))
+    configuraciones = {p: p for p in args.pesos} if args.pesos else CONFIGURACIONES
+
+    print(f"📊 Registros: {len(catalogo)} · consultas: {len(consultas)} · top-{args.k}")
+    print(f"{'Configuración':40}{'Columnas':>10}{'Construcción':>14}{'Acierto':>10}{'Jaccard':>10}{'p50':>10}{'p95':>10}")
+    for nombre, texto in configuraciones.items():
+        pesos = leer_pesos(texto)
+        r = evaluar(catalogo, pesos, consultas, args.k, generos)
+        print(f"{nombre[:39]:40}{r['columnas']:>10}{r['construccion'] * 1e3:>12.0f}ms"
+              f"{r['acierto']:>10.1%}{r['jaccard']:>10.2f}{r['p50'] * 1e3:>8.2f}ms{r['p95'] * 1e3:>8.2f}ms")
+
+    if args.backends:
+        comparar_backends(catalogo, args.backends.split(","), consultas, args.k, args.listas, args.sondeos)
+
+def comparar_backends(catalogo, nombres, consultas, k, listas, sondeos):
+    _, matriz = VectorizadorMultiCampo.ajustar(catalogo, leer_pesos(""), utils_db.obtener_stopwords())
+    referencia = similitud.BackendExacto(matriz)
+
+    print(f"\n{'Backend':12}{'Construcción':>14}{'Memoria':>12}{'Recall@' + str(k):>12}{'p50':>10}{'p95':>10}")
+    for nombre in nombres:
+        opciones = {"listas": listas, "sondeos": sondeos} if nombre == "ivf" else {}
+        inicio = time.perf_counter()
+        backend = similitud.crear_backend(nombre, matriz, **opciones)
+        construccion = time.perf_counter() - inicio
+        r = similitud.medir(backend, referencia, consultas, k)
+        print(f"{nombre:12}{construccion * 1e3:>12.0f}ms{r['memoria'] / 1e6:>10.1f}MB{r['recall']:>12.1%}"
+              f"{r['p50'] * 1e3:>8.2f}ms{r['p95'] * 1e3:>8.2f}ms")
+
+if __name__ == "__main__":
+    main()
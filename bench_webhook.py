@@ -0,0 +1,153 @@
+# bench_webhook.py
+"""
+Arnés del modo webhook: arranca `bot.py --webhook` contra la API de
+Telegram falsa (fake_telegram.py), le manda updates sintéticos por HTTP y
+mide cuánto tarda en responderlos todos con 1 y con N workers, y con los
+updates de cada worker procesados de uno en uno o en paralelo
+(UPDATES_CONCURRENTES).
+
+    python bench_webhook.py --workers 1,4 --concurrentes 1,256 --latencia-api 20
+
+Ejecútalo desde la carpeta del catálogo (movies_clean.csv o el snapshot de
+CATALOGO_SNAPSHOT). Cada update es un toque en un botón (género, detalles,
+similares, sorpréndeme) de uno de los usuarios; se da por respondido cuando
+el bot edita el mensaje. Al final se manda SIGTERM y se comprueba que la
+parada es ordenada (todos los updates respondidos y salida con código 0).
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import httpx
+import fake_telegram
+
+BOTONES = ["genre_Drama", "genre_Comedia", "genre_Acción", "random", "details_{fila}", "similar_{fila}"]
+
+
+def update_sintetico(update_id, user_id, datos):
+    usuario = {"id": user_id, "is_bot": False, "first_name": f"Usuario {user_id}"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": f"q{update_id}",
+            "from": usuario,
+            "chat_instance": str(user_id),
+            "data": datos,
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "CineClass"},
+                "text": "menú",
+            },
+        },
+    }
+
+def generar_updates(n, usuarios, filas, semilla=0):
+    rnd = random.Random(semilla)
+    return [
+        update_sintetico(i + 1, 1000 + rnd.randrange(usuarios),
+                         rnd.choice(BOTONES).format(fila=rnd.randrange(filas)))
+        for i in range(n)
+    ]
+
+async def esperar_listos(url, workers, limite=120.0):
+    async with httpx.AsyncClient() as cliente:
+        fin = time.monotonic() + limite
+        while time.monotonic() < fin:
+            try:
+                estado = (await cliente.get(f"{url}/salud")).json()
+                if estado["listos"] >= workers:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError("Los workers no arrancaron a tiempo")
+
+async def enviar(url, updates, concurrencia=64):
+    limite = asyncio.Semaphore(concurrencia)
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrencia)) as cliente:
+        async def uno(update):
+            async with limite:
+                respuesta = await cliente.post(f"{url}/webhook", json=update)
+                respuesta.raise_for_status()
+        await asyncio.gather(*(uno(u) for u in updates))
+
+def ediciones(srv):
+    return srv.estadisticas()["peticiones"].get("editMessageText", 0)
+
+def ejecutar(workers, concurrentes, updates, puerto_api, puerto_bot, historial, latencia_api=0.0):
+    srv = fake_telegram.crear_servidor(puerto_api, por_segundo=1e9, por_chat=1e9, rafaga_chat=10**9,
+                                       latencia=latencia_api)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    entorno = {
+        **os.environ,
+        "TELEGRAM_TOKEN": "123:falso",
+        "GROQ_API_KEY": "falsa",
+        "TELEGRAM_BASE_URL": f"http://127.0.0.1:{puerto_api}/bot",
+        "ENVIOS_POR_SEGUNDO": "1e9",
+        "ENVIOS_POR_CHAT": "1e9",
+        "ENVIOS_RAFAGA_CHAT": "1000000000",
+        "RECARGA_INTERVALO": "0",
+        "UPDATES_CONCURRENTES": str(concurrentes),
+        "HISTORIAL_DB": historial,
+        "ESTADO_DB": historial.replace("historial_", "estado_"),
+    }
+    bot = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+    proceso = subprocess.Popen(
+        [sys.executable, bot, "--webhook", "--workers", str(workers), "--puerto", str(puerto_bot)],
+        env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{puerto_bot}"
+    try:
+        asyncio.run(esperar_listos(url, workers))
+        inicio = time.perf_counter()
+        asyncio.run(enviar(url, updates))
+        while ediciones(srv) < len(updates):
+            time.sleep(0.01)
+        tiempo = time.perf_counter() - inicio
+
+        parada = time.perf_counter()
+        proceso.send_signal(signal.SIGTERM)
+        codigo = proceso.wait(timeout=60)
+        parada = time.perf_counter() - parada
+        return tiempo, parada, codigo
+    finally:
+        if proceso.poll() is None:
+            proceso.kill()
+        srv.shutdown()
+        srv.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Arnés de carga del modo webhook")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count()}", help="Configuraciones a comparar, p. ej. 1,4")
+    parser.add_argument("--concurrentes", default="256",
+                        help="Valores de UPDATES_CONCURRENTES a comparar, p. ej. 1,256 (1 = de uno en uno)")
+    parser.add_argument("--latencia-api", type=float, default=0.0, help="Milisegundos por llamada a la API falsa")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--filas", type=int, default=1000, help="Filas del catálogo entre las que elegir títulos")
+    parser.add_argument("--puerto-api", type=int, default=8766)
+    parser.add_argument("--puerto-bot", type=int, default=8443)
+    args = parser.parse_args()
+
+    updates = generar_updates(args.updates, args.usuarios, args.filas)
+    print(f"📨 {len(updates)} updates de {args.usuarios} usuarios")
+    print(f"{'Workers':>8}{'Concurrentes':>14}{'Tiempo':>10}{'Updates/s':>12}{'Parada':>10}{'Salida':>8}")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for workers in (int(w) for w in args.workers.split(",")):
+            for concurrentes in (int(c) for c in args.concurrentes.split(",")):
+                historial = os.path.join(carpeta, f"historial_{workers}_{concurrentes}.sqlite")
+                tiempo, parada, codigo = ejecutar(workers, concurrentes, updates, args.puerto_api, args.puerto_bot,
+                                                  historial, args.latencia_api / 1000)
+                print(f"{workers:>8}{concurrentes:>14}{tiempo:>9.2f}s{len(updates) / tiempo:>12.0f}"
+                      f"{parada:>9.2f}s{codigo:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+import time
+_inicio_arranque = time.perf_counter()
+
+import argparse
 import logging
 import random
 import os
@@ -9,32 +13,72 @@ from telegram.ext import (
     CommandHandler, 
     MessageHandler, 
     CallbackQueryHandler,
-    ConversationHandler,
     filters
 )
-from utils_db import cargar_contenido, recomendar_contenido
+from utils_db import cargar_contenido, recomendar_por_indice
 import utils_db
-import pandas as pd
-from groq import Groq
+from ia_chat import MotorChatIA, CacheRespuestas
+from recarga import RecargadorCatalogo
+from historial import HistorialUsuarios
+from personalizacion import Personalizador
+import paginacion
+import render
+import rutas
+from concurrencia import ProcesadorPorUsuario
+from envios import PlanificadorEnvios
+from estado_compartido import PersistenciaCompartida, almacen_desde_entorno
+import webhook
+import metricas
 
 # Cargar variables de entorno
 load_dotenv()
 
+TIEMPO_IMPORTS = time.perf_counter() - _inicio_arranque
+
 # -------------------
 # Configuración
 # -------------------
 TOKEN = os.getenv("TELEGRAM_TOKEN")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL")  # p. ej. la API falsa de fake_telegram.py
 
 # Verificar que las variables se cargaron
 if not TOKEN or not GROQ_API_KEY:
     raise ValueError("❌ Falta archivo .env con TELEGRAM_TOKEN y GROQ_API_KEY")
 
-# Cliente Groq
-groq_client = Groq(api_key=GROQ_API_KEY)
+# Motor de chat con Groq (asíncrono y con concurrencia acotada)
+motor_ia = MotorChatIA(
+    api_key=GROQ_API_KEY,
+    max_concurrencia=int(os.getenv("IA_MAX_CONCURRENCIA", "4")),
+    max_cola=int(os.getenv("IA_MAX_COLA", "20")),
+    timeout=float(os.getenv("IA_TIMEOUT", "20")),
+    cache=CacheRespuestas(
+        max_entradas=int(os.getenv("IA_CACHE_TAMANO", "512")),
+        ttl=float(os.getenv("IA_CACHE_TTL", "600"))
+    )
+)
+
+# Recarga del catálogo en caliente: /recargar (solo admins) y vigilancia de archivos
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if i}
+RECARGA_INTERVALO = float(os.getenv("RECARGA_INTERVALO", "60"))  # 0 desactiva la vigilancia
+recargador = None
 
-# Estados de conversación
-CHOOSING_TYPE, CHOOSING_GENRE, CHOOSING_PLATFORM = range(3)
+# Planificador de envíos: límites de Telegram por chat y globales, con prioridades.
+# En modo webhook el límite global se reparte entre los ENVIOS_PROCESOS workers.
+planificador_envios = PlanificadorEnvios(
+    por_segundo=float(os.getenv("ENVIOS_POR_SEGUNDO", "30")) / int(os.getenv("ENVIOS_PROCESOS", "1")),
+    por_chat=float(os.getenv("ENVIOS_POR_CHAT", "1")),
+    rafaga_chat=int(os.getenv("ENVIOS_RAFAGA_CHAT", "3")),
+    max_reintentos=int(os.getenv("ENVIOS_REINTENTOS", "3"))
+)
+
+# Updates de usuarios distintos en paralelo (los de cada usuario, en orden); 1 = de uno en uno
+UPDATES_CONCURRENTES = int(os.getenv("UPDATES_CONCURRENTES", "256"))
+procesador_updates = ProcesadorPorUsuario(UPDATES_CONCURRENTES)
+
+# Estado de conversación (user_data) compartido entre réplicas: local, redis o memoria
+ESTADO_BACKEND = os.getenv("ESTADO_BACKEND", "local")
+persistencia = None
 
 # Logging
 logging.basicConfig(
@@ -42,8 +86,19 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-# Historial de usuarios
-user_history = {}
+# Historial de usuarios (SQLite en modo WAL, escrituras por lotes en segundo plano)
+historial = HistorialUsuarios(
+    ruta=os.getenv("HISTORIAL_DB", "historial.sqlite"),
+    max_por_usuario=int(os.getenv("HISTORIAL_MAX", "100"))
+)
+
+# Recomendaciones "Para ti" a partir del historial
+personalizador = Personalizador(historial)
+
+# Paginación de "Ver más" con cursores en el callback_data
+paginador = paginacion.Paginador()
+TAMANO_PAGINA_GENERO = 20
+TAMANO_PAGINA_FILTRO = 15
 
 # Lista de géneros disponibles
 GENRES = [
@@ -53,68 +108,37 @@ GENRES = [
     "Suspenso", "Bélica", "Western"
 ]
 
+# Menús estáticos construidos una vez y fichas/botones por fila en una LRU
+MENU_GENEROS = render.menu_generos(GENRES)
+cache_render = render.CacheRender(max_entradas=int(os.getenv("RENDER_CACHE_TAMANO", "4096")))
+
+# Métricas Prometheus en GET /metrics (0 lo desactiva; en modo webhook, un puerto por worker)
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", "9464"))
+METRICAS_HOST = os.getenv("METRICAS_HOST", "127.0.0.1")
+HANDLERS = metricas.Histograma("cineclass_handler_segundos", "Duración de cada handler", ("handler",))
+HANDLERS_ERRORES = metricas.Contador("cineclass_handler_errores_total", "Excepciones en los handlers",
+                                     ("handler", "clase"))
+
+def medido(handler):
+    """El handler con su duración y sus errores en las métricas"""
+    return metricas.medir(HANDLERS, errores=HANDLERS_ERRORES)(handler)
+
 # -------------------
 # Función de IA con Groq
 # -------------------
-def chat_with_ai(user_message, conversation_history=None):
-    """Chat con IA usando Groq (100% GRATIS)"""
-    try:
-        messages = [
-            {
-                "role": "system",
-                "content": """Eres CineClass Bot, un asistente amigable y experto en películas y series.
-                Tu trabajo es ayudar a los usuarios a encontrar contenido para ver y mantener 
-                conversaciones entretenidas sobre cine y TV. Sé conciso (máximo 3-4 líneas), 
-                amigable y usa emojis ocasionalmente. Si te preguntan sobre recomendaciones 
-                específicas de títulos, sugiere que escriban el nombre de la película/serie o 
-                usen los botones del bot para explorar."""
-            }
-        ]
-        
-        if conversation_history:
-            messages.extend(conversation_history[-10:])
-        
-        messages.append({"role": "user", "content": user_message})
-        
-        chat_completion = groq_client.chat.completions.create(
-            messages=messages,
-            model="llama-3.3-70b-versatile",  # MODELO ACTUALIZADO
-            temperature=0.7,
-            max_tokens=200,
-        )
-        
-        return chat_completion.choices[0].message.content
-        
-    except Exception as e:
-        error_msg = str(e)
-        logging.error(f"Error en Groq: {error_msg}")
-        
-        # Mensajes de error más específicos
-        if "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
-            return "🔑 Error de autenticación con la IA. El administrador necesita verificar la API key. Mientras tanto, ¿qué película o serie buscas? 🎬"
-        elif "rate_limit" in error_msg.lower():
-            return "⏰ Demasiadas consultas. Espera un momento e intenta de nuevo. Mientras, puedes buscar películas escribiendo el nombre 🎬"
-        else:
-            return "Hmm, tuve un problema técnico 🤔 Pero puedo ayudarte! Escribe el nombre de una película/serie o usa los botones para explorar 🎬"
+async def chat_with_ai(user_message, conversation_history=None):
+    """Chat con IA usando Groq (100% GRATIS), sin bloquear el event loop"""
+    return await motor_ia.responder(user_message, conversation_history)
 
 # -------------------
 # Comandos básicos
 # -------------------
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyboard = [
-        [InlineKeyboardButton("🎬 Buscar contenido", callback_data='browse_genres')],
-        [InlineKeyboardButton("🎲 Sorpréndeme", callback_data='random')],
-        [InlineKeyboardButton("📊 Filtrar por criterios", callback_data='filter')],
-        [InlineKeyboardButton("📜 Mi historial", callback_data='history')],
-        [InlineKeyboardButton("❓ Ayuda", callback_data='help')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await update.message.reply_text(
         "¡Hola! Soy CineClass Bot 🎬🤖\n\n"
         "Puedo ayudarte a encontrar películas y series perfectas para ti.\n"
         "¿Qué te gustaría hacer?",
-        reply_markup=reply_markup
+        reply_markup=render.MENU_PRINCIPAL
     )
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -132,7 +156,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 1️⃣ **Búsqueda por género**: Explora por géneros y descubre títulos
 2️⃣ **Búsqueda directa**: Escribe el nombre de una película/serie
 3️⃣ **Menú interactivo**: Usa los botones para navegar
-4️⃣ **Chat con IA**: Conversa sobre cine y TV
+4️⃣ **Para ti**: Recomendaciones según lo que has visto
+5️⃣ **Chat con IA**: Conversa sobre cine y TV
 
 **Ejemplos:**
 - Click en "Buscar contenido" → Elige género → Ve títulos → Detalles
@@ -152,52 +177,42 @@ async def browse_genres(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    if utils_db.contenido is None or utils_db.contenido.empty:
+    estado = utils_db.estado
+    if estado is None or estado.contenido.empty:
         await query.message.edit_text(
             "❌ No hay contenido cargado. Por favor, ejecuta primero el script de descarga.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🏠 Menú principal", callback_data='menu')
-            ]])
+            reply_markup=render.MENU_SOLO_INICIO
         )
         return
     
-    keyboard = []
-    for i in range(0, len(GENRES), 2):
-        row = []
-        row.append(InlineKeyboardButton(f"🎭 {GENRES[i]}", callback_data=f'genre_{GENRES[i]}'))
-        if i + 1 < len(GENRES):
-            row.append(InlineKeyboardButton(f"🎭 {GENRES[i+1]}", callback_data=f'genre_{GENRES[i+1]}'))
-        keyboard.append(row)
-    
-    keyboard.append([InlineKeyboardButton("🏠 Menú principal", callback_data='menu')])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await query.message.edit_text(
         "🎬 **Selecciona un género:**\n\n"
         "Elige el tipo de contenido que te gustaría explorar:",
-        reply_markup=reply_markup,
+        reply_markup=MENU_GENEROS,
         parse_mode='Markdown'
     )
 
-async def show_titles_by_genre(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_titles_by_genre(update: Update, context: ContextTypes.DEFAULT_TYPE, genre=None, cursor=None):
     query = update.callback_query
     await query.answer()
     
-    genre = query.data.replace('genre_', '')
-    contenido = utils_db.contenido
+    # Un único estado para todo el handler, aunque se recargue el catálogo a mitad
+    estado = utils_db.estado
     
-    if contenido is None or contenido.empty:
+    if estado is None or estado.contenido.empty:
         await query.message.edit_text(
             "❌ No hay contenido cargado.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🏠 Menú principal", callback_data='menu')
-            ]])
+            reply_markup=render.MENU_SOLO_INICIO
         )
         return
     
-    filtered = contenido[contenido['genre'].str.contains(genre, na=False, case=False)]
+    if cursor is None:
+        cursor = paginacion.nuevo_cursor("g", genre, actual=estado)
+    genre = cursor.clave
     
-    if filtered.empty:
+    pagina = paginador.pagina(cursor, TAMANO_PAGINA_GENERO, estado)
+    
+    if pagina.total == 0:
         await query.message.edit_text(
             f"No encontré contenido de {genre} 😅\n"
             "Intenta con otro género.",
@@ -207,57 +222,87 @@ async def show_titles_by_genre(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         return
     
-    sample_size = min(20, len(filtered))
-    titles = filtered.sample(n=sample_size)
-    
-    keyboard = []
-    for idx, row in titles.iterrows():
-        title_text = f"{row['title']} ({row['year']}) {'🎬' if row['type'] == 'película' else '📺'}"
-        if len(title_text) > 60:
-            title_text = title_text[:57] + "..."
-        keyboard.append([InlineKeyboardButton(
-            title_text,
-            callback_data=f'details_{idx}'
-        )])
+    keyboard = cache_render.botones_titulos(pagina.filas, estado)
     
-    keyboard.append([InlineKeyboardButton("🔄 Ver más de este género", callback_data=f'genre_{genre}')])
+    keyboard.extend(botones_paginacion(pagina, cursor, estado))
     keyboard.append([InlineKeyboardButton("« Volver a géneros", callback_data='browse_genres')])
-    keyboard.append([InlineKeyboardButton("🏠 Menú principal", callback_data='menu')])
+    keyboard.append([render.BOTON_MENU])
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     await query.message.edit_text(
         f"🎭 **Género: {genre}**\n\n"
-        f"📊 Encontré {len(filtered)} títulos. Aquí hay {sample_size}:\n"
+        f"📊 Encontré {pagina.total} títulos. {rango_pagina(pagina, cursor)}:\n"
         f"👇 Selecciona uno para ver detalles:",
         reply_markup=reply_markup,
         parse_mode='Markdown'
     )
 
-async def show_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
+def botones_paginacion(pagina, cursor, estado):
+    """Filas de botones para moverse por la lista y cambiar su orden"""
+    navegacion = []
+    if pagina.anterior:
+        navegacion.append(InlineKeyboardButton("◀️ Anteriores", callback_data=pagina.anterior))
+    if pagina.siguiente:
+        navegacion.append(InlineKeyboardButton("🔄 Ver más", callback_data=pagina.siguiente))
+    elif pagina.anterior:
+        # Última página: se vuelve a empezar con un orden nuevo
+        reinicio = paginacion.nuevo_cursor(cursor.conjunto, cursor.clave, cursor.orden, estado)
+        navegacion.append(InlineKeyboardButton("🔁 Volver a empezar", callback_data=paginacion.codificar(reinicio)))
+    
+    if cursor.orden == paginacion.AZAR:
+        etiqueta, orden = "⭐ Mejor valorados", paginacion.NOTA
+    else:
+        etiqueta, orden = "🎲 Al azar", paginacion.AZAR
+    otro_orden = paginacion.nuevo_cursor(cursor.conjunto, cursor.clave, orden, estado)
+    
+    filas = [navegacion] if navegacion else []
+    filas.append([InlineKeyboardButton(etiqueta, callback_data=paginacion.codificar(otro_orden))])
+    return filas
+
+def rango_pagina(pagina, cursor):
+    orden = "por nota" if cursor.orden == paginacion.NOTA else "al azar"
+    return f"Aquí van del {pagina.desde + 1} al {pagina.desde + len(pagina.filas)} ({orden})"
+
+async def show_pagina(update: Update, context: ContextTypes.DEFAULT_TYPE, cursor):
+    """Página siguiente/anterior de una lista a partir del cursor del botón"""
+    if cursor.conjunto == "g":
+        await show_titles_by_genre(update, context, cursor=cursor)
+    else:
+        await show_filtered_results(update, context, cursor=cursor)
+
+async def titulo_no_disponible(query):
+    """El callback apunta a un título que ya no está en el catálogo recargado"""
+    await query.message.edit_text(
+        "🔄 El catálogo se ha actualizado y ese título ya no está disponible.\n"
+        "Búscalo de nuevo o explora otros géneros.",
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("🎬 Buscar contenido", callback_data='browse_genres')],
+            [render.BOTON_MENU]
+        ])
+    )
+
+async def show_details(update: Update, context: ContextTypes.DEFAULT_TYPE, ref):
     query = update.callback_query
     await query.answer()
     
-    idx = int(query.data.replace('details_', ''))
-    contenido = utils_db.contenido
+    estado = utils_db.estado
     
-    if contenido is None:
+    if estado is None:
         await query.message.edit_text("Error: No hay contenido cargado")
         return
-        
-    item = contenido.iloc[idx]
-    emoji = "🎬" if item['type'] == 'película' else "📺"
     
-    mensaje = f"{emoji} **{item['title']}** ({item['year']})\n\n"
-    mensaje += f"🎯 **Disponible en:**\n"
-    mensaje += f"➤ {item['platform']}\n\n"
-    mensaje += f"⭐ Calificación: {item['rating']}/10\n"
-    mensaje += f"🎭 Género: {item['genre']}"
+    idx = utils_db.resolver_referencia(ref, estado)
+    if idx is None:
+        await titulo_no_disponible(query)
+        return
+        
+    mensaje = cache_render.ficha(idx, estado)
     
     keyboard = [
-        [InlineKeyboardButton("🔍 Ver similares", callback_data=f"similar_{idx}")],
+        [InlineKeyboardButton("🔍 Ver similares", callback_data=f"similar_{utils_db.referencia_fila(idx, estado)}")],
         [InlineKeyboardButton("« Volver a la lista", callback_data='browse_genres')],
-        [InlineKeyboardButton("🏠 Menú principal", callback_data='menu')]
+        [render.BOTON_MENU]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
@@ -267,58 +312,35 @@ async def show_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown'
     )
     
-    user_id = update.effective_user.id
-    if user_id not in user_history:
-        user_history[user_id] = []
-    user_history[user_id].append(item['title'])
+    personalizador.registrar_vista(update.effective_user.id, idx, estado)
 
-async def show_similar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_similar(update: Update, context: ContextTypes.DEFAULT_TYPE, ref):
     query = update.callback_query
     await query.answer()
     
-    idx = int(query.data.replace('similar_', ''))
-    contenido = utils_db.contenido
+    estado = utils_db.estado
     
-    if contenido is None:
+    if estado is None:
         await query.message.edit_text("Error: No hay contenido cargado")
         return
+    
+    idx = utils_db.resolver_referencia(ref, estado)
+    if idx is None:
+        await titulo_no_disponible(query)
+        return
         
-    item = contenido.iloc[idx]
-    recomendaciones = recomendar_contenido(item['title'], top_n=15)
+    contenido = estado.contenido
+    item = contenido[idx]
+    filas = recomendar_por_indice(idx, top_n=15, actual=estado)
     
-    if not recomendaciones:
+    if not filas:
         await query.answer("No encontré recomendaciones similares 😅", show_alert=True)
         return
     
-    keyboard = []
-    for rec in recomendaciones[:15]:
-        try:
-            rec_match = contenido[contenido['title'] == rec['title']]
-            if rec_match.empty:
-                continue
-            rec_idx = rec_match.index[0]
-            
-            year = rec.get('year', 'N/A')
-            emoji = '🎬' if rec.get('type') == 'película' else '📺'
-            title_text = f"{rec['title']} ({year}) {emoji}"
-            
-            if len(title_text) > 60:
-                title_text = title_text[:57] + "..."
-            
-            keyboard.append([InlineKeyboardButton(
-                title_text,
-                callback_data=f'details_{rec_idx}'
-            )])
-        except Exception as e:
-            logging.error(f"Error procesando recomendación: {e}")
-            continue
-    
-    if not keyboard:
-        await query.answer("No pude procesar las recomendaciones 😅", show_alert=True)
-        return
+    keyboard = cache_render.botones_titulos(filas, estado)
     
-    keyboard.append([InlineKeyboardButton("« Volver", callback_data=f'details_{idx}')])
-    keyboard.append([InlineKeyboardButton("🏠 Menú principal", callback_data='menu')])
+    keyboard.append([InlineKeyboardButton("« Volver", callback_data=f'details_{utils_db.referencia_fila(idx, estado)}')])
+    keyboard.append([render.BOTON_MENU])
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
@@ -330,6 +352,44 @@ async def show_similar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown'
     )
 
+# -------------------
+# Para ti
+# -------------------
+async def show_para_ti(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    
+    estado = utils_db.estado
+    if estado is None:
+        await query.message.edit_text("Error: No hay contenido cargado")
+        return
+    
+    filas = await personalizador.recomendar(update.effective_user.id, n=10, actual=estado)
+    
+    if not filas:
+        await query.message.edit_text(
+            "✨ Todavía no sé qué te gusta.\n"
+            "Abre algunos títulos y vuelve aquí para ver recomendaciones para ti 🍿",
+            reply_markup=InlineKeyboardMarkup([
+                [InlineKeyboardButton("🎬 Buscar contenido", callback_data='browse_genres')],
+                [render.BOTON_MENU]
+            ])
+        )
+        return
+    
+    keyboard = cache_render.botones_titulos(filas, estado)
+    
+    keyboard.append([render.BOTON_MENU])
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    await query.message.edit_text(
+        "✨ **Para ti**\n\n"
+        "Basado en lo que has visto últimamente:\n"
+        "👇 Selecciona uno para ver detalles:",
+        reply_markup=reply_markup,
+        parse_mode='Markdown'
+    )
+
 # -------------------
 # Modo Sorpréndeme
 # -------------------
@@ -338,8 +398,8 @@ async def random_recommendation(update: Update, context: ContextTypes.DEFAULT_TY
     if query:
         await query.answer()
     
-    contenido = utils_db.contenido
-    if contenido is None or contenido.empty:
+    estado = utils_db.estado
+    if estado is None or estado.contenido.empty:
         msg = "No hay contenido cargado. Intenta más tarde."
         if query:
             await query.message.reply_text(msg)
@@ -347,22 +407,13 @@ async def random_recommendation(update: Update, context: ContextTypes.DEFAULT_TY
             await update.message.reply_text(msg)
         return
     
-    random_item = contenido.sample(n=1).iloc[0]
-    idx = contenido[contenido['title'] == random_item['title']].index[0]
-    
-    emoji = "🎬" if random_item['type'] == 'película' else "📺"
-    
-    mensaje = f"🎲 **Te recomiendo:**\n\n"
-    mensaje += f"{emoji} **{random_item['title']}** ({random_item['year']})\n"
-    mensaje += f"🎯 Plataforma: {random_item['platform']}\n"
-    mensaje += f"⭐ Calificación: {random_item['rating']}/10\n"
-    mensaje += f"🎭 Género: {random_item['genre']}\n\n"
-    mensaje += f"📝 {random_item['overview'][:150]}...\n"
+    idx = random.randrange(len(estado.contenido))
+    mensaje = cache_render.ficha_sorpresa(idx, estado)
     
     keyboard = [
-        [InlineKeyboardButton("📖 Ver detalles completos", callback_data=f'details_{idx}')],
+        [InlineKeyboardButton("📖 Ver detalles completos", callback_data=f'details_{utils_db.referencia_fila(idx, estado)}')],
         [InlineKeyboardButton("🎲 Otra recomendación", callback_data='random')],
-        [InlineKeyboardButton("🏠 Menú principal", callback_data='menu')]
+        [render.BOTON_MENU]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
@@ -378,98 +429,62 @@ async def start_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    keyboard = [
-        [InlineKeyboardButton("🎬 Película", callback_data='filter_type_película')],
-        [InlineKeyboardButton("📺 Serie", callback_data='filter_type_serie')],
-        [InlineKeyboardButton("🎭 Cualquiera", callback_data='filter_type_all')],
-        [InlineKeyboardButton("« Volver", callback_data='menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = render.MENU_TIPOS
     
     await query.message.edit_text(
         "¿Qué tipo de contenido buscas?",
         reply_markup=reply_markup
     )
-    return CHOOSING_TYPE
 
-async def filter_by_type(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def filter_by_type(update: Update, context: ContextTypes.DEFAULT_TYPE, content_type):
     query = update.callback_query
     await query.answer()
     
-    content_type = query.data.replace('filter_type_', '')
     context.user_data['filter_type'] = content_type
     
-    keyboard = [
-        [InlineKeyboardButton("Netflix", callback_data='filter_platform_Netflix')],
-        [InlineKeyboardButton("Disney+", callback_data='filter_platform_Disney Plus')],
-        [InlineKeyboardButton("Amazon Prime", callback_data='filter_platform_Amazon Prime Video')],
-        [InlineKeyboardButton("HBO Max", callback_data='filter_platform_HBO Max')],
-        [InlineKeyboardButton("Apple TV+", callback_data='filter_platform_Apple TV Plus')],
-        [InlineKeyboardButton("Todas", callback_data='filter_platform_all')],
-        [InlineKeyboardButton("« Volver", callback_data='filter')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = render.MENU_PLATAFORMAS
     
     await query.message.edit_text(
         "¿En qué plataforma quieres buscar?",
         reply_markup=reply_markup
     )
-    return CHOOSING_PLATFORM
 
-async def show_filtered_results(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_filtered_results(update: Update, context: ContextTypes.DEFAULT_TYPE, platform=None, cursor=None):
     query = update.callback_query
     await query.answer()
     
-    platform = query.data.replace('filter_platform_', '')
-    content_type = context.user_data.get('filter_type', 'all')
-    
-    contenido = utils_db.contenido
-    if contenido is None:
+    estado = utils_db.estado
+    if estado is None:
         await query.message.edit_text("Error: No hay contenido cargado")
         return
-        
-    filtered = contenido.copy()
-    
-    if content_type != 'all':
-        filtered = filtered[filtered['type'] == content_type]
     
-    if platform != 'all':
-        filtered = filtered[filtered['platform'].str.contains(platform, na=False)]
+    if cursor is None:
+        content_type = context.user_data.get('filter_type', 'all')
+        cursor = paginacion.nuevo_cursor("f", f"{content_type}|{platform}", actual=estado)
+        
+    pagina = paginador.pagina(cursor, TAMANO_PAGINA_FILTRO, estado)
     
-    if filtered.empty:
+    if pagina.total == 0:
         await query.message.edit_text(
             "No encontré resultados con esos filtros 😅\n"
             "Intenta con otros criterios.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🏠 Menú principal", callback_data='menu')
-            ]])
+            reply_markup=render.MENU_SOLO_INICIO
         )
-        return ConversationHandler.END
-    
-    results = filtered.sample(n=min(15, len(filtered)))
-    
-    keyboard = []
-    for idx, row in results.iterrows():
-        title_text = f"{row['title']} ({row['year']}) {'🎬' if row['type'] == 'película' else '📺'}"
-        if len(title_text) > 60:
-            title_text = title_text[:57] + "..."
-        keyboard.append([InlineKeyboardButton(
-            title_text,
-            callback_data=f'details_{idx}'
-        )])
-    
-    keyboard.append([InlineKeyboardButton("🔄 Ver más", callback_data=f'filter_platform_{platform}')])
-    keyboard.append([InlineKeyboardButton("🏠 Menú principal", callback_data='menu')])
+        return
+    
+    keyboard = cache_render.botones_titulos(pagina.filas, estado)
+    
+    keyboard.extend(botones_paginacion(pagina, cursor, estado))
+    keyboard.append([render.BOTON_MENU])
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     await query.message.edit_text(
-        f"🎯 **Encontré {len(filtered)} resultados**\n\n"
-        f"Mostrando {len(results)} títulos:\n"
+        f"🎯 **Encontré {pagina.total} resultados**\n\n"
+        f"{rango_pagina(pagina, cursor)}:\n"
         f"👇 Selecciona uno para ver detalles:",
         reply_markup=reply_markup,
         parse_mode='Markdown'
     )
-    return ConversationHandler.END
 
 # -------------------
 # Historial
@@ -479,26 +494,21 @@ async def show_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     
     user_id = update.effective_user.id
-    history = user_history.get(user_id, [])
+    history = await historial.ultimos(user_id, 10)
     
     if not history:
         await query.message.edit_text(
             "📜 Aún no has buscado nada.\n"
             "¡Empieza a explorar contenido! 🍿",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🏠 Menú principal", callback_data='menu')
-            ]])
+            reply_markup=render.MENU_SOLO_INICIO
         )
         return
     
     mensaje = "📜 **Tu historial de búsquedas:**\n\n"
-    for item in history[-10:]:
+    for item in history:
         mensaje += f"• {item}\n"
     
-    keyboard = [[InlineKeyboardButton("🏠 Menú principal", callback_data='menu')]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.message.edit_text(mensaje, reply_markup=reply_markup, parse_mode='Markdown')
+    await query.message.edit_text(mensaje, reply_markup=render.MENU_SOLO_INICIO, parse_mode='Markdown')
 
 # -------------------
 # Manejo de mensajes (Chat con IA)
@@ -508,8 +518,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     texto_lower = texto.lower()
     user_id = update.effective_user.id
     
-    contenido = utils_db.contenido
-    if contenido is None:
+    estado = utils_db.estado
+    if estado is None:
         await update.message.reply_text("Error: No hay contenido cargado")
         return
     
@@ -533,36 +543,29 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     if not es_conversacion and len(texto) > 2:
-        matches = contenido[contenido['title'].str.lower().str.contains(texto_lower, na=False, case=False)]
+        matches = utils_db.buscar_titulos(texto, limite=6, actual=estado)
         
-        if not matches.empty:
-            item = matches.iloc[0]
-            idx = matches.index[0]
+        if matches:
+            idx = matches[0]
             
-            if user_id not in user_history:
-                user_history[user_id] = []
-            user_history[user_id].append(item['title'])
+            personalizador.registrar_vista(user_id, idx, estado)
             
-            emoji = "🎬" if item['type'] == 'película' else "📺"
-            mensaje = f"{emoji} **{item['title']}** ({item['year']})\n\n"
-            mensaje += f"🎯 **Disponible en:**\n➤ {item['platform']}\n\n"
-            mensaje += f"⭐ Calificación: {item['rating']}/10\n"
-            mensaje += f"🎭 Género: {item['genre']}"
+            mensaje = cache_render.ficha(idx, estado)
+            
+            keyboard = [[InlineKeyboardButton("🔍 Ver similares", callback_data=f"similar_{utils_db.referencia_fila(idx, estado)}")]]
             
             if len(matches) > 1:
-                mensaje += f"\n\n💡 *Encontré {len(matches)} resultados. Mostrando el primero.*"
+                mensaje += "\n\n💡 *También puede que busques:*"
+                keyboard.extend(cache_render.botones_titulos(matches[1:], estado))
             
-            keyboard = [
-                [InlineKeyboardButton("🔍 Ver similares", callback_data=f"similar_{idx}")],
-                [InlineKeyboardButton("🎬 Buscar contenido", callback_data='browse_genres')],
-                [InlineKeyboardButton("🏠 Menú principal", callback_data='menu')]
-            ]
+            keyboard.append([InlineKeyboardButton("🎬 Buscar contenido", callback_data='browse_genres')])
+            keyboard.append([render.BOTON_MENU])
             reply_markup = InlineKeyboardMarkup(keyboard)
             
             await update.message.reply_text(mensaje, reply_markup=reply_markup, parse_mode='Markdown')
             return
     
-    ai_response = chat_with_ai(texto, context.user_data['ai_conversation'])
+    ai_response = await chat_with_ai(texto, context.user_data['ai_conversation'])
     
     context.user_data['ai_conversation'].append({"role": "user", "content": texto})
     context.user_data['ai_conversation'].append({"role": "assistant", "content": ai_response})
@@ -573,81 +576,235 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     keyboard = [
         [InlineKeyboardButton("🎬 Buscar por géneros", callback_data='browse_genres')],
         [InlineKeyboardButton("🎲 Sorpréndeme", callback_data='random')],
-        [InlineKeyboardButton("🏠 Menú principal", callback_data='menu')]
+        [render.BOTON_MENU]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     await update.message.reply_text(ai_response, reply_markup=reply_markup)
 
 # -------------------
-# Callbacks
+# Recarga del catálogo
 # -------------------
-async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
-    
-    if query.data == 'menu':
-        await query.answer()
-        keyboard = [
-            [InlineKeyboardButton("🎬 Buscar contenido", callback_data='browse_genres')],
-            [InlineKeyboardButton("🎲 Sorpréndeme", callback_data='random')],
-            [InlineKeyboardButton("📊 Filtrar por criterios", callback_data='filter')],
-            [InlineKeyboardButton("📜 Mi historial", callback_data='history')],
-            [InlineKeyboardButton("❓ Ayuda", callback_data='help')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.edit_text("¿Qué te gustaría hacer?", reply_markup=reply_markup)
-    
-    elif query.data == 'browse_genres':
-        await browse_genres(update, context)
-    
-    elif query.data.startswith('genre_'):
-        await show_titles_by_genre(update, context)
-    
-    elif query.data.startswith('details_'):
-        await show_details(update, context)
-    
-    elif query.data.startswith('similar_'):
-        await show_similar(update, context)
-    
-    elif query.data == 'random':
-        await random_recommendation(update, context)
-    
-    elif query.data == 'filter':
-        await start_filter(update, context)
+async def reload_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("⛔ Este comando es solo para administradores.")
+        return
     
-    elif query.data == 'history':
-        await show_history(update, context)
+    await update.message.reply_text("🔄 Recargando catálogo en segundo plano...")
+    try:
+        nuevo = await recargador.recargar(forzar=True)
+    except Exception as e:
+        logging.exception("Error en /recargar")
+        await update.message.reply_text(f"❌ No se pudo recargar, sigo con el catálogo anterior: {e}")
+        return
     
-    elif query.data == 'help':
-        await help_command(update, context)
+    if nuevo is None:
+        await update.message.reply_text("⏳ Ya hay una recarga en curso.")
+    else:
+        await update.message.reply_text(
+            f"✅ Catálogo recargado: {len(nuevo.contenido)} títulos (generación {nuevo.generacion})."
+        )
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Tasas de acierto de las cachés en memoria (solo admins)"""
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("⛔ Este comando es solo para administradores.")
+        return
     
-    elif query.data.startswith('like_'):
-        title = query.data.replace('like_', '')
-        await query.answer(f"¡Genial! Me alegra que te guste {title} 👍")
+    caches = {
+        "Render": cache_render.estadisticas(),
+        "Para ti": personalizador.estadisticas(),
+        "IA": motor_ia.cache.estadisticas() if motor_ia.cache else None,
+    }
+    lineas = ["📊 Cachés:"]
+    for nombre, stats in caches.items():
+        if stats:
+            lineas.append(f"• {nombre}: {stats['hit_rate']:.1%} de aciertos ({stats['hits']} hits, {stats['misses']} misses)")
+    
+    envios = planificador_envios.estadisticas()
+    lineas.append(
+        f"\n📨 Envíos: {sum(envios['enviados'].values())} enviados, {envios['en_cola']} en cola "
+        f"(máx. {envios['max_en_cola']}), retraso p50 {envios['retraso_p50'] * 1000:.0f}ms / "
+        f"p95 {envios['retraso_p95'] * 1000:.0f}ms, {envios['fusionadas']} ediciones fusionadas, "
+        f"{envios['respuestas_429']} respuestas 429"
+    )
+    updates = procesador_updates.estadisticas()
+    lineas.append(
+        f"\n⚙️ Updates: {updates['procesados']} procesados, {updates['en_curso']} en curso "
+        f"(máx. {updates['max_en_curso']} de {UPDATES_CONCURRENTES}), {updates['esperando_turno']} esperando "
+        f"su turno (máx. {updates['max_esperando_turno']}), {button_callback.invalidos} botones inválidos"
+    )
+    if persistencia is not None:
+        estado = persistencia.estadisticas()
+        lineas.append(
+            f"\n🗂️ Estado ({ESTADO_BACKEND}): {estado['hit_rate']:.1%} de lecturas desde caché "
+            f"({estado['hits']} hits, {estado['misses']} misses), {estado['escrituras']} escrituras "
+            f"en {estado['lotes']} lotes, {estado['errores']} errores"
+        )
+    await update.message.reply_text("\n".join(lineas))
+
+async def iniciar_servicios(app):
+    """post_init: vigilancia del catálogo y endpoint de métricas"""
+    if RECARGA_INTERVALO > 0:
+        app.create_task(recargador.vigilar(RECARGA_INTERVALO))
+    if METRICAS_PUERTO:
+        puerto = METRICAS_PUERTO + int(os.getenv("WEBHOOK_WORKER", "0"))
+        try:
+            metricas.servir(puerto, METRICAS_HOST)
+        except OSError as e:
+            logging.warning("No se pudo abrir el endpoint de métricas en el puerto %d: %s", puerto, e)
+
+# Métricas que se leen al consultar /metrics, sin coste por update
+metricas.registrar_caches({
+    "render": lambda: cache_render,
+    "para_ti": lambda: personalizador,
+    "ia": lambda: motor_ia.cache,
+    "estado": lambda: persistencia,
+})
+metricas.Calculada("cineclass_updates_en_curso", "Updates procesándose ahora", "gauge", (),
+                   lambda: {(): procesador_updates.en_curso})
+metricas.Calculada("cineclass_updates_esperando_turno", "Updates esperando a que termine otro del mismo usuario",
+                   "gauge", (), lambda: {(): procesador_updates.esperando_turno})
+metricas.Calculada("cineclass_envios_en_cola", "Llamadas a Telegram esperando turno en el planificador", "gauge", (),
+                   lambda: {(): planificador_envios.en_cola})
+metricas.Calculada("cineclass_botones_invalidos_total", "Botones con callback_data inválido", "counter", (),
+                   lambda: {(): button_callback.invalidos})
+
+async def cerrar_historial(app):
+    # Vuelca las vistas pendientes antes de salir
+    historial.cerrar()
+
+# -------------------
+# Callbacks
+# -------------------
+async def show_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    await query.message.edit_text("¿Qué te gustaría hacer?", reply_markup=render.MENU_PRINCIPAL)
+
+async def like_title(update: Update, context: ContextTypes.DEFAULT_TYPE, title):
+    await update.callback_query.answer(f"¡Genial! Me alegra que te guste {title} 👍")
+
+# Tabla de rutas de los botones: callback_data → handler con el payload ya parseado
+button_callback = rutas.Enrutador()
+button_callback.exacta('menu', medido(show_menu))
+button_callback.exacta('browse_genres', medido(browse_genres))
+button_callback.exacta('para_ti', medido(show_para_ti))
+button_callback.exacta('random', medido(random_recommendation))
+button_callback.exacta('filter', medido(start_filter))
+button_callback.exacta('history', medido(show_history))
+button_callback.exacta('help', medido(help_command))
+button_callback.prefijo('genre_', medido(show_titles_by_genre), paginacion.clave_paginable("g"))
+button_callback.prefijo(paginacion.PREFIJO, medido(show_pagina), paginacion.parsear)
+button_callback.prefijo('details_', medido(show_details), utils_db.parsear_referencia)
+button_callback.prefijo('similar_', medido(show_similar), utils_db.parsear_referencia)
+button_callback.prefijo('filter_type_', medido(filter_by_type), rutas.opcion('película', 'serie', 'all'))
+button_callback.prefijo('filter_platform_', medido(show_filtered_results), paginacion.clave_paginable("f", "película|"))
+button_callback.prefijo('like_', medido(like_title))
+
+# -------------------
+# Informe de arranque
+# -------------------
+def informe_arranque():
+    """Desglose del tiempo de arranque: imports, lectura del catálogo e índices"""
+    fases = {"imports": TIEMPO_IMPORTS, **utils_db.tiempos_carga}
+    total = time.perf_counter() - _inicio_arranque
+    detalle = " · ".join(f"{fase} {segundos * 1000:.0f}ms" for fase, segundos in fases.items())
+    return f"⏱️ Arranque en {total * 1000:.0f}ms ({detalle})"
 
 # -------------------
 # Main
 # -------------------
-if __name__ == "__main__":
-    cargar_contenido("movies_clean.csv")
-    
-    app = ApplicationBuilder().token(TOKEN).build()
-    
-    filter_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(start_filter, pattern='^filter$')],
-        states={
-            CHOOSING_TYPE: [CallbackQueryHandler(filter_by_type, pattern='^filter_type_')],
-            CHOOSING_PLATFORM: [CallbackQueryHandler(show_filtered_results, pattern='^filter_platform_')]
-        },
-        fallbacks=[CallbackQueryHandler(button_callback, pattern='^menu$')]
+def cargar_catalogo():
+    """Carga el catálogo (snapshot o CSV) y los vecinos, y prepara el recargador"""
+    global recargador
+    # El snapshot binario arranca en milisegundos; si no existe, se parsea el CSV
+    ruta_snapshot = os.getenv("CATALOGO_SNAPSHOT", "catalogo.snapshot")
+    recargador = RecargadorCatalogo("movies_clean.csv", ruta_snapshot, "vecinos.npz")
+    if os.path.isdir(ruta_snapshot):
+        utils_db.cargar_snapshot(ruta_snapshot)
+    else:
+        cargar_contenido("movies_clean.csv")
+    with utils_db.medir_fase("vecinos"):
+        utils_db.cargar_vecinos("vecinos.npz")
+    print(informe_arranque())
+
+def crear_persistencia():
+    """Persistencia del user_data según ESTADO_BACKEND (None con 'memoria')"""
+    if ESTADO_BACKEND == "memoria":
+        return None
+    almacen = almacen_desde_entorno(
+        ESTADO_BACKEND,
+        ruta=os.getenv("ESTADO_DB", "estado.sqlite"),
+        url=os.getenv("ESTADO_REDIS_URL", "redis://127.0.0.1:6379/0")
     )
-    
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("help", help_command))
-    app.add_handler(CommandHandler("random", random_recommendation))
-    app.add_handler(filter_handler)
+    return PersistenciaCompartida(
+        almacen,
+        ttl=float(os.getenv("ESTADO_CACHE_TTL", "30")),
+        intervalo=float(os.getenv("ESTADO_INTERVALO", "0.5"))
+    )
+
+def construir_app():
+    """Carga el catálogo y construye la Application con todos los handlers"""
+    global persistencia
+    cargar_catalogo()
+    persistencia = crear_persistencia()
+    
+    builder = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .rate_limiter(planificador_envios)
+        .post_init(iniciar_servicios)
+        .post_shutdown(cerrar_historial)
+    )
+    if TELEGRAM_BASE_URL:
+        builder = builder.base_url(TELEGRAM_BASE_URL)
+    if persistencia is not None:
+        builder = builder.persistence(persistencia)
+    if UPDATES_CONCURRENTES > 1:
+        builder = builder.concurrent_updates(procesador_updates)
+    app = builder.build()
+    
+    app.add_handler(CommandHandler("start", medido(start)))
+    app.add_handler(CommandHandler("help", medido(help_command)))
+    app.add_handler(CommandHandler("random", medido(random_recommendation)))
+    app.add_handler(CommandHandler("recargar", medido(reload_command)))
+    app.add_handler(CommandHandler("estadisticas", medido(stats_command)))
     app.add_handler(CallbackQueryHandler(button_callback))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    
-    print("✅ Bot CineClass iniciado correctamente. Esperando mensajes...")
-    app.run_polling()
+    # El chat con IA ya no frena a otros usuarios (procesador_updates); sin block=False
+    # sus mensajes siguen en orden con el resto de updates del mismo usuario
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, medido(handle_message)))
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CineClass Bot")
+    parser.add_argument("--webhook", action="store_true",
+                        help="Recibir updates por webhook con varios procesos en lugar de long polling")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEBHOOK_WORKERS", "0")) or None,
+                        help="Procesos worker del modo webhook (por defecto, uno por núcleo)")
+    parser.add_argument("--puerto", type=int, default=int(os.getenv("WEBHOOK_PUERTO", "8443")))
+    args = parser.parse_args()
+    
+    if args.webhook:
+        workers = args.workers or os.cpu_count() or 1
+        # Los workers abren el mismo snapshot con mmap: se genera una vez aquí si no existe
+        ruta_snapshot = os.getenv("CATALOGO_SNAPSHOT", "catalogo.snapshot")
+        if not os.path.isdir(ruta_snapshot):
+            cargar_contenido("movies_clean.csv")
+            utils_db.guardar_snapshot(ruta_snapshot)
+        os.environ["ENVIOS_PROCESOS"] = str(workers)
+        webhook.ejecutar(
+            construir_app,
+            workers=workers,
+            puerto=args.puerto,
+            ruta=os.getenv("WEBHOOK_RUTA", "/webhook"),
+            secreto=os.getenv("WEBHOOK_SECRETO") or None,
+            url=os.getenv("WEBHOOK_URL") or None,
+            token=TOKEN,
+            base_url=TELEGRAM_BASE_URL,
+            espera_cierre=float(os.getenv("WEBHOOK_ESPERA_CIERRE", "30"))
+        )
+    else:
+        app = construir_app()
+        print("✅ Bot CineClass iniciado correctamente. Esperando mensajes...")
+        app.run_polling()
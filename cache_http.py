@@ -0,0 +1,53 @@
+# cache_http.py
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+EntradaCache = namedtuple("EntradaCache", ["etag", "last_modified", "cuerpo", "guardado"])
+
+
+class CacheHTTP:
+    """
+    Caché persistente de respuestas HTTP en SQLite, indexada por URL.
+    Guarda el cuerpo junto con ETag/Last-Modified para hacer peticiones
+    condicionales: si el servidor responde 304 se reutiliza el cuerpo guardado.
+    Es segura para usarla desde varios hilos.
+    """
+
+    def __init__(self, ruta="tmdb_cache.sqlite"):
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas ("
+            " clave TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " cuerpo TEXT NOT NULL,"
+            " guardado REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT etag, last_modified, cuerpo, guardado FROM respuestas WHERE clave = ?", (clave,)
+            ).fetchone()
+        return EntradaCache(*fila) if fila else None
+
+    def guardar(self, clave, etag, last_modified, cuerpo):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, etag, last_modified, cuerpo, guardado) VALUES (?, ?, ?, ?, ?)",
+                (clave, etag, last_modified, cuerpo, time.time())
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0]
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,173 @@
+# catalogo.py
+import numpy as np
+
+CAMPOS = ('title', 'year', 'type', 'genre', 'platform', 'rating', 'overview')
+
+
+def dtype_codigos(n_categorias):
+    """El entero sin signo más pequeño capaz de indexar n categorías"""
+    if n_categorias <= np.iinfo(np.uint8).max:
+        return np.uint8
+    if n_categorias <= np.iinfo(np.uint16).max:
+        return np.uint16
+    return np.uint32
+
+
+def filas_por_codigo(codigos, n_categorias):
+    """Agrupa las filas por código categórico: lista de arrays ordenados, uno por categoría"""
+    orden = np.argsort(codigos, kind='stable').astype(np.int32)
+    limites = np.searchsorted(codigos[orden], np.arange(n_categorias + 1))
+    return [orden[limites[c]:limites[c + 1]] for c in range(n_categorias)]
+
+
+class TablaTextos:
+    """
+    Cadenas empaquetadas en un único buffer UTF-8 con un array de offsets.
+    Evita un objeto str de Python por cada celda.
+    """
+
+    __slots__ = ('datos', 'offsets')
+
+    def __init__(self, datos, offsets):
+        self.datos = datos
+        self.offsets = offsets
+
+    @classmethod
+    def desde_lista(cls, textos):
+        codificados = [str(t).encode('utf-8') for t in textos]
+        offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in codificados], out=offsets[1:])
+        datos = np.frombuffer(b''.join(codificados), dtype=np.uint8)
+        return cls(datos, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.datos[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        buffer = self.datos.tobytes()
+        offsets = self.offsets.tolist()
+        for a, b in zip(offsets, offsets[1:]):
+            yield buffer[a:b].decode('utf-8')
+
+    @property
+    def nbytes(self):
+        return self.datos.nbytes + self.offsets.nbytes
+
+
+class Registro:
+    """Vista de solo lectura de una fila del catálogo, para renderizar"""
+
+    __slots__ = ('catalogo', 'fila')
+
+    def __init__(self, catalogo, fila):
+        self.catalogo = catalogo
+        self.fila = fila
+
+    @property
+    def title(self):
+        return self.catalogo.titulos[self.fila]
+
+    @property
+    def year(self):
+        year = int(self.catalogo.years[self.fila])
+        return str(year) if year else "N/A"
+
+    @property
+    def type(self):
+        return self.catalogo.tipos[self.catalogo.tipo_codigos[self.fila]]
+
+    @property
+    def genre(self):
+        return self.catalogo.generos[self.catalogo.genero_codigos[self.fila]]
+
+    @property
+    def platform(self):
+        return self.catalogo.plataformas[self.catalogo.plataforma_codigos[self.fila]]
+
+    @property
+    def rating(self):
+        return round(float(self.catalogo.ratings[self.fila]), 1)
+
+    @property
+    def overview(self):
+        return self.catalogo.overviews[self.fila]
+
+    def __getitem__(self, campo):
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+
+class Catalogo:
+    """
+    Catálogo en columnas contiguas de NumPy:
+    - títulos y sinopsis en tablas de texto empaquetadas
+    - año (int16, 0 = N/A) y calificación (float32)
+    - tipo, género y plataforma como códigos categóricos
+    """
+
+    def __init__(self, titulos, overviews, years, ratings,
+                 tipo_codigos, tipos, genero_codigos, generos,
+                 plataforma_codigos, plataformas):
+        self.titulos = titulos
+        self.overviews = overviews
+        self.years = years
+        self.ratings = ratings
+        self.tipo_codigos = tipo_codigos
+        self.tipos = tipos
+        self.genero_codigos = genero_codigos
+        self.generos = generos
+        self.plataforma_codigos = plataforma_codigos
+        self.plataformas = plataformas
+
+    @classmethod
+    def desde_dataframe(cls, df):
+        import pandas as pd
+
+        def categorica(columna, defecto):
+            if columna not in df:
+                return np.zeros(len(df), dtype=np.uint8), [defecto]
+            codigos, categorias = pd.factorize(df[columna].fillna(defecto).astype(str))
+            return codigos.astype(dtype_codigos(len(categorias))), [str(c) for c in categorias]
+
+        years = pd.to_numeric(df['year'], errors='coerce') if 'year' in df else pd.Series(0, index=df.index)
+        ratings = pd.to_numeric(df['rating'], errors='coerce') if 'rating' in df else pd.Series(0, index=df.index)
+        overviews = df['overview'].fillna("") if 'overview' in df else [""] * len(df)
+
+        tipo_codigos, tipos = categorica('type', 'película')
+        genero_codigos, generos = categorica('genre', 'Sin género')
+        plataforma_codigos, plataformas = categorica('platform', 'Desconocida')
+
+        return cls(
+            titulos=TablaTextos.desde_lista(df['title'].fillna("")),
+            overviews=TablaTextos.desde_lista(overviews),
+            years=years.fillna(0).astype(np.int16).to_numpy(),
+            ratings=ratings.fillna(0).astype(np.float32).to_numpy(),
+            tipo_codigos=tipo_codigos, tipos=tipos,
+            genero_codigos=genero_codigos, generos=generos,
+            plataforma_codigos=plataforma_codigos, plataformas=plataformas
+        )
+
+    def __len__(self):
+        return len(self.years)
+
+    def __getitem__(self, fila):
+        if fila < 0 or fila >= len(self):
+            raise IndexError(fila)
+        return Registro(self, int(fila))
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def nbytes(self):
+        """Memoria aproximada ocupada por las columnas"""
+        total = self.titulos.nbytes + self.overviews.nbytes
+        for arr in (self.years, self.ratings, self.tipo_codigos, self.genero_codigos, self.plataforma_codigos):
+            total += arr.nbytes
+        for categorias in (self.tipos, self.generos, self.plataformas):
+            total += sum(len(c.encode('utf-8')) for c in categorias)
+        return total
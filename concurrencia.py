@@ -0,0 +1,103 @@
+# concurrencia.py
+"""
+Procesado concurrente de updates con orden por usuario.
+
+Por defecto python-telegram-bot procesa los updates de uno en uno: un
+handler lento (la IA, una edición que espera turno en envios.py) retrasa a
+todos los usuarios. ProcesadorPorUsuario, enganchado con
+ApplicationBuilder.concurrent_updates(), atiende en paralelo los updates
+de usuarios distintos y encadena los de un mismo usuario en orden de
+llegada, así que su user_data y sus menús nunca se pisan.
+
+El semáforo de la clase base se deja sin límite práctico y el límite real
+(`max_concurrentes`) se aplica después de obtener el turno del usuario: si
+no, un usuario con muchos updates en cola ocuparía plazas solo para
+esperarse a sí mismo y frenaría a los demás.
+"""
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+SIN_LIMITE = 2 ** 31 - 1
+
+
+def clave_usuario(update):
+    """user_id (o chat_id) que fija el orden del update; None si no tiene ninguno"""
+    if isinstance(update, Update):
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+    return None
+
+
+class ProcesadorPorUsuario(BaseUpdateProcessor):
+    def __init__(self, max_concurrentes=256):
+        super().__init__(SIN_LIMITE)
+        self.max_concurrentes = max_concurrentes
+        self._limite = asyncio.Semaphore(max_concurrentes)
+        self._turnos = {}  # {usuario: [Lock, updates en curso o esperando]}
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self.esperando_turno = 0
+        self.max_esperando_turno = 0
+        self.procesados = 0
+
+    async def do_process_update(self, update, coroutine):
+        clave = clave_usuario(update)
+        if clave is None:
+            await self._ejecutar(coroutine)
+            return
+
+        turno = self._turnos.get(clave)
+        if turno is None:
+            turno = self._turnos[clave] = [asyncio.Lock(), 0]
+        lock = turno[0]
+        turno[1] += 1
+        try:
+            if lock.locked():
+                self.esperando_turno += 1
+                self.max_esperando_turno = max(self.max_esperando_turno, self.esperando_turno)
+                try:
+                    await lock.acquire()
+                except asyncio.CancelledError:
+                    coroutine.close()  # cancelado antes de su turno: no llegó a empezar
+                    raise
+                finally:
+                    self.esperando_turno -= 1
+            else:
+                await lock.acquire()
+            try:
+                await self._ejecutar(coroutine)
+            finally:
+                lock.release()
+        finally:
+            turno[1] -= 1
+            if turno[1] == 0:
+                del self._turnos[clave]
+
+    async def _ejecutar(self, coroutine):
+        async with self._limite:
+            self.en_curso += 1
+            self.max_en_curso = max(self.max_en_curso, self.en_curso)
+            try:
+                await coroutine
+            finally:
+                self.en_curso -= 1
+                self.procesados += 1
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def estadisticas(self):
+        return {
+            "en_curso": self.en_curso,
+            "max_en_curso": self.max_en_curso,
+            "esperando_turno": self.esperando_turno,
+            "max_esperando_turno": self.max_esperando_turno,
+            "usuarios_activos": len(self._turnos),
+            "procesados": self.procesados,
+        }
@@ -0,0 +1,280 @@
+# envios.py
+"""
+Planificador de envíos a la API de Telegram.
+
+Se engancha como rate limiter de python-telegram-bot
+(ApplicationBuilder().rate_limiter(...)), así que todas las llamadas de
+los handlers (reply_text, edit_text, query.answer...) pasan por aquí sin
+tocarlos:
+
+- Un cubo de tokens global (Telegram admite unos 30 mensajes/s por bot)
+  y uno por chat (~1 mensaje/s con una pequeña ráfaga; 20/min en grupos).
+- Prioridades: las respuestas a botones (answerCallbackQuery) pasan
+  delante de las ediciones, y estas delante de los mensajes nuevos.
+- Las ediciones del mismo mensaje que aún esperan turno se fusionan: solo
+  se manda la última y todas las llamadas reciben su resultado.
+- Ante un 429 se respeta el retry_after en el cubo afectado y se reintenta.
+
+estadisticas() informa de la cola, el retraso hasta el envío, las
+ediciones fusionadas y los 429 recibidos; la duración de cada llamada y la
+espera en cola también se exportan a metricas.py.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+import numpy as np
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+import metricas
+
+PRIORIDAD_RESPUESTA, PRIORIDAD_EDICION, PRIORIDAD_MENSAJE = 0, 1, 2
+NOMBRES_PRIORIDAD = {PRIORIDAD_RESPUESTA: "respuestas", PRIORIDAD_EDICION: "ediciones", PRIORIDAD_MENSAJE: "mensajes"}
+
+EDICIONES = {"editMessageText", "editMessageReplyMarkup", "editMessageCaption", "editMessageMedia"}
+
+TELEGRAM_SEGUNDOS = metricas.Histograma(
+    "cineclass_telegram_segundos", "Duración de las llamadas a la API de Telegram", ("metodo",)
+)
+TELEGRAM_ESPERA = metricas.Histograma(
+    "cineclass_telegram_espera_segundos", "Espera en la cola del planificador hasta el envío", ("prioridad",)
+)
+TELEGRAM_429 = metricas.Contador("cineclass_telegram_429_total", "Respuestas 429 de Telegram", ("metodo",))
+
+
+async def _llamar(endpoint, callback, args, kwargs):
+    inicio = time.perf_counter()
+    try:
+        return await callback(*args, **kwargs)
+    finally:
+        TELEGRAM_SEGUNDOS.observar(time.perf_counter() - inicio, endpoint)
+
+def prioridad_de(endpoint):
+    """Prioridad del método de la API, o None si no cuenta para los límites (getMe, setWebhook...)"""
+    if endpoint == "answerCallbackQuery":
+        return PRIORIDAD_RESPUESTA
+    if endpoint in EDICIONES:
+        return PRIORIDAD_EDICION
+    if endpoint.startswith(("send", "copy", "forward")):
+        return PRIORIDAD_MENSAJE
+    return None
+
+def _segundos(retry_after):
+    # int en PTB 21, timedelta en versiones posteriores
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+class CuboTokens:
+    """
+    Cubo de tokens con cola de espera por prioridad: cuando hay token, lo
+    recibe el que espera con menor (prioridad, orden de llegada).
+    """
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._esperando = []  # heap de (prioridad, orden, futuro)
+        self._orden = itertools.count()
+        self._despertador = None
+
+    def _rellenar(self):
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    async def adquirir(self, prioridad):
+        self._rellenar()
+        if not self._esperando and self.tokens >= 1:
+            self.tokens -= 1
+            return
+        futuro = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._esperando, (prioridad, next(self._orden), futuro))
+        self._programar()
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            if futuro.done() and not futuro.cancelled():
+                self.tokens += 1  # se concedió el token justo antes de cancelar: se devuelve
+            raise
+
+    def _servir(self):
+        self._despertador = None
+        self._rellenar()
+        while self._esperando and self.tokens >= 1:
+            _, _, futuro = heapq.heappop(self._esperando)
+            if futuro.done():
+                continue
+            self.tokens -= 1
+            futuro.set_result(None)
+        self._programar()
+
+    def _programar(self):
+        if self._esperando and self._despertador is None:
+            espera = max(0.0, (1 - self.tokens) / self.tasa)
+            self._despertador = asyncio.get_running_loop().call_later(espera, self._servir)
+
+    def penalizar(self, segundos):
+        """Tras un 429: no concede tokens hasta que pasen `segundos`"""
+        self._rellenar()
+        self.tokens = min(self.tokens, 0.0) - segundos * self.tasa
+        if self._despertador is not None:
+            self._despertador.cancel()
+            self._despertador = None
+        self._programar()
+
+    @property
+    def esperando(self):
+        return len(self._esperando)
+
+
+class _Edicion:
+    """Edición pendiente de un mensaje; las siguientes le sustituyen los argumentos"""
+    __slots__ = ("args", "kwargs", "futuro", "fusionadas")
+
+    def __init__(self, args, kwargs, futuro):
+        self.args = args
+        self.kwargs = kwargs
+        self.futuro = futuro
+        self.fusionadas = 0
+
+
+class PlanificadorEnvios(BaseRateLimiter):
+    def __init__(self, por_segundo=30, por_chat=1.0, rafaga_chat=3, por_grupo=20 / 60,
+                 max_reintentos=3, max_chats=10000):
+        self.por_segundo = por_segundo
+        self.por_chat = por_chat
+        self.rafaga_chat = rafaga_chat
+        self.por_grupo = por_grupo
+        self.max_reintentos = max_reintentos
+        self.max_chats = max_chats
+        self._global = None
+        self._chats = OrderedDict()  # {chat_id: CuboTokens}, LRU
+        self._ediciones = {}  # {(endpoint, chat_id, message_id, inline_message_id): _Edicion}
+
+        self.en_cola = 0
+        self.max_en_cola = 0
+        self.enviados = {nombre: 0 for nombre in NOMBRES_PRIORIDAD.values()}
+        self.fusionadas = 0
+        self.respuestas_429 = 0
+        self._retrasos = deque(maxlen=4096)
+
+    async def initialize(self):
+        self._global = CuboTokens(self.por_segundo, self.por_segundo)
+
+    async def shutdown(self):
+        pass
+
+    def _cubo_chat(self, chat_id):
+        cubo = self._chats.get(chat_id)
+        if cubo is None:
+            # Los grupos y canales (id negativo) tienen un límite mucho más bajo
+            if isinstance(chat_id, int) and chat_id < 0:
+                cubo = CuboTokens(self.por_grupo, 1)
+            else:
+                cubo = CuboTokens(self.por_chat, self.rafaga_chat)
+            self._chats[chat_id] = cubo
+            if len(self._chats) > self.max_chats:
+                for antiguo in list(itertools.islice(self._chats, len(self._chats) - self.max_chats)):
+                    if not self._chats[antiguo].esperando:
+                        del self._chats[antiguo]
+        else:
+            self._chats.move_to_end(chat_id)
+        return cubo
+
+    async def _turno(self, chat_id, prioridad):
+        # Primero el chat: así no se gastan tokens globales en envíos que aún no pueden salir
+        if chat_id is not None and prioridad != PRIORIDAD_RESPUESTA:
+            await self._cubo_chat(chat_id).adquirir(prioridad)
+        await self._global.adquirir(prioridad)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        prioridad = prioridad_de(endpoint)
+        if prioridad is None:
+            return await _llamar(endpoint, callback, args, kwargs)
+
+        chat_id = data.get("chat_id")
+        clave, edicion = None, None
+        if endpoint in EDICIONES:
+            clave = (endpoint, chat_id, data.get("message_id"), data.get("inline_message_id"))
+            edicion = self._ediciones.get(clave)
+            if edicion is not None:
+                # Aún no ha salido la edición anterior: saldrá con estos argumentos
+                edicion.args, edicion.kwargs = args, kwargs
+                edicion.fusionadas += 1
+                self.fusionadas += 1
+                return await asyncio.shield(edicion.futuro)
+            edicion = _Edicion(args, kwargs, asyncio.get_running_loop().create_future())
+            self._ediciones[clave] = edicion
+
+        encolado = time.monotonic()
+        self.en_cola += 1
+        self.max_en_cola = max(self.max_en_cola, self.en_cola)
+        en_cola = True
+        try:
+            for intento in range(self.max_reintentos + 1):
+                await self._turno(chat_id, prioridad)
+                if en_cola:
+                    self.en_cola -= 1
+                    en_cola = False
+                    self._retrasos.append(time.monotonic() - encolado)
+                    TELEGRAM_ESPERA.observar(self._retrasos[-1], NOMBRES_PRIORIDAD[prioridad])
+                if edicion is not None:
+                    args, kwargs = edicion.args, edicion.kwargs
+                    if self._ediciones.get(clave) is edicion:
+                        del self._ediciones[clave]
+                try:
+                    resultado = await _llamar(endpoint, callback, args, kwargs)
+                    break
+                except RetryAfter as e:
+                    self.respuestas_429 += 1
+                    TELEGRAM_429.inc(endpoint)
+                    segundos = _segundos(e.retry_after)
+                    logging.warning("429 de Telegram en %s (chat %s): reintento en %.1fs", endpoint, chat_id, segundos)
+                    (self._cubo_chat(chat_id) if chat_id is not None else self._global).penalizar(segundos)
+                    if intento == self.max_reintentos:
+                        raise
+                    if edicion is not None:
+                        nueva = self._ediciones.get(clave)
+                        if nueva is not None:
+                            # Ya hay otra edición más reciente esperando: esta sobra
+                            nueva.fusionadas += 1
+                            self.fusionadas += 1
+                            resultado = await asyncio.shield(nueva.futuro)
+                            break
+                        self._ediciones[clave] = edicion
+            self.enviados[NOMBRES_PRIORIDAD[prioridad]] += 1
+        except BaseException as e:
+            if edicion is not None:
+                if self._ediciones.get(clave) is edicion:
+                    del self._ediciones[clave]
+                if not edicion.futuro.done():
+                    if isinstance(e, Exception):
+                        edicion.futuro.set_exception(e)
+                        edicion.futuro.exception()  # marcada como leída si nadie más la esperaba
+                    else:
+                        edicion.futuro.cancel()
+            raise
+        finally:
+            if en_cola:
+                self.en_cola -= 1
+
+        if edicion is not None and not edicion.futuro.done():
+            edicion.futuro.set_result(resultado)
+        return resultado
+
+    def estadisticas(self):
+        retrasos = np.fromiter(self._retrasos, dtype=np.float64, count=len(self._retrasos))
+        return {
+            "en_cola": self.en_cola,
+            "max_en_cola": self.max_en_cola,
+            "enviados": dict(self.enviados),
+            "fusionadas": self.fusionadas,
+            "respuestas_429": self.respuestas_429,
+            "retraso_p50": float(np.percentile(retrasos, 50)) if len(retrasos) else 0.0,
+            "retraso_p95": float(np.percentile(retrasos, 95)) if len(retrasos) else 0.0,
+            "chats": len(self._chats),
+        }
@@ -0,0 +1,379 @@
+# estado_compartido.py
+"""
+Estado de conversación compartido entre réplicas del bot.
+
+PersistenciaCompartida es una persistencia de python-telegram-bot para el
+user_data de cada usuario (filtro elegido, conversación con la IA...), con
+dos almacenes intercambiables:
+
+- local: SQLite en modo WAL, embebido; lo comparten los procesos de una
+  misma máquina (p. ej. los workers del modo webhook).
+- redis: cualquier servidor que hable el protocolo de Redis (RESP), para
+  réplicas en varias máquinas. Se habla RESP directamente, sin el paquete
+  redis; fake_redis.py es un sustituto local para pruebas.
+
+Para no añadir un viaje de red a cada toque:
+- Lectura con caché: el user_data de un usuario solo se vuelve a leer del
+  almacén si hace más de `ttl` segundos que no se sincroniza.
+- Escritura diferida por lotes: python-telegram-bot entrega los cambios
+  cada `update_interval` segundos y un hilo escritor los vuelca juntos (un
+  único MSET o una transacción) como mucho cada `intervalo` segundos.
+"""
+import asyncio
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+from telegram.ext import BasePersistence, PersistenceInput
+
+
+# -------------------
+# Almacenes
+# -------------------
+class AlmacenLocal:
+    """Clave-valor en SQLite (WAL), seguro entre hilos y procesos"""
+
+    def __init__(self, ruta="estado.sqlite"):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS estado (clave TEXT PRIMARY KEY, valor BLOB NOT NULL, guardado REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def leer(self, claves):
+        """{clave: valor} de las claves que existen"""
+        marcas = ",".join("?" * len(claves))
+        with self._lock:
+            filas = self._conn.execute(f"SELECT clave, valor FROM estado WHERE clave IN ({marcas})", claves).fetchall()
+        return dict(filas)
+
+    def escribir(self, valores):
+        ahora = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO estado (clave, valor, guardado) VALUES (?, ?, ?)",
+                    [(clave, valor, ahora) for clave, valor in valores.items()]
+                )
+
+    def borrar(self, claves):
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM estado WHERE clave = ?", [(c,) for c in claves])
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ErrorRESP(Exception):
+    pass
+
+
+class ClienteRESP:
+    """Cliente mínimo del protocolo de Redis: comandos en tubería sobre un socket"""
+
+    def __init__(self, host="127.0.0.1", puerto=6379, db=0, timeout=5.0):
+        self.host = host
+        self.puerto = puerto
+        self.db = db
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._socket = None
+        self._lector = None
+
+    @classmethod
+    def desde_url(cls, url):
+        """redis://host:puerto/db"""
+        partes = urlparse(url)
+        db = int(partes.path.lstrip("/") or 0)
+        return cls(partes.hostname or "127.0.0.1", partes.port or 6379, db)
+
+    def _conectar(self):
+        self._socket = socket.create_connection((self.host, self.puerto), timeout=self.timeout)
+        self._lector = self._socket.makefile("rb")
+        if self.db:
+            self._enviar([("SELECT", self.db)])
+
+    @staticmethod
+    def _codificar(comando):
+        partes = [f"*{len(comando)}\r\n".encode()]
+        for arg in comando:
+            arg = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            partes.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(partes)
+
+    def _leer_respuesta(self):
+        linea = self._lector.readline()
+        if not linea:
+            raise ConnectionError("Conexión cerrada por el servidor")
+        tipo, resto = linea[:1], linea[1:-2]
+        if tipo == b"+":
+            return resto.decode()
+        if tipo == b"-":
+            return ErrorRESP(resto.decode())
+        if tipo == b":":
+            return int(resto)
+        if tipo == b"$":
+            largo = int(resto)
+            if largo < 0:
+                return None
+            datos = self._lector.read(largo + 2)
+            return datos[:-2]
+        if tipo == b"*":
+            largo = int(resto)
+            return None if largo < 0 else [self._leer_respuesta() for _ in range(largo)]
+        raise ErrorRESP(f"Respuesta RESP desconocida: {linea!r}")
+
+    def _enviar(self, comandos):
+        self._socket.sendall(b"".join(self._codificar(c) for c in comandos))
+        respuestas = [self._leer_respuesta() for _ in comandos]
+        for respuesta in respuestas:
+            if isinstance(respuesta, ErrorRESP):
+                raise respuesta
+        return respuestas
+
+    def ejecutar(self, *comandos):
+        """Manda los comandos en una sola tubería y devuelve sus respuestas"""
+        with self._lock:
+            for intento in range(2):
+                try:
+                    if self._socket is None:
+                        self._conectar()
+                    return self._enviar(comandos)
+                except (OSError, ConnectionError):
+                    # Conexión caída (reinicio del servidor...): un reintento con una nueva
+                    self.cerrar_conexion()
+                    if intento:
+                        raise
+
+    def cerrar_conexion(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self._lector = None
+
+
+class AlmacenRedis:
+    """Clave-valor en un servidor compatible con Redis"""
+
+    def __init__(self, url="redis://127.0.0.1:6379/0", prefijo="cineclass:"):
+        self.cliente = ClienteRESP.desde_url(url)
+        self.prefijo = prefijo
+
+    def leer(self, claves):
+        valores = self.cliente.ejecutar(("MGET", *(self.prefijo + c for c in claves)))[0]
+        return {clave: valor for clave, valor in zip(claves, valores) if valor is not None}
+
+    def escribir(self, valores):
+        argumentos = []
+        for clave, valor in valores.items():
+            argumentos += [self.prefijo + clave, valor]
+        self.cliente.ejecutar(("MSET", *argumentos))
+
+    def borrar(self, claves):
+        self.cliente.ejecutar(("DEL", *(self.prefijo + c for c in claves)))
+
+    def cerrar(self):
+        self.cliente.cerrar_conexion()
+
+
+def almacen_desde_entorno(backend, ruta="estado.sqlite", url="redis://127.0.0.1:6379/0"):
+    if backend == "local":
+        return AlmacenLocal(ruta)
+    if backend == "redis":
+        return AlmacenRedis(url)
+    raise ValueError(f"Backend de estado desconocido: {backend!r} (válidos: local, redis, memoria)")
+
+
+# -------------------
+# Persistencia de python-telegram-bot
+# -------------------
+def _clave_usuario(user_id):
+    return f"usuario:{user_id}"
+
+
+class PersistenciaCompartida(BasePersistence):
+    def __init__(self, almacen, ttl=30.0, intervalo=0.5, lote=512, max_usuarios=100000, update_interval=1.0):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.almacen = almacen
+        self.ttl = ttl
+        self.intervalo = intervalo
+        self.lote = lote
+        self.max_usuarios = max_usuarios
+
+        self._sincronizado = OrderedDict()  # {user_id: (monotonic, json guardado)}, LRU
+        self._pendientes = {}  # {user_id: json por escribir}
+        self._en_vuelo = {}  # {user_id: json} del lote que se está escribiendo ahora mismo
+        self._lock = threading.Lock()
+        self._hay_pendientes = threading.Event()
+        self._cerrado = False
+        self.hits = 0
+        self.misses = 0
+        self.escrituras = 0
+        self.lotes = 0
+        self.errores = 0
+
+        self._escritor = threading.Thread(target=self._bucle_escritor, name="estado", daemon=True)
+        self._escritor.start()
+
+    # -------------------
+    # Lectura
+    # -------------------
+    async def get_user_data(self):
+        # Nada por adelantado: cada usuario se lee al llegar su primer update
+        return {}
+
+    async def refresh_user_data(self, user_id, user_data):
+        sincronizado = self._sincronizado.get(user_id)
+        if sincronizado is not None and time.monotonic() - sincronizado[0] < self.ttl:
+            self._sincronizado.move_to_end(user_id)
+            self.hits += 1
+            return
+        self.misses += 1
+
+        clave = _clave_usuario(user_id)
+        try:
+            valor = (await asyncio.to_thread(self.almacen.leer, [clave])).get(clave)
+        except Exception:
+            self.errores += 1
+            logging.exception("No se pudo leer el estado del usuario %s; se sigue con el local", user_id)
+            return
+
+        with self._lock:
+            pendiente = user_id in self._pendientes or user_id in self._en_vuelo
+        # Si hay cambios propios sin volcar, lo local es más reciente que el almacén
+        if valor is not None and not pendiente:
+            texto = valor.decode("utf-8") if isinstance(valor, bytes) else valor
+            if sincronizado is None or texto != sincronizado[1]:
+                user_data.clear()
+                user_data.update(json.loads(texto))
+        self._marcar(user_id, json.dumps(user_data, ensure_ascii=False, sort_keys=True))
+
+    def _marcar(self, user_id, texto):
+        self._sincronizado[user_id] = (time.monotonic(), texto)
+        self._sincronizado.move_to_end(user_id)
+        if len(self._sincronizado) > self.max_usuarios:
+            self._sincronizado.popitem(last=False)
+
+    # -------------------
+    # Escritura diferida
+    # -------------------
+    async def update_user_data(self, user_id, data):
+        texto = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+        sincronizado = self._sincronizado.get(user_id)
+        if sincronizado is not None and sincronizado[1] == texto:
+            return
+        self._marcar(user_id, texto)
+        with self._lock:
+            self._pendientes[user_id] = texto
+            lleno = len(self._pendientes) >= self.lote
+        if lleno:
+            self._hay_pendientes.set()
+
+    async def drop_user_data(self, user_id):
+        with self._lock:
+            self._pendientes.pop(user_id, None)
+        self._sincronizado.pop(user_id, None)
+        await asyncio.to_thread(self.almacen.borrar, [_clave_usuario(user_id)])
+
+    def _bucle_escritor(self):
+        while True:
+            self._hay_pendientes.wait(self.intervalo)
+            self._hay_pendientes.clear()
+            self._volcar()
+            if self._cerrado:
+                self._volcar()
+                return
+
+    def _volcar(self):
+        with self._lock:
+            # El lote sigue visible en _en_vuelo hasta confirmarse: mientras tanto
+            # refresh_user_data no debe pisar lo local con lo que hay en el almacén
+            lote, self._pendientes = self._pendientes, {}
+            self._en_vuelo = lote
+        if not lote:
+            return
+        try:
+            self.almacen.escribir({_clave_usuario(u): texto.encode("utf-8") for u, texto in lote.items()})
+        except Exception:
+            self.errores += 1
+            logging.exception("No se pudo volcar el estado de %d usuarios; se reintentará", len(lote))
+            with self._lock:
+                # Lo que llegó mientras tanto es más reciente y tiene prioridad
+                self._pendientes = {**lote, **self._pendientes}
+                self._en_vuelo = {}
+            return
+        with self._lock:
+            self._en_vuelo = {}
+        self.escrituras += len(lote)
+        self.lotes += 1
+
+    async def flush(self):
+        """Al parar: vuelca lo pendiente y detiene el hilo escritor"""
+        self._cerrado = True
+        self._hay_pendientes.set()
+        await asyncio.to_thread(self._escritor.join)
+        self.almacen.cerrar()
+
+    def estadisticas(self):
+        total = self.hits + self.misses
+        return {
+            "usuarios": len(self._sincronizado),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "escrituras": self.escrituras,
+            "lotes": self.lotes,
+            "errores": self.errores,
+        }
+
+    # -------------------
+    # Datos que no se comparten
+    # -------------------
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        return {}
+
+    async def update_conversation(self, name, key, new_state):
+        pass
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
@@ -0,0 +1,124 @@
+# fake_redis.py
+"""
+Servidor falso con el protocolo de Redis para probar el backend redis de
+estado_compartido.py sin instalar Redis.
+
+    python fake_redis.py --puerto 6390 --latencia 2
+
+Guarda todo en memoria y atiende PING, SELECT, GET, SET, MGET, MSET, DEL,
+EXISTS, DBSIZE y FLUSHDB; cuenta los comandos recibidos de cada tipo. La
+latencia simula el viaje de red a un Redis remoto.
+"""
+import argparse
+import socketserver
+import threading
+import time
+from collections import Counter
+
+
+class ManejadorRESP(socketserver.StreamRequestHandler):
+    def _leer_comando(self):
+        linea = self.rfile.readline()
+        if not linea:
+            return None
+        if not linea.startswith(b"*"):
+            # Comando en línea (redis-cli sin RESP, telnet...)
+            return linea.split()
+        argumentos = []
+        for _ in range(int(linea[1:-2])):
+            largo = int(self.rfile.readline()[1:-2])
+            argumentos.append(self.rfile.read(largo + 2)[:-2])
+        return argumentos
+
+    @staticmethod
+    def _codificar(valor):
+        if valor is None:
+            return b"$-1\r\n"
+        if isinstance(valor, bool):
+            return b"+OK\r\n"
+        if isinstance(valor, int):
+            return b":%d\r\n" % valor
+        if isinstance(valor, Exception):
+            return b"-ERR %s\r\n" % str(valor).encode()
+        if isinstance(valor, list):
+            return b"*%d\r\n" % len(valor) + b"".join(ManejadorRESP._codificar(v) for v in valor)
+        if isinstance(valor, str):
+            return b"+%s\r\n" % valor.encode()
+        return b"$%d\r\n%s\r\n" % (len(valor), valor)
+
+    def handle(self):
+        srv = self.server
+        while True:
+            comando = self._leer_comando()
+            if comando is None:
+                return
+            if not comando:
+                continue
+            if srv.latencia:
+                time.sleep(srv.latencia)
+            nombre = comando[0].decode().upper()
+            with srv.lock:
+                srv.comandos[nombre] += 1
+                respuesta = self._ejecutar(srv.datos, nombre, comando[1:])
+            self.wfile.write(self._codificar(respuesta))
+            self.wfile.flush()
+
+    @staticmethod
+    def _ejecutar(datos, nombre, args):
+        if nombre == "PING":
+            return "PONG"
+        if nombre == "SELECT":
+            return True
+        if nombre == "GET":
+            return datos.get(args[0])
+        if nombre == "SET":
+            datos[args[0]] = args[1]
+            return True
+        if nombre == "MGET":
+            return [datos.get(clave) for clave in args]
+        if nombre == "MSET":
+            if len(args) % 2:
+                return ValueError("wrong number of arguments for 'mset' command")
+            datos.update(zip(args[::2], args[1::2]))
+            return True
+        if nombre == "DEL":
+            return sum(datos.pop(clave, None) is not None for clave in args)
+        if nombre == "EXISTS":
+            return sum(clave in datos for clave in args)
+        if nombre == "DBSIZE":
+            return len(datos)
+        if nombre == "FLUSHDB":
+            datos.clear()
+            return True
+        return ValueError(f"unknown command '{nombre}'")
+
+
+class _Servidor(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+
+def crear_servidor(puerto=6390, latencia=0.0):
+    srv = _Servidor(("127.0.0.1", puerto), ManejadorRESP)
+    srv.latencia = latencia
+    srv.lock = threading.Lock()
+    srv.datos = {}
+    srv.comandos = Counter()
+    return srv
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor falso con el protocolo de Redis")
+    parser.add_argument("--puerto", type=int, default=6390)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Milisegundos por comando")
+    args = parser.parse_args()
+
+    srv = crear_servidor(args.puerto, args.latencia / 1000)
+    print(f"🎭 Redis falso escuchando en redis://127.0.0.1:{args.puerto}/0", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
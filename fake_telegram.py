@@ -0,0 +1,157 @@
+# fake_telegram.py
+"""
+API de bots de Telegram falsa para probar envios.py y bench_envios.py sin
+un bot real.
+
+    python fake_telegram.py --puerto 8766 --por-chat 1 --rafaga-chat 3 --por-segundo 30
+
+Atiende POST /bot<token>/<método> para getMe, sendMessage, editMessageText,
+editMessageReplyMarkup y answerCallbackQuery. Aplica límites parecidos a
+los de Telegram (por chat y globales) y, si se superan, responde 429 con
+retry_after como la API real. GET /estadisticas devuelve los contadores.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class _Cubo:
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = float(capacidad)
+        self.ultimo = time.monotonic()
+
+    def consumir(self):
+        """True si hay token; si no, los segundos hasta el siguiente"""
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return (1 - self.tokens) / self.tasa
+
+
+class ManejadorTelegram(BaseHTTPRequestHandler):
+    server_version = "FakeTelegram/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _parametros(self):
+        cuerpo = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(cuerpo or "{}")
+        return {clave: valores[0] for clave, valores in parse_qs(cuerpo).items()}
+
+    def do_GET(self):
+        if self.path == "/estadisticas":
+            return self._json(200, self.server.estadisticas())
+        self._json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+    def do_POST(self):
+        srv = self.server
+        metodo = self.path.rstrip("/").rsplit("/", 1)[-1]
+        parametros = self._parametros()
+        chat_id = int(parametros["chat_id"]) if "chat_id" in parametros else None
+
+        if srv.latencia:
+            time.sleep(srv.latencia)
+
+        with srv.lock:
+            srv.peticiones[metodo] += 1
+            if metodo != "getMe":
+                espera = srv.cubo_global.consumir()
+                if espera is True and chat_id is not None and metodo != "answerCallbackQuery":
+                    cubo = srv.cubos_chat.get(chat_id)
+                    if cubo is None:
+                        cubo = srv.cubos_chat[chat_id] = _Cubo(srv.por_chat, srv.rafaga_chat)
+                    espera = cubo.consumir()
+                if espera is not True:
+                    srv.respuestas_429 += 1
+                    retry_after = max(1, int(espera + 0.999))
+                    return self._json(429, {
+                        "ok": False, "error_code": 429,
+                        "description": f"Too Many Requests: retry after {retry_after}",
+                        "parameters": {"retry_after": retry_after},
+                    })
+            srv.ultimo_id += 1
+            nuevo_id = srv.ultimo_id
+            if metodo.startswith("edit"):
+                srv.ediciones[(chat_id, parametros.get("message_id"))] += 1
+
+        if metodo == "getMe":
+            return self._json(200, {"ok": True, "result": {
+                "id": 1, "is_bot": True, "first_name": "CineClass", "username": "cineclass_falso_bot"}})
+        if metodo == "answerCallbackQuery":
+            return self._json(200, {"ok": True, "result": True})
+        if metodo in ("sendMessage", "editMessageText", "editMessageReplyMarkup") and chat_id is not None:
+            mensaje = {
+                "message_id": int(parametros.get("message_id", nuevo_id)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+                "text": parametros.get("text", ""),
+            }
+            return self._json(200, {"ok": True, "result": mensaje})
+        self._json(404, {"ok": False, "error_code": 404, "description": "Not Found: method not found"})
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # las ráfagas abren muchas conexiones a la vez
+
+
+def crear_servidor(puerto=8766, por_segundo=30, por_chat=1.0, rafaga_chat=3, latencia=0.0):
+    srv = _Servidor(("127.0.0.1", puerto), ManejadorTelegram)
+    srv.latencia = latencia
+    srv.por_chat = por_chat
+    srv.rafaga_chat = rafaga_chat
+    srv.lock = threading.Lock()
+    srv.cubo_global = _Cubo(por_segundo, por_segundo)
+    srv.cubos_chat = {}
+    srv.peticiones = Counter()
+    srv.ediciones = Counter()
+    srv.respuestas_429 = 0
+    srv.ultimo_id = 0
+
+    def estadisticas():
+        with srv.lock:
+            return {
+                "peticiones": dict(srv.peticiones),
+                "respuestas_429": srv.respuestas_429,
+                "mensajes_editados": len(srv.ediciones),
+            }
+    srv.estadisticas = estadisticas
+    return srv
+
+def main():
+    parser = argparse.ArgumentParser(description="API de bots de Telegram falsa para pruebas locales")
+    parser.add_argument("--puerto", type=int, default=8766)
+    parser.add_argument("--por-segundo", type=float, default=30, help="Límite global de envíos por segundo")
+    parser.add_argument("--por-chat", type=float, default=1.0, help="Envíos por segundo en cada chat")
+    parser.add_argument("--rafaga-chat", type=int, default=3, help="Ráfaga permitida en cada chat")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Milisegundos por respuesta")
+    args = parser.parse_args()
+
+    srv = crear_servidor(args.puerto, args.por_segundo, args.por_chat, args.rafaga_chat, args.latencia / 1000)
+    print(f"🎭 Telegram falso escuchando en http://127.0.0.1:{args.puerto}/bot<token>/", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
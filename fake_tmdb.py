@@ -0,0 +1,157 @@
+# fake_tmdb.py
+"""
+Servidor TMDB falso para probar fetch_tmdb.py sin gastar cuota de la API.
+
+    python fake_tmdb.py --puerto 8765 --tasa-429 0.05 --latencia 50
+    TMDB_BASE_URL=http://127.0.0.1:8765 TMDB_API_KEY=falsa python fetch_tmdb.py
+
+Responde /movie/popular, /tv/popular y /{movie|tv}/{id}/watch/providers con
+datos deterministas. Puede añadir latencia y devolver 429 con Retry-After.
+Manda ETag y contesta 304 a If-None-Match; con --version y --tasa-cambios
+una fracción de los títulos cambia entre versiones para probar --incremental.
+Con --caidas (p. ej. movie:3,tv:7) esas páginas responden siempre 500, para
+probar --resume tras páginas fallidas; los ids de `srv.proveedores_caidos`
+hacen lo mismo con la consulta de plataformas.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PROVEEDORES = ["Netflix", "Disney Plus", "Amazon Prime Video", "HBO Max", "Apple TV Plus"]
+GENEROS = [28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 9648, 10749, 878, 53]
+POR_PAGINA = 20
+
+
+def item_popular(item_type, item_id, version=0, tasa_cambios=0.0):
+    rnd = random.Random(item_id)
+    fecha = f"{rnd.randint(1970, 2025)}-{rnd.randint(1, 12):02d}-01"
+    item = {
+        "id": item_id,
+        "genre_ids": rnd.sample(GENEROS, rnd.randint(1, 3)),
+        "vote_average": round(rnd.uniform(1, 10), 3),
+        "overview": f"Sinopsis del título {item_id}",
+    }
+    # Cada versión cambia la sinopsis de una fracción de los títulos
+    if version and random.Random(f"{item_id}-{version}").random() < tasa_cambios:
+        item["overview"] += f" (v{version})"
+    if item_type == "movie":
+        item.update(title=f"Película {item_id}", release_date=fecha)
+    else:
+        item.update(name=f"Serie {item_id}", first_air_date=fecha)
+    return item
+
+def proveedores(item_id):
+    rnd = random.Random(item_id * 7)
+    if rnd.random() < 0.3:
+        return {"id": item_id, "results": {}}
+    nombres = rnd.sample(PROVEEDORES, rnd.randint(1, 2))
+    pais = rnd.choice(["MX", "US", "ES"])
+    return {"id": item_id, "results": {pais: {"flatrate": [{"provider_name": n} for n in nombres]}}}
+
+
+class ManejadorTMDB(BaseHTTPRequestHandler):
+    server_version = "FakeTMDB/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, codigo, cuerpo, cabeceras=None):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        if codigo == 200:
+            etag = f'"{hashlib.blake2b(datos, digest_size=8).hexdigest()}"'
+            cabeceras = {**(cabeceras or {}), "ETag": etag}
+            if self.headers.get("If-None-Match") == etag:
+                with self.server.lock:
+                    self.server.respuestas_304 += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.peticiones += 1
+
+        if srv.latencia:
+            time.sleep(srv.latencia)
+        if srv.tasa_429 and random.random() < srv.tasa_429:
+            with srv.lock:
+                srv.respuestas_429 += 1
+            return self._json(429, {"status_message": "Too many requests"}, {"Retry-After": "1"})
+
+        url = urlparse(self.path)
+        partes = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+
+        if len(partes) == 2 and partes[0] in ("movie", "tv") and partes[1] == "popular":
+            pagina = int(query.get("page", ["1"])[0])
+            if (partes[0], pagina) in srv.caidas:
+                return self._json(500, {"status_message": "Internal error"})
+            base = (1 if partes[0] == "movie" else 500000) + (pagina - 1) * POR_PAGINA
+            resultados = [item_popular(partes[0], base + i, srv.version, srv.tasa_cambios) for i in range(POR_PAGINA)] \
+                if pagina <= srv.paginas else []
+            return self._json(200, {"page": pagina, "results": resultados, "total_pages": srv.paginas})
+
+        if len(partes) == 4 and partes[0] in ("movie", "tv") and partes[2:] == ["watch", "providers"]:
+            if int(partes[1]) in srv.proveedores_caidos:
+                return self._json(500, {"status_message": "Internal error"})
+            return self._json(200, proveedores(int(partes[1])))
+
+        self._json(404, {"status_message": "Not found"})
+
+
+def crear_servidor(puerto=8765, paginas=500, tasa_429=0.0, latencia=0.0, version=0, tasa_cambios=0.0, caidas=()):
+    srv = ThreadingHTTPServer(("127.0.0.1", puerto), ManejadorTMDB)
+    srv.daemon_threads = True
+    srv.paginas = paginas
+    srv.tasa_429 = tasa_429
+    srv.latencia = latencia
+    srv.version = version
+    srv.tasa_cambios = tasa_cambios
+    srv.caidas = set(caidas)  # {(tipo, página)} que devuelven 500
+    srv.proveedores_caidos = set()  # {id} cuya consulta de plataformas devuelve 500
+    srv.lock = threading.Lock()
+    srv.peticiones = 0
+    srv.respuestas_429 = 0
+    srv.respuestas_304 = 0
+    return srv
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor TMDB falso para pruebas locales")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--paginas", type=int, default=500)
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Fracción de respuestas 429")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Milisegundos por respuesta")
+    parser.add_argument("--version", type=int, default=0, help="Versión de los datos")
+    parser.add_argument("--tasa-cambios", type=float, default=0.05,
+                        help="Fracción de títulos que cambian en cada versión")
+    parser.add_argument("--caidas", default="", help="Páginas que devuelven 500, p. ej. movie:3,tv:7")
+    args = parser.parse_args()
+
+    caidas = [(tipo, int(pagina)) for tipo, pagina in (c.split(":") for c in args.caidas.split(",") if c)]
+    srv = crear_servidor(args.puerto, args.paginas, args.tasa_429, args.latencia / 1000,
+                         args.version, args.tasa_cambios, caidas)
+    print(f"🎭 TMDB falso escuchando en http://127.0.0.1:{args.puerto}", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"\n📊 Peticiones: {srv.peticiones} ({srv.respuestas_429} con 429, {srv.respuestas_304} con 304)")
+        srv.server_close()
+
+if __name__ == "__main__":
+    main()
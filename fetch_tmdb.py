@@ -1,12 +1,27 @@
-import requests
-import pandas as pd
-import time
+import argparse
+import csv
+import hashlib
+import json
 import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from cache_http import CacheHTTP
+
+load_dotenv()
 API_KEY = os.getenv("TMDB_API_KEY")
-if not API_KEY:
-    raise ValueError("❌ Error: Falta TMDB_API_KEY en el archivo .env")
+# Se puede apuntar a un servidor local (fake_tmdb.py) para pruebas
+BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
 CSV_FILE = "movies_clean.csv"
+CACHE_FILE = "tmdb_cache.sqlite"
 
 # -------------------
 # Mapeo de géneros TMDB
@@ -45,94 +60,498 @@ def get_genre_names(genre_ids):
     """Convierte IDs de género a nombres legibles"""
     genres = [GENRE_MAP.get(gid, f"ID:{gid}") for gid in genre_ids]
     return ", ".join(genres) if genres else "Sin género"
- 
+
+# -------------------
+# Limitador y cliente HTTP
+# -------------------
+class TokenBucket:
+    """
+    Token bucket adaptativo y seguro entre hilos.
+    Ante un 429 reduce la tasa a la mitad y pausa a todos los hilos durante
+    el Retry-After; con cada respuesta correcta la va recuperando poco a poco.
+    """
+
+    def __init__(self, tasa=35.0, capacidad=None, tasa_minima=1.0):
+        self.tasa_maxima = tasa
+        self.tasa = tasa
+        self.tasa_minima = tasa_minima
+        self.capacidad = capacidad or max(1.0, tasa / 2)
+        self.tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                if ahora < self._pausa_hasta:
+                    espera = self._pausa_hasta - ahora
+                else:
+                    self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+                    self._ultimo = ahora
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    espera = (1 - self.tokens) / self.tasa
+            time.sleep(espera)
+
+    def limitar(self, retry_after=None):
+        """Llamar al recibir un 429"""
+        with self._lock:
+            self.tasa = max(self.tasa_minima, self.tasa / 2)
+            self.tokens = 0
+            if retry_after:
+                self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + retry_after)
+            self._ultimo = max(time.monotonic(), self._pausa_hasta)
+
+    def exito(self):
+        """Llamar tras una respuesta correcta"""
+        with self._lock:
+            if self.tasa < self.tasa_maxima:
+                self.tasa = min(self.tasa_maxima, self.tasa + self.tasa_maxima * 0.02)
+
+def segundos_retry_after(valor):
+    """Retry-After puede venir en segundos o como fecha HTTP"""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class ClienteTMDB:
+    """
+    Sesión HTTP con pool de conexiones, limitador de tasa y reintentos con backoff.
+    Con `cache` hace peticiones condicionales (ETag / Last-Modified) y reutiliza
+    la respuesta guardada cuando el servidor contesta 304.
+    """
+
+    def __init__(self, api_key, base_url=BASE_URL, workers=8, rps=35.0, reintentos=4, timeout=10, cache=None):
+        self.api_key = api_key
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+        self.reintentos = reintentos
+        self.timeout = timeout
+        self.limitador = TokenBucket(rps)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Los contadores se actualizan desde los hilos del pool
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.respuestas_429 = 0
+        self.respuestas_304 = 0
+
+    def get_json(self, ruta, **params):
+        """GET a la API; devuelve el JSON o None si falla tras los reintentos"""
+        url = f"{self.base_url}{ruta}"
+        # La clave de caché no incluye la API key
+        clave = f"{url}?{urlencode(sorted(params.items()))}"
+        params = {"api_key": self.api_key, **params}
+
+        entrada = self.cache.obtener(clave) if self.cache is not None else None
+        cabeceras = {}
+        if entrada is not None:
+            if entrada.etag:
+                cabeceras["If-None-Match"] = entrada.etag
+            if entrada.last_modified:
+                cabeceras["If-Modified-Since"] = entrada.last_modified
+
+        for intento in range(self.reintentos + 1):
+            self.limitador.adquirir()
+            with self._lock:
+                self.peticiones += 1
+            espera = min(30.0, 0.5 * 2 ** intento) * random.uniform(0.5, 1.5)
+            try:
+                res = self.session.get(url, params=params, headers=cabeceras, timeout=self.timeout)
+            except requests.RequestException:
+                res = None
+
+            if res is not None:
+                if res.status_code == 304 and entrada is not None:
+                    self.limitador.exito()
+                    with self._lock:
+                        self.respuestas_304 += 1
+                    return json.loads(entrada.cuerpo)
+                if res.status_code == 200:
+                    self.limitador.exito()
+                    etag, last_modified = res.headers.get("ETag"), res.headers.get("Last-Modified")
+                    if self.cache is not None and (etag or last_modified):
+                        self.cache.guardar(clave, etag, last_modified, res.text)
+                    return res.json()
+                if res.status_code == 429:
+                    # El limitador ya pausa a todos los hilos durante el Retry-After
+                    with self._lock:
+                        self.respuestas_429 += 1
+                    self.limitador.limitar(segundos_retry_after(res.headers.get("Retry-After")) or espera)
+                    continue
+                if res.status_code < 500:
+                    return None
+
+            if intento < self.reintentos:
+                time.sleep(espera)
+        return None
+
 # -------------------
 # Funciones
 # -------------------
-def get_movies(page=1):
-    url = f"{BASE_URL}/movie/popular?api_key={API_KEY}&language=es-ES&page={page}"
-    res = requests.get(url)
-    return res.json() if res.status_code == 200 else None
- 
-def get_series(page=1):
-    url = f"{BASE_URL}/tv/popular?api_key={API_KEY}&language=es-ES&page={page}"
-    res = requests.get(url)
-    return res.json() if res.status_code == 200 else None
- 
-def get_platform(item_type, item_id):
+def get_movies(cliente, page=1):
+    return cliente.get_json("/movie/popular", language="es-ES", page=page)
+
+def get_series(cliente, page=1):
+    return cliente.get_json("/tv/popular", language="es-ES", page=page)
+
+PLATAFORMA_DESCONOCIDA = "Desconocida"
+
+def get_platform(cliente, item_type, item_id):
+    """
+    Plataformas del título, PLATAFORMA_DESCONOCIDA si TMDB no da ninguna o
+    None si no se pudo consultar (error de red, 429 tras los reintentos...)
+    """
     try:
-        url = f"{BASE_URL}/{item_type}/{item_id}/watch/providers?api_key={API_KEY}"
-        res = requests.get(url).json()
+        res = cliente.get_json(f"/{item_type}/{item_id}/watch/providers")
+        if res is None:
+            return None
         # Intentar obtener providers de varios países
         for country in ['MX', 'US', 'ES']:
             providers = res['results'].get(country, {}).get('flatrate', [])
             if providers:
                 return ', '.join([p['provider_name'] for p in providers])
-        return "Desconocida"
-    except:
-        return "Desconocida"
- 
+        return PLATAFORMA_DESCONOCIDA
+    except Exception:
+        return None
+
+# Campos que, si cambian, obligan a volver a consultar la plataforma.
+# vote_average cambia casi a diario y se actualiza sin más.
+CAMPOS_HUELLA = ("title", "name", "release_date", "first_air_date", "genre_ids", "overview")
+
+def huella_item(item):
+    datos = json.dumps({c: item.get(c) for c in CAMPOS_HUELLA}, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(datos.encode("utf-8"), digest_size=8).hexdigest()
+
 def parse_movie(item):
     return {
+        "id": item.get("id"),
         "title": item.get("title", ""),
         "year": item.get("release_date", "")[:4] if item.get("release_date") else "N/A",
         "type": "película",
         "genre": get_genre_names(item.get("genre_ids", [])),
-        "platform": get_platform("movie", item.get("id")),
+        "platform": None,  # Se completa en paralelo con get_platform
         "rating": round(item.get("vote_average", 0), 1),
-        "overview": item.get("overview", "Sin descripción")[:200]  # Primeros 200 caracteres
+        "overview": item.get("overview", "Sin descripción")[:200],  # Primeros 200 caracteres
+        "huella": huella_item(item)
     }
- 
+
 def parse_series(item):
     return {
+        "id": item.get("id"),
         "title": item.get("name", ""),
         "year": item.get("first_air_date", "")[:4] if item.get("first_air_date") else "N/A",
         "type": "serie",
         "genre": get_genre_names(item.get("genre_ids", [])),
-        "platform": get_platform("tv", item.get("id")),
+        "platform": None,
         "rating": round(item.get("vote_average", 0), 1),
-        "overview": item.get("overview", "Sin descripción")[:200]
+        "overview": item.get("overview", "Sin descripción")[:200],
+        "huella": huella_item(item)
     }
- 
+
 # -------------------
-# Descargar datos
+# Pipeline de descarga
 # -------------------
+COLUMNAS = ["id", "title", "year", "type", "genre", "platform", "rating", "overview", "huella"]
+
+def cargar_previos(csv_file):
+    """
+    Para el modo incremental: {(tipo, id): (huella, plataforma)} del catálogo
+    existente, o {} si no existe o no tiene columnas id/huella.
+    """
+    if not os.path.exists(csv_file):
+        return {}
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        lector = csv.DictReader(f)
+        if not {"id", "huella"} <= set(lector.fieldnames or []):
+            print(f"⚠️ {csv_file} no tiene columnas id/huella; se hará una descarga completa.")
+            return {}
+        return {(fila["type"], fila["id"]): (fila["huella"], fila["platform"]) for fila in lector if fila["id"]}
+
+def paginas_descargadas(cliente, pool, get_pagina, pendientes, ventana):
+    """
+    Productor: devuelve las páginas de `pendientes` en orden con hasta
+    `ventana` peticiones adelantadas. Los items son None si la página falló
+    tras los reintentos.
+    """
+    futuros = deque()
+    pendientes = iter(pendientes)
+    for pagina in pendientes:
+        futuros.append((pagina, pool.submit(get_pagina, cliente, pagina)))
+        if len(futuros) >= ventana:
+            break
+    while futuros:
+        pagina, futuro = futuros.popleft()
+        siguiente = next(pendientes, None)
+        if siguiente is not None:
+            futuros.append((siguiente, pool.submit(get_pagina, cliente, siguiente)))
+        data = futuro.result()
+        yield pagina, None if data is None else data.get("results", [])
+
+def paginas_enriquecidas(cliente, pool, paginas, parse, item_type, previos, ventana):
+    """
+    Parsea cada página y completa la plataforma de sus títulos, con hasta
+    `ventana` páginas en curso. Solo consulta la plataforma de los títulos
+    nuevos o con cambios; al resto le reutiliza la del catálogo anterior.
+    Si la consulta falla, el título se guarda como PLATAFORMA_DESCONOCIDA
+    sin huella, así la siguiente descarga incremental lo vuelve a consultar.
+    Devuelve (página, registros, consultados) en orden; registros es None
+    si la página falló.
+    """
+    en_curso = deque()
+
+    def completar(pagina, registros, futuros):
+        for registro, futuro in futuros:
+            plataforma = futuro.result()
+            if plataforma is None:
+                plataforma = PLATAFORMA_DESCONOCIDA
+                registro["huella"] = ""
+            registro["platform"] = plataforma
+        return pagina, registros, len(futuros)
+
+    for pagina, items in paginas:
+        if items is None:
+            en_curso.append((pagina, None, []))
+            if len(en_curso) >= ventana:
+                yield completar(*en_curso.popleft())
+            continue
+        registros = [parse(item) for item in items]
+        futuros = []
+        for registro in registros:
+            previo = previos.get((registro["type"], str(registro["id"])))
+            if previo is not None and previo[0] == registro["huella"]:
+                registro["platform"] = previo[1]
+            else:
+                futuros.append((registro, pool.submit(get_platform, cliente, item_type, registro["id"])))
+        en_curso.append((pagina, registros, futuros))
+        if len(en_curso) >= ventana:
+            yield completar(*en_curso.popleft())
+
+    while en_curso:
+        yield completar(*en_curso.popleft())
+
+class SalidaParcial:
+    """
+    Destino de la descarga: un CSV en el que solo se añaden filas
+    (`<salida>.parcial`) y un checkpoint JSON con la última página escrita
+    de cada etapa, las que fallaron y el tamaño del CSV en ese momento. Al
+    reanudar se recorta el CSV a ese tamaño, se reintentan las fallidas y se
+    sigue desde la página siguiente. Solo se escriben las páginas descargadas.
+    """
+
+    def __init__(self, salida, reanudar=False):
+        self.ruta = f"{salida}.parcial"
+        self.ruta_checkpoint = f"{salida}.checkpoint.json"
+        self.estado = None
+        if reanudar and os.path.exists(self.ruta_checkpoint) and os.path.exists(self.ruta):
+            with open(self.ruta_checkpoint, encoding="utf-8") as f:
+                self.estado = json.load(f)
+            self.estado.setdefault("fallidas", {})
+            os.truncate(self.ruta, self.estado["bytes"])
+            self._archivo = open(self.ruta, "a", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._archivo, fieldnames=COLUMNAS)
+        else:
+            self.estado = {"paginas": {}, "fallidas": {}, "filas": 0, "consultados": 0, "bytes": 0}
+            self._archivo = open(self.ruta, "w", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._archivo, fieldnames=COLUMNAS)
+            self._writer.writeheader()
+            self.checkpoint()
+
+    def ultima_pagina(self, etapa):
+        return self.estado["paginas"].get(etapa, 0)
+
+    def fallidas(self, etapa):
+        return self.estado["fallidas"].get(etapa, [])
+
+    def _avanzar(self, etapa, pagina):
+        self.estado["paginas"][etapa] = max(pagina, self.ultima_pagina(etapa))
+
+    def escribir(self, etapa, pagina, registros, consultados):
+        self._writer.writerows(registros)
+        self._avanzar(etapa, pagina)
+        if pagina in self.fallidas(etapa):
+            self.estado["fallidas"][etapa].remove(pagina)
+        self.estado["filas"] += len(registros)
+        self.estado["consultados"] += consultados
+
+    def fallar(self, etapa, pagina):
+        """La página no se pudo descargar: se reintentará con --resume"""
+        self._avanzar(etapa, pagina)
+        fallidas = self.estado["fallidas"].setdefault(etapa, [])
+        if pagina not in fallidas:
+            fallidas.append(pagina)
+
+    def checkpoint(self):
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self.estado["bytes"] = os.fstat(self._archivo.fileno()).st_size
+        tmp = f"{self.ruta_checkpoint}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.estado, f)
+        os.replace(tmp, self.ruta_checkpoint)
+
+    def cerrar(self):
+        self._archivo.close()
+
+    def limpiar(self):
+        for ruta in (self.ruta, self.ruta_checkpoint):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+def descargar(cliente, pool, sink, get_pagina, parse, item_type, paginas, etiqueta, previos,
+              ventana, checkpoint_cada):
+    desde = sink.ultima_pagina(item_type) + 1
+    reintentar = sorted(sink.fallidas(item_type))
+    if desde > paginas and not reintentar:
+        print(f"  {etiqueta.capitalize()} ya descargadas.")
+        return
+    if reintentar:
+        print(f"  Reintentando {len(reintentar)} páginas fallidas de {etiqueta}...")
+    if 1 < desde <= paginas:
+        print(f"  Reanudando {etiqueta} desde la página {desde}...")
+
+    pendientes = reintentar + list(range(desde, paginas + 1))
+    producidas = paginas_descargadas(cliente, pool, get_pagina, pendientes, ventana)
+    hechas = 0
+    for pagina, registros, consultados in paginas_enriquecidas(cliente, pool, producidas, parse,
+                                                               item_type, previos, ventana):
+        if registros is None:
+            print(f"  ⚠️ No se pudo descargar la página {pagina} de {etiqueta}")
+            sink.fallar(item_type, pagina)
+        else:
+            sink.escribir(item_type, pagina, registros, consultados)
+        hechas += 1
+        if hechas % checkpoint_cada == 0 or hechas == len(pendientes):
+            sink.checkpoint()
+        if pagina % 20 == 0 or pagina == paginas:
+            print(f"  Página {pagina}/{paginas} de {etiqueta}...")
+
+def finalizar(parcial, salida, incremental):
+    """
+    Pasa el CSV parcial a `salida` fila a fila quitando títulos repetidos.
+    En modo incremental añade después los títulos del catálogo anterior
+    que ya no salen en las listas de populares. Los títulos y claves ya
+    vistos se apuntan en una base SQLite temporal en disco, no en memoria.
+    """
+    vistos = sqlite3.connect("")  # "" = base temporal privada que se borra al cerrarla
+    vistos.execute("CREATE TABLE titulos (titulo TEXT PRIMARY KEY) WITHOUT ROWID")
+    vistos.execute("CREATE TABLE claves (tipo TEXT, id TEXT, PRIMARY KEY (tipo, id)) WITHOUT ROWID")
+    resumen = {"película": 0, "serie": 0, "rating": 0.0, "muestra": [], "total": 0}
+    tmp = f"{salida}.tmp"
+
+    def copiar(lector, writer):
+        for fila in lector:
+            if vistos.execute(
+                "SELECT EXISTS (SELECT 1 FROM titulos WHERE titulo = ?) OR "
+                "EXISTS (SELECT 1 FROM claves WHERE tipo = ? AND id = ?)",
+                (fila["title"], fila["type"], fila["id"])
+            ).fetchone()[0]:
+                continue
+            vistos.execute("INSERT INTO titulos VALUES (?)", (fila["title"],))
+            vistos.execute("INSERT INTO claves VALUES (?, ?)", (fila["type"], fila["id"]))
+            resumen["total"] += 1
+            writer.writerow({c: fila.get(c, "") for c in COLUMNAS})
+            resumen[fila["type"]] = resumen.get(fila["type"], 0) + 1
+            resumen["rating"] += float(fila["rating"] or 0)
+            if len(resumen["muestra"]) < 3:
+                resumen["muestra"].append(fila)
+
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as f_salida:
+            writer = csv.DictWriter(f_salida, fieldnames=COLUMNAS)
+            writer.writeheader()
+            with open(parcial, newline="", encoding="utf-8") as f:
+                copiar(csv.DictReader(f), writer)
+            if incremental and os.path.exists(salida):
+                with open(salida, newline="", encoding="utf-8") as f:
+                    copiar(csv.DictReader(f), writer)
+    finally:
+        vistos.close()
+
+    # Escritura atómica: el bot puede estar leyendo el CSV
+    os.replace(tmp, salida)
+    return resumen
+
 def main():
-    peliculas, series = [], []
- 
-    print("Descargando películas...")
-    for page in range(1, 40):  # Reducido a 50 páginas para ir más rápido
-        print(f"  Página {page}/49 de películas...")
-        data = get_movies(page)
-        if data and "results" in data:
-            for item in data["results"]:
-                peliculas.append(parse_movie(item))
-        time.sleep(0.3)  # Evitar rate limiting
- 
-    print("\nDescargando series...")
-    for page in range(1, 400):
-        print(f"  Página {page}/49 de series...")
-        data = get_series(page)
-        if data and "results" in data:
-            for item in data["results"]:
-                series.append(parse_series(item))
-        time.sleep(0.3)
- 
-    df = pd.DataFrame(peliculas + series)
-    df.drop_duplicates(subset="title", inplace=True)
-    
-    # Guardar con información adicional
-    df.to_csv(CSV_FILE, index=False, encoding='utf-8')
-    
-    print(f"\n✅ Guardado en {CSV_FILE}")
-    print(f"📊 Total registros: {len(df)}")
-    print(f"🎬 Películas: {len(df[df['type'] == 'película'])}")
-    print(f"📺 Series: {len(df[df['type'] == 'serie'])}")
-    print(f"⭐ Calificación promedio: {df['rating'].mean():.1f}")
-    
+    parser = argparse.ArgumentParser(description="Descarga películas y series populares de TMDB")
+    parser.add_argument("--paginas-peliculas", type=int, default=39)
+    parser.add_argument("--paginas-series", type=int, default=399)
+    parser.add_argument("--workers", type=int, default=8, help="Peticiones simultáneas")
+    parser.add_argument("--rps", type=float, default=35.0, help="Peticiones por segundo como máximo")
+    parser.add_argument("--salida", default=CSV_FILE)
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fusiona con el CSV existente y solo consulta plataformas de títulos nuevos o cambiados")
+    parser.add_argument("--cache", default=CACHE_FILE, help="Caché HTTP en disco para peticiones condicionales")
+    parser.add_argument("--sin-cache", action="store_true")
+    parser.add_argument("--resume", action="store_true", help="Continúa una descarga interrumpida")
+    parser.add_argument("--checkpoint-cada", type=int, default=10, help="Páginas entre checkpoints")
+    args = parser.parse_args()
+
+    if not API_KEY:
+        raise ValueError("❌ Error: Falta TMDB_API_KEY en el archivo .env")
+
+    cache = None if args.sin_cache else CacheHTTP(args.cache)
+    cliente = ClienteTMDB(API_KEY, workers=args.workers, rps=args.rps, cache=cache)
+    previos = cargar_previos(args.salida) if args.incremental else {}
+    sink = SalidaParcial(args.salida, reanudar=args.resume)
+    ventana = args.workers * 2
+    inicio = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            print("Descargando películas...")
+            descargar(cliente, pool, sink, get_movies, parse_movie, "movie", args.paginas_peliculas,
+                      "películas", previos, ventana, args.checkpoint_cada)
+
+            print("\nDescargando series...")
+            descargar(cliente, pool, sink, get_series, parse_series, "tv", args.paginas_series,
+                      "series", previos, ventana, args.checkpoint_cada)
+        sink.checkpoint()
+    finally:
+        sink.cerrar()
+        if cache is not None:
+            cache.cerrar()
+
+    peticiones = (f"🌐 Peticiones: {cliente.peticiones} ({cliente.respuestas_304} con 304, "
+                  f"{cliente.respuestas_429} con 429) en {time.perf_counter() - inicio:.1f}s")
+    fallidas = {etapa: paginas for etapa, paginas in sink.estado["fallidas"].items() if paginas}
+    if fallidas:
+        # No se toca el CSV: el parcial y el checkpoint se conservan para reintentarlas
+        print(f"\n{peticiones}")
+        for etapa, paginas in fallidas.items():
+            nombre = "películas" if etapa == "movie" else "series"
+            print(f"⚠️ Páginas de {nombre} que fallaron: {', '.join(map(str, sorted(paginas)))}")
+        print(f"❌ {args.salida} no se ha actualizado. Vuelve a ejecutar con --resume para reintentarlas.")
+        raise SystemExit(1)
+
+    resumen = finalizar(sink.ruta, args.salida, args.incremental)
+    sink.limpiar()
+
+    print(f"\n✅ Guardado en {args.salida}")
+    print(f"📊 Total registros: {resumen['total']}")
+    print(f"🎬 Películas: {resumen['película']}")
+    print(f"📺 Series: {resumen['serie']}")
+    print(f"⭐ Calificación promedio: {resumen['rating'] / max(1, resumen['total']):.1f}")
+    if args.incremental:
+        consultados = sink.estado["consultados"]
+        print(f"🔁 Nuevos o cambiados: {consultados} · sin cambios: {sink.estado['filas'] - consultados}")
+    print(peticiones)
+
     # Mostrar muestra de datos
     print("\n📝 Muestra de datos:")
-    print(df[['title', 'type', 'genre', 'platform', 'rating']].head(3))
- 
+    for fila in resumen["muestra"]:
+        print(f"  {fila['title']} | {fila['type']} | {fila['genre']} | {fila['platform']} | {fila['rating']}")
+
 if __name__ == "__main__":
     main()
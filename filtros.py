@@ -0,0 +1,104 @@
+# filtros.py
+"""
+Cubo de filtros precalculado para "Filtrar por criterios".
+
+Al cargar el catálogo, la plataforma (texto libre tipo "Netflix, HBO Max")
+se parte en valores sueltos y se precalculan los arrays de filas de cada
+celda tipo × plataforma. Filtrar es entonces buscar celdas y, como mucho,
+unir unas pocas; año y nota mínima se aplican después con una máscara
+sobre las filas de la celda, sin recorrer el catálogo.
+"""
+from collections import OrderedDict, defaultdict
+import numpy as np
+from catalogo import filas_por_codigo
+
+TODAS = 'all'
+MAX_CONSULTAS = 512  # textos de plataforma distintos que se recuerdan (el texto lo elige el usuario)
+
+
+def _solo_lectura(filas):
+    # Los arrays del cubo se comparten entre consultas: nadie debe modificarlos
+    filas.flags.writeable = False
+    return filas
+
+def _union(partes):
+    if not partes:
+        return np.empty(0, dtype=np.int32)
+    if len(partes) == 1:
+        return partes[0]
+    return np.unique(np.concatenate(partes))
+
+
+class CuboFiltros:
+    def __init__(self, catalogo, max_consultas=MAX_CONSULTAS):
+        self.catalogo = catalogo
+        self.max_consultas = max_consultas
+        todas = np.arange(len(catalogo), dtype=np.int32)
+
+        # Dimensión tipo
+        self.por_tipo = {TODAS: todas}
+        for nombre, filas in zip(catalogo.tipos, filas_por_codigo(catalogo.tipo_codigos, len(catalogo.tipos))):
+            self.por_tipo[nombre] = filas
+
+        # Dimensión plataforma, multi-valor: cada combinación distinta se parte una sola vez
+        partes = defaultdict(list)
+        por_codigo = filas_por_codigo(catalogo.plataforma_codigos, len(catalogo.plataformas))
+        for filas, valor in zip(por_codigo, catalogo.plataformas):
+            for plataforma in valor.split(','):
+                plataforma = plataforma.strip()
+                if plataforma:
+                    partes[plataforma].append(filas)
+        self.por_plataforma = {p: np.sort(np.concatenate(listas)) for p, listas in partes.items()}
+
+        # Celdas tipo × plataforma
+        self.celdas = {(TODAS, TODAS): todas}
+        for tipo, filas in self.por_tipo.items():
+            self.celdas[(tipo, TODAS)] = filas
+        for plataforma, filas in self.por_plataforma.items():
+            self.celdas[(TODAS, plataforma)] = filas
+            codigos = catalogo.tipo_codigos[filas]
+            for codigo, tipo in enumerate(catalogo.tipos):
+                self.celdas[(tipo, plataforma)] = filas[codigos == codigo]
+        for filas in self.celdas.values():
+            _solo_lectura(filas)
+
+        self._por_consulta = OrderedDict()  # {(tipo, texto de plataforma): filas}, LRU
+
+    def _base(self, tipo, plataforma):
+        clave = (tipo, plataforma)
+        filas = self._por_consulta.get(clave)
+        if filas is not None:
+            self._por_consulta.move_to_end(clave)
+        else:
+            if plataforma == TODAS or (tipo, plataforma) in self.celdas:
+                filas = self.celdas.get((tipo, plataforma), np.empty(0, dtype=np.int32))
+            else:
+                # Texto libre: todas las plataformas que lo contienen ("Amazon" → "Amazon Prime Video", ...)
+                filas = _union([self.celdas[(tipo, p)] for p in self.por_plataforma
+                                if plataforma in p and (tipo, p) in self.celdas])
+            self._por_consulta[clave] = _solo_lectura(filas)
+            if len(self._por_consulta) > self.max_consultas:
+                self._por_consulta.popitem(last=False)
+        return filas
+
+    def filas(self, tipo=TODAS, plataforma=TODAS, anio_min=None, anio_max=None, nota_min=None):
+        """
+        Filas (ordenadas) del tipo exacto y cuya plataforma contiene el
+        texto dado, opcionalmente entre dos años y con una nota mínima.
+        El array devuelto es de solo lectura.
+        """
+        filas = self._base(tipo, plataforma)
+        if anio_min is None and anio_max is None and nota_min is None:
+            return filas
+
+        mascara = np.ones(len(filas), dtype=bool)
+        if anio_min is not None or anio_max is not None:
+            years = self.catalogo.years[filas]
+            mascara &= years > 0  # año 0 = N/A
+            if anio_min is not None:
+                mascara &= years >= anio_min
+            if anio_max is not None:
+                mascara &= years <= anio_max
+        if nota_min is not None:
+            mascara &= self.catalogo.ratings[filas] >= nota_min
+        return filas[mascara]
@@ -0,0 +1,184 @@
+# historial.py
+"""
+Historial de títulos vistos por usuario, persistente en SQLite (modo WAL).
+
+Las escrituras no tocan el disco desde el event loop: registrar() solo
+añade a una lista en memoria y un hilo escritor las vuelca por lotes,
+recortando cada usuario a sus últimas `max_por_usuario` entradas. Las
+lecturas van por el índice (user_id, id) en un hilo del executor e
+incluyen lo que aún no se ha volcado.
+
+Si un volcado falla (p. ej. "database is locked" con varios workers del
+modo webhook compartiendo el archivo), el lote se queda en pendientes y se
+reintenta con espera creciente; si el disco no vuelve, pendientes se recorta
+a las `max_pendientes` vistas más recientes.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+
+
+MAX_ESPERA_REINTENTO = 30.0  # segundos entre reintentos de un volcado fallido, como mucho
+ESPERA_LECTURA = 2.0  # segundos que ultimos_sync espera a que termine un volcado en curso
+
+
+class HistorialUsuarios:
+    def __init__(self, ruta="historial.sqlite", max_por_usuario=100, lote=256, intervalo=1.0,
+                 max_pendientes=100000):
+        self.ruta = ruta
+        self.max_por_usuario = max_por_usuario
+        self.lote = lote
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        self.escrituras = 0
+        self.lotes = 0
+        self.errores = 0
+        self.descartadas = 0
+
+        self._pendientes = []  # [(user_id, titulo, fecha)]
+        self._secuencia = 0  # impar mientras se está volcando un lote (ver ultimos_sync)
+        self._lock = threading.Lock()
+        self._hay_pendientes = threading.Event()
+        self._cerrado = False
+
+        conn = self._conectar()
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS vistas ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user_id INTEGER NOT NULL,"
+            " titulo TEXT NOT NULL,"
+            " fecha REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS vistas_usuario ON vistas (user_id, id);"
+        )
+        conn.close()
+
+        self._lectura = self._conectar()
+        self._lock_lectura = threading.Lock()
+        self._escritor = threading.Thread(target=self._bucle_escritor, name="historial", daemon=True)
+        self._escritor.start()
+
+    def _conectar(self):
+        # timeout: con otros procesos escribiendo se espera al lock en vez de fallar al momento
+        conn = sqlite3.connect(self.ruta, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # -------------------
+    # Escritura
+    # -------------------
+    def registrar(self, user_id, titulo):
+        """Anota una vista; no bloquea (la escritura la hace el hilo escritor)"""
+        with self._lock:
+            self._pendientes.append((user_id, titulo, time.time()))
+            if len(self._pendientes) > self.max_pendientes:
+                # El disco no acepta escrituras desde hace rato: se pierden las vistas más antiguas
+                sobran = len(self._pendientes) - self.max_pendientes
+                del self._pendientes[:sobran]
+                self.descartadas += sobran
+            if len(self._pendientes) >= self.lote:
+                self._hay_pendientes.set()
+
+    def _bucle_escritor(self):
+        conn = self._conectar()
+        espera = self.intervalo
+        try:
+            while True:
+                self._hay_pendientes.wait(espera)
+                self._hay_pendientes.clear()
+                if self._cerrado:
+                    # Al cerrar, unos pocos intentos más y se da por perdido lo que quede
+                    for intento in range(3):
+                        if self._volcar(conn):
+                            return
+                        time.sleep(0.5 * (intento + 1))
+                    logging.error("Historial: %d vistas sin volcar al cerrar", len(self._pendientes))
+                    return
+                if self._volcar(conn):
+                    espera = self.intervalo
+                else:
+                    espera = min(espera * 2, MAX_ESPERA_REINTENTO)
+        finally:
+            conn.close()
+
+    def _volcar(self, conn):
+        """True si no queda nada por volcar; False si el volcado falló y hay que reintentar"""
+        with self._lock:
+            lote = self._pendientes[:]
+            if not lote:
+                return True
+            self._secuencia += 1
+
+        usuarios = {user_id for user_id, _, _ in lote}
+        try:
+            with conn:
+                conn.executemany("INSERT INTO vistas (user_id, titulo, fecha) VALUES (?, ?, ?)", lote)
+                # Búfer circular: solo se conservan las últimas max_por_usuario vistas de cada usuario
+                conn.executemany(
+                    "DELETE FROM vistas WHERE user_id = ? AND id <= "
+                    "(SELECT id FROM vistas WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    [(u, u, self.max_por_usuario) for u in usuarios]
+                )
+        except sqlite3.Error as e:
+            # La transacción se deshizo: el lote sigue en pendientes y se reintentará
+            with self._lock:
+                self._secuencia += 1
+            self.errores += 1
+            logging.warning("No se pudo volcar el historial (%d vistas): %s", len(lote), e)
+            return False
+        with self._lock:
+            # Lo volcado sale de pendientes solo cuando ya está en disco. Si mientras
+            # tanto registrar() recortó pendientes, lo recortado sale primero del lote.
+            volcadas = len(lote)
+            while volcadas and self._pendientes and self._pendientes[0] is not lote[-volcadas]:
+                volcadas -= 1
+            del self._pendientes[:volcadas]
+            self._secuencia += 1
+        self.escrituras += len(lote)
+        self.lotes += 1
+        return True
+
+    def cerrar(self):
+        """Vuelca lo pendiente y detiene el hilo escritor"""
+        self._cerrado = True
+        self._hay_pendientes.set()
+        self._escritor.join()
+        with self._lock_lectura:
+            self._lectura.close()
+
+    # -------------------
+    # Lectura
+    # -------------------
+    def _leer(self, user_id, n):
+        with self._lock_lectura:
+            filas = self._lectura.execute(
+                "SELECT titulo FROM vistas WHERE user_id = ? ORDER BY id DESC LIMIT ?", (user_id, n)
+            ).fetchall()
+        return [titulo for (titulo,) in reversed(filas)]
+
+    def ultimos_sync(self, user_id, n=10):
+        """
+        Últimos n títulos del usuario, del más antiguo al más reciente. Si un
+        volcado no termina en ESPERA_LECTURA segundos, devuelve lo leído aunque
+        alguna vista pueda salir repetida.
+        """
+        limite = time.monotonic() + ESPERA_LECTURA
+        while True:
+            with self._lock:
+                secuencia = self._secuencia
+                pendientes = [titulo for u, titulo, _ in self._pendientes if u == user_id]
+            if len(pendientes) >= n:
+                return pendientes[-n:]
+            guardados = self._leer(user_id, n)
+            # Si se volcó un lote mientras leíamos, lo pendiente podría estar ya en disco: repetir
+            with self._lock:
+                if secuencia == self._secuencia and secuencia % 2 == 0:
+                    return (guardados + pendientes)[-n:]
+            if time.monotonic() > limite:
+                return (guardados + pendientes)[-n:]
+            time.sleep(0.001)
+
+    async def ultimos(self, user_id, n=10):
+        return await asyncio.get_running_loop().run_in_executor(None, self.ultimos_sync, user_id, n)
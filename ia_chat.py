@@ -0,0 +1,177 @@
+# ia_chat.py
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from groq import AsyncGroq
+import metricas
+
+MODELO = "llama-3.3-70b-versatile"
+
+SYSTEM_PROMPT = """Eres CineClass Bot, un asistente amigable y experto en películas y series.
+                Tu trabajo es ayudar a los usuarios a encontrar contenido para ver y mantener
+                conversaciones entretenidas sobre cine y TV. Sé conciso (máximo 3-4 líneas),
+                amigable y usa emojis ocasionalmente. Si te preguntan sobre recomendaciones
+                específicas de títulos, sugiere que escriban el nombre de la película/serie o
+                usen los botones del bot para explorar."""
+
+MENSAJE_SATURADO = "🍿 Estoy atendiendo muchas conversaciones a la vez. Prueba de nuevo en unos segundos o escribe el nombre de una película/serie 🎬"
+MENSAJE_TIMEOUT = "⏳ La IA está tardando demasiado en responder. Mientras tanto, puedes buscar escribiendo el nombre de una película/serie 🎬"
+MENSAJE_AUTH = "🔑 Error de autenticación con la IA. El administrador necesita verificar la API key. Mientras tanto, ¿qué película o serie buscas? 🎬"
+MENSAJE_RATE_LIMIT = "⏰ Demasiadas consultas. Espera un momento e intenta de nuevo. Mientras, puedes buscar películas escribiendo el nombre 🎬"
+MENSAJE_ERROR = "Hmm, tuve un problema técnico 🤔 Pero puedo ayudarte! Escribe el nombre de una película/serie o usa los botones para explorar 🎬"
+
+# Llamadas a Groq: duración por resultado, tokens y errores por clase
+GROQ_SEGUNDOS = metricas.Histograma("cineclass_groq_segundos", "Duración de las llamadas a Groq", ("resultado",))
+GROQ_TOKENS = metricas.Contador("cineclass_groq_tokens_total", "Tokens consumidos en Groq", ("tipo",))
+GROQ_ERRORES = metricas.Contador("cineclass_groq_errores_total", "Mensajes de IA sin respuesta por clase de error",
+                                 ("clase",))
+
+
+def normalizar_mensaje(texto):
+    """Minúsculas, sin acentos, sin signos y con espacios colapsados"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r'[^\w\s]', ' ', texto)
+    return ' '.join(texto.split())
+
+
+class CacheRespuestas:
+    """
+    Caché LRU con TTL para respuestas de la IA.
+    La clave combina el mensaje normalizado con una huella de la cola
+    reciente de la conversación.
+    """
+
+    def __init__(self, max_entradas=512, ttl=600.0, mensajes_contexto=4):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.mensajes_contexto = mensajes_contexto
+        self._datos = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clave(self, user_message, conversation_history=None):
+        huella = hashlib.blake2b(digest_size=8)
+        for msg in (conversation_history or [])[-self.mensajes_contexto:]:
+            huella.update(msg['role'].encode())
+            huella.update(b'\x00')
+            huella.update(normalizar_mensaje(msg['content']).encode())
+            huella.update(b'\x01')
+        return (normalizar_mensaje(user_message), huella.hexdigest())
+
+    def obtener(self, clave):
+        entrada = self._datos.get(clave)
+        if entrada is None or entrada[0] < time.monotonic():
+            if entrada is not None:
+                del self._datos[clave]
+            self.misses += 1
+            return None
+        self._datos.move_to_end(clave)
+        self.hits += 1
+        return entrada[1]
+
+    def guardar(self, clave, respuesta):
+        self._datos[clave] = (time.monotonic() + self.ttl, respuesta)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+
+    def estadisticas(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entradas": len(self._datos),
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+class MotorChatIA:
+    """
+    Motor de chat asíncrono sobre Groq.
+    Limita las llamadas simultáneas, acota la cola de espera y aplica un
+    timeout por llamada, devolviendo un mensaje amable en vez de bloquear al bot.
+    """
+
+    def __init__(self, api_key, max_concurrencia=4, max_cola=20, timeout=20.0, modelo=MODELO, cache=None):
+        self.cache = cache
+        self.client = AsyncGroq(api_key=api_key, timeout=timeout)
+        self.modelo = modelo
+        self.timeout = timeout
+        self.max_concurrencia = max_concurrencia
+        self.max_cola = max_cola
+        self._semaforo = asyncio.Semaphore(max_concurrencia)
+        self._pendientes = 0
+
+    async def responder(self, user_message, conversation_history=None):
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if conversation_history:
+            messages.extend(conversation_history[-10:])
+        messages.append({"role": "user", "content": user_message})
+
+        clave = None
+        if self.cache is not None:
+            clave = self.cache.clave(user_message, conversation_history)
+            respuesta = self.cache.obtener(clave)
+            if respuesta is not None:
+                return respuesta
+
+        # Llamadas en curso + en espera: si se supera el límite, descartamos en el acto
+        if self._pendientes >= self.max_concurrencia + self.max_cola:
+            logging.warning("Cola de IA llena, descartando mensaje")
+            GROQ_ERRORES.inc("ColaLlena")
+            return MENSAJE_SATURADO
+
+        self._pendientes += 1
+        try:
+            # La espera de turno ya la acota max_cola; el timeout solo cubre la llamada a
+            # Groq (un wait_for sobre acquire() puede perder el permiso si vence a la vez)
+            async with self._semaforo:
+                inicio = time.perf_counter()
+                try:
+                    chat_completion = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            messages=messages,
+                            model=self.modelo,
+                            temperature=0.7,
+                            max_tokens=200,
+                        ),
+                        timeout=self.timeout
+                    )
+                    GROQ_SEGUNDOS.observar(time.perf_counter() - inicio, "ok")
+                    if chat_completion.usage is not None:
+                        GROQ_TOKENS.inc("prompt", cantidad=chat_completion.usage.prompt_tokens)
+                        GROQ_TOKENS.inc("completion", cantidad=chat_completion.usage.completion_tokens)
+                    respuesta = chat_completion.choices[0].message.content
+                    # Solo cacheamos respuestas reales, nunca los mensajes de error
+                    if clave is not None and respuesta:
+                        self.cache.guardar(clave, respuesta)
+                    return respuesta
+                except asyncio.TimeoutError:
+                    logging.error(f"Timeout en Groq tras {self.timeout}s")
+                    GROQ_SEGUNDOS.observar(time.perf_counter() - inicio, "timeout")
+                    GROQ_ERRORES.inc("Timeout")
+                    return MENSAJE_TIMEOUT
+                except Exception as e:
+                    GROQ_SEGUNDOS.observar(time.perf_counter() - inicio, "error")
+                    GROQ_ERRORES.inc(type(e).__name__)
+                    return self._mensaje_error(e)
+        finally:
+            self._pendientes -= 1
+
+    @staticmethod
+    def _mensaje_error(e):
+        error_msg = str(e)
+        logging.error(f"Error en Groq: {error_msg}")
+
+        # Mensajes de error más específicos
+        if "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
+            return MENSAJE_AUTH
+        elif "rate_limit" in error_msg.lower():
+            return MENSAJE_RATE_LIMIT
+        else:
+            return MENSAJE_ERROR
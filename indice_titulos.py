@@ -0,0 +1,191 @@
+# indice_titulos.py
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+import numpy as np
+from catalogo import TablaTextos
+
+
+def normalizar_titulo(texto):
+    """Minúsculas, sin acentos y solo letras/números separados por un espacio"""
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w]+', ' ', texto).split())
+
+
+def trigramas(texto):
+    if len(texto) < 3:
+        return {texto} if texto else set()
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class _VistaOrdenada:
+    """Secuencia de títulos normalizados en orden alfabético, para bisect"""
+
+    __slots__ = ('textos', 'orden')
+
+    def __init__(self, textos, orden):
+        self.textos = textos
+        self.orden = orden
+
+    def __len__(self):
+        return len(self.orden)
+
+    def __getitem__(self, i):
+        return self.textos[self.orden[i]]
+
+
+class IndiceTitulos:
+    """
+    Índice de búsqueda de títulos construido una sola vez al cargar el catálogo.
+    Ordena los resultados así: coincidencia exacta, prefijo, subcadena y por
+    último parecido por trigramas. Dentro de cada grupo se respeta el orden del
+    CSV (TMDB los devuelve por popularidad).
+
+    Todo se guarda en arrays planos (sin dicts por título ni por trigrama) para
+    poder guardarlo en el snapshot y cargarlo con mmap.
+    """
+
+    ARRAYS = ('normalizados_datos', 'normalizados_offsets', 'n_trigramas', 'orden',
+              'trigramas_datos', 'trigramas_offsets', 'postings_offsets', 'postings')
+
+    def __init__(self, normalizados, n_trigramas, orden, claves_trigramas, postings_offsets, postings):
+        self.normalizados = normalizados
+        self._n_trigramas = n_trigramas
+        self._orden = orden
+        self._ordenados = _VistaOrdenada(normalizados, orden)
+        self._claves_trigramas = claves_trigramas
+        self._postings_offsets = postings_offsets
+        self._postings = postings
+
+    @classmethod
+    def construir(cls, titulos):
+        normalizados = [normalizar_titulo(t) for t in titulos]
+        n_trigramas = np.zeros(len(normalizados), dtype=np.int16)
+
+        postings = defaultdict(list)
+        for fila, titulo in enumerate(normalizados):
+            tris = trigramas(titulo)
+            n_trigramas[fila] = len(tris)
+            for tri in tris:
+                postings[tri].append(fila)
+
+        # Trigramas ordenados con sus filas contiguas en un solo array (tipo CSR)
+        claves = sorted(postings)
+        postings_offsets = np.zeros(len(claves) + 1, dtype=np.int64)
+        np.cumsum([len(postings[c]) for c in claves], out=postings_offsets[1:])
+        planos = np.fromiter(
+            (fila for c in claves for fila in postings[c]),
+            dtype=np.int32, count=int(postings_offsets[-1])
+        )
+
+        orden = np.array(
+            sorted(range(len(normalizados)), key=lambda i: (normalizados[i], i)),
+            dtype=np.int32
+        )
+        return cls(
+            TablaTextos.desde_lista(normalizados), n_trigramas, orden,
+            TablaTextos.desde_lista(claves), postings_offsets, planos
+        )
+
+    def arrays(self):
+        """Arrays que definen el índice, para guardarlo en disco"""
+        return {
+            'normalizados_datos': self.normalizados.datos,
+            'normalizados_offsets': self.normalizados.offsets,
+            'n_trigramas': self._n_trigramas,
+            'orden': self._orden,
+            'trigramas_datos': self._claves_trigramas.datos,
+            'trigramas_offsets': self._claves_trigramas.offsets,
+            'postings_offsets': self._postings_offsets,
+            'postings': self._postings,
+        }
+
+    @classmethod
+    def desde_arrays(cls, a):
+        return cls(
+            TablaTextos(a['normalizados_datos'], a['normalizados_offsets']),
+            a['n_trigramas'], a['orden'],
+            TablaTextos(a['trigramas_datos'], a['trigramas_offsets']),
+            a['postings_offsets'], a['postings']
+        )
+
+    def __len__(self):
+        return len(self._orden)
+
+    def _filas_trigrama(self, tri):
+        pos = bisect_left(self._claves_trigramas, tri)
+        if pos == len(self._claves_trigramas) or self._claves_trigramas[pos] != tri:
+            return None
+        return self._postings[self._postings_offsets[pos]:self._postings_offsets[pos + 1]]
+
+    def exactos(self, consulta):
+        """Filas cuyo título normalizado es exactamente `consulta`, en orden de fila"""
+        filas = []
+        for pos in range(bisect_left(self._ordenados, consulta), len(self._ordenados)):
+            if self._ordenados[pos] != consulta:
+                break
+            filas.append(int(self._orden[pos]))
+        return filas
+
+    def _por_prefijo(self, consulta, limite):
+        inicio = bisect_left(self._ordenados, consulta)
+        filas = []
+        for pos in range(inicio, len(self._ordenados)):
+            if not self._ordenados[pos].startswith(consulta):
+                break
+            filas.append(int(self._orden[pos]))
+            if len(filas) >= limite * 4:
+                break
+        filas.sort(key=lambda f: (len(self.normalizados[f]), f))
+        return filas
+
+    def buscar(self, texto, limite=10, umbral=0.4):
+        """Devuelve hasta `limite` filas ordenadas de mejor a peor coincidencia"""
+        consulta = normalizar_titulo(texto)
+        if not consulta:
+            return []
+
+        resultados = []
+        vistos = set()
+
+        def agregar(filas):
+            for fila in filas:
+                if fila not in vistos:
+                    vistos.add(fila)
+                    resultados.append(fila)
+                    if len(resultados) >= limite:
+                        return True
+            return False
+
+        if agregar(self.exactos(consulta)):
+            return resultados
+        if agregar(self._por_prefijo(consulta, limite)):
+            return resultados
+
+        tris_consulta = trigramas(consulta)
+        listas = [self._filas_trigrama(t) for t in tris_consulta]
+        listas = [filas for filas in listas if filas is not None]
+        if not listas:
+            return resultados
+
+        # bincount es O(postings + n) y bastante más rápido que np.unique
+        conteos = np.bincount(np.concatenate(listas), minlength=len(self))
+        candidatos = np.flatnonzero(conteos)
+        compartidos = conteos[candidatos]
+
+        # Subcadenas: contienen todos los trigramas de la consulta
+        completos = candidatos[compartidos == len(tris_consulta)]
+        subcadenas = [int(f) for f in completos if consulta in self.normalizados[f]]
+        subcadenas.sort(key=lambda f: (len(self.normalizados[f]), f))
+        if agregar(subcadenas):
+            return resultados
+
+        # Parecido por trigramas (Jaccard)
+        jaccard = compartidos / (len(tris_consulta) + self._n_trigramas[candidatos] - compartidos)
+        mask = jaccard >= umbral
+        candidatos, jaccard = candidatos[mask], jaccard[mask]
+        orden = np.lexsort((candidatos, -jaccard))
+        agregar(int(f) for f in candidatos[orden])
+        return resultados
@@ -0,0 +1,281 @@
+# metricas.py
+"""
+Métricas en formato Prometheus, sin dependencias extra.
+
+Contadores e histogramas con etiquetas que se actualizan en memoria (una
+suma y una búsqueda binaria por observación, ~1 µs), más métricas
+calculadas que se leen solo cuando Prometheus consulta el endpoint (las
+tasas de acierto de las cachés salen de sus estadisticas()). servir()
+expone GET /metrics en un hilo aparte, así que la consulta no pasa por el
+bucle de asyncio del bot.
+
+    CONSULTAS = Histograma("cineclass_consulta_segundos", "Consultas al catálogo", ("consulta",))
+
+    @medir(CONSULTAS)
+    def buscar(...):
+        ...
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Límites de los cubos en segundos: LIMITES para llamadas de red y handlers,
+# LIMITES_RAPIDOS para operaciones en memoria (consultas al catálogo)
+LIMITES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LIMITES_RAPIDOS = (1e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.05, 0.25)
+
+_registro = {}  # {nombre: métrica}, en orden de creación
+_lock_registro = threading.Lock()
+
+
+def _registrar(metrica):
+    with _lock_registro:
+        if metrica.nombre in _registro:
+            raise ValueError(f"Métrica duplicada: {metrica.nombre}")
+        _registro[metrica.nombre] = metrica
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _etiquetas(nombres, valores, extra=""):
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# -------------------
+# Tipos de métrica
+# -------------------
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}
+        _registrar(self)
+
+    def hijo(self, *valores):
+        """Serie de unos valores de etiqueta concretos (guárdala para no buscarla cada vez)"""
+        serie = self._series.get(valores)
+        if serie is None:
+            if len(valores) != len(self.etiquetas):
+                raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+            serie = self._series.setdefault(valores, self._nueva_serie())
+        return serie
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for valores, serie in list(self._series.items()):
+            lineas.extend(self._lineas(valores, serie))
+        return lineas
+
+
+class _SerieContador:
+    __slots__ = ("valor",)
+
+    def __init__(self):
+        self.valor = 0
+
+    def inc(self, cantidad=1):
+        self.valor += cantidad
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def _nueva_serie(self):
+        return _SerieContador()
+
+    def inc(self, *valores, cantidad=1):
+        self.hijo(*valores).inc(cantidad)
+
+    def _lineas(self, valores, serie):
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(serie.valor)}"]
+
+
+class _SerieHistograma:
+    __slots__ = ("limites", "cuentas", "suma")
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+
+    def observar(self, valor):
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES):
+        self.limites = tuple(sorted(limites))
+        super().__init__(nombre, ayuda, etiquetas)
+
+    def _nueva_serie(self):
+        return _SerieHistograma(self.limites)
+
+    def observar(self, valor, *valores):
+        self.hijo(*valores).observar(valor)
+
+    def _lineas(self, valores, serie):
+        cuentas, suma = list(serie.cuentas), serie.suma
+        lineas, acumulado = [], 0
+        for limite, cuenta in zip(self.limites + (float("inf"),), cuentas):
+            acumulado += cuenta
+            le = f'le="{_numero(float(limite))}"'
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {acumulado}")
+        etiquetas = _etiquetas(self.etiquetas, valores)
+        lineas.append(f"{self.nombre}_sum{etiquetas} {_numero(suma)}")
+        lineas.append(f"{self.nombre}_count{etiquetas} {acumulado}")
+        return lineas
+
+
+class Calculada(_Metrica):
+    """
+    Métrica que se calcula al consultar el endpoint: funcion() devuelve
+    {valores de etiqueta: valor}. Sin coste alguno por update.
+
+    funcion() se ejecuta en el hilo del endpoint, no en el bucle de asyncio:
+    solo debe leer contadores sueltos (int/float) que su dueño actualiza, nunca
+    recorrer dicts o colas que el bucle puede estar modificando a la vez.
+    """
+
+    def __init__(self, nombre, ayuda, tipo, etiquetas, funcion):
+        self.tipo = tipo
+        self.funcion = funcion
+        super().__init__(nombre, ayuda, etiquetas)
+
+    def exponer(self):
+        try:
+            valores = self.funcion()
+        except Exception:
+            logging.exception("No se pudo calcular la métrica %s", self.nombre)
+            valores = {}
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for etiquetas, valor in valores.items():
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}")
+        return lineas
+
+
+# -------------------
+# Ayudas
+# -------------------
+def medir(histograma, *valores, errores=None):
+    """
+    Decorador que observa en `histograma` la duración de cada llamada (síncrona
+    o asíncrona). Sin `valores`, la etiqueta es el nombre de la función. Si se
+    da un Contador `errores` (etiquetas: las mismas + clase), cuenta las
+    excepciones por clase.
+    """
+    def decorador(funcion):
+        etiquetas = valores or (funcion.__name__,)
+        serie = histograma.hijo(*etiquetas)
+        reloj = time.perf_counter
+
+        def fallo(e):
+            if errores is not None:
+                errores.inc(*etiquetas, type(e).__name__)
+
+        if asyncio.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltorio(*args, **kwargs):
+                inicio = reloj()
+                try:
+                    return await funcion(*args, **kwargs)
+                except Exception as e:
+                    fallo(e)
+                    raise
+                finally:
+                    serie.observar(reloj() - inicio)
+        else:
+            @functools.wraps(funcion)
+            def envoltorio(*args, **kwargs):
+                inicio = reloj()
+                try:
+                    return funcion(*args, **kwargs)
+                except Exception as e:
+                    fallo(e)
+                    raise
+                finally:
+                    serie.observar(reloj() - inicio)
+        return envoltorio
+    return decorador
+
+def registrar_caches(fuentes):
+    """
+    Aciertos, fallos y tasa de acierto de cada caché ({nombre: función que
+    devuelve la caché o None}). Se leen sus contadores `hits` y `misses`, no
+    sus estadisticas(): estas recorren estructuras del bucle de asyncio.
+    """
+    def contadores():
+        resultado = {}
+        for nombre, fuente in fuentes.items():
+            cache = fuente()
+            if cache is not None:
+                resultado[nombre] = (cache.hits, cache.misses)
+        return resultado
+
+    def tasa(hits, misses):
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    Calculada("cineclass_cache_aciertos_total", "Lecturas servidas desde la caché", "counter", ("cache",),
+              lambda: {(nombre,): h for nombre, (h, m) in contadores().items()})
+    Calculada("cineclass_cache_fallos_total", "Lecturas que no estaban en la caché", "counter", ("cache",),
+              lambda: {(nombre,): m for nombre, (h, m) in contadores().items()})
+    Calculada("cineclass_cache_tasa_aciertos", "Fracción de lecturas servidas desde la caché", "gauge", ("cache",),
+              lambda: {(nombre,): tasa(h, m) for nombre, (h, m) in contadores().items()})
+
+def texto():
+    """Todas las métricas registradas en el formato de texto de Prometheus"""
+    with _lock_registro:
+        metricas = list(_registro.values())
+    lineas = []
+    for metrica in metricas:
+        lineas.extend(metrica.exponer())
+    return "\n".join(lineas) + "\n"
+
+
+# -------------------
+# Endpoint HTTP
+# -------------------
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        datos = texto().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def servir(puerto, host="0.0.0.0"):
+    """Sirve GET /metrics en un hilo en segundo plano y devuelve el servidor"""
+    srv = _Servidor((host, puerto), _ManejadorMetricas)
+    threading.Thread(target=srv.serve_forever, name="metricas", daemon=True).start()
+    logging.info("Métricas en http://%s:%d/metrics", host, puerto)
+    return srv
@@ -0,0 +1,209 @@
+# paginacion.py
+"""
+Paginación de listas largas ("🔄 Ver más" en géneros y filtros).
+
+Cada lista es un conjunto de filas ya precalculado (índice de géneros o
+cubo de filtros) recorrido en un orden estable:
+- azar: permutación pseudoaleatoria determinada por una semilla elegida al
+  abrir la lista, así cada usuario ve su propio orden y nunca se repite
+  un título hasta terminar la lista.
+- nota: de mejor a peor valorado; la ordenación se calcula una vez por
+  conjunto y generación del catálogo.
+
+Todo lo necesario para pedir la página siguiente viaja en un cursor
+compacto dentro del callback_data (máximo 64 bytes en Telegram), sin
+estado en el servidor. Calcular una página cuesta O(tamaño de página):
+la permutación se evalúa solo en las posiciones de esa página.
+"""
+import random
+import re
+from collections import OrderedDict, namedtuple
+import numpy as np
+import utils_db
+
+PREFIJO = "pg|"
+LIMITE_CALLBACK = 64  # bytes de callback_data que admite Telegram
+
+AZAR, NOTA = "a", "n"
+BITS_SEMILLA = 32
+MAX_DESDE = 36 ** 4 - 1  # posición más alta que se reserva al validar claves (4 dígitos en base 36)
+RONDAS_FEISTEL = 4
+
+# Conjuntos paginables: {código: función(clave, estado) → filas}
+CONJUNTOS = {
+    "g": lambda clave, actual: utils_db.filas_por_genero(clave, actual),
+    "f": lambda clave, actual: utils_db.filtrar_filas(*clave.split("|", 1), actual=actual),
+}
+
+Cursor = namedtuple("Cursor", "conjunto clave orden semilla desde generacion")
+Pagina = namedtuple("Pagina", "filas total desde siguiente anterior")
+_BASE36 = re.compile(r"[0-9a-z]+")
+
+
+# -------------------
+# Cursores
+# -------------------
+def _base36(numero):
+    digitos = "0123456789abcdefghijklmnopqrstuvwxyz"
+    texto = ""
+    while True:
+        numero, resto = divmod(numero, 36)
+        texto = digitos[resto] + texto
+        if not numero:
+            return texto
+
+def codificar(cursor):
+    """'pg|g|a1x2y3|k|a1b2c3|Drama': conjunto, orden+semilla, desde, generación y clave (al final, puede llevar '|')"""
+    datos = (f"{PREFIJO}{cursor.conjunto}|{cursor.orden}{_base36(cursor.semilla)}|"
+             f"{_base36(cursor.desde)}|{cursor.generacion}|{cursor.clave}")
+    if len(datos.encode("utf-8")) > LIMITE_CALLBACK:
+        raise ValueError(f"Cursor de {len(datos.encode('utf-8'))} bytes, el máximo es {LIMITE_CALLBACK}: {datos!r}")
+    return datos
+
+def _entero36(texto, maximo):
+    # int(texto, 36) también admite signo, espacios y '_': el callback_data puede venir manipulado
+    if not _BASE36.fullmatch(texto):
+        raise ValueError(f"Número en base 36 no válido: {texto!r}")
+    numero = int(texto, 36)
+    if numero > maximo:
+        raise ValueError(f"Número fuera de rango: {texto!r}")
+    return numero
+
+def parsear(resto):
+    """Cursor a partir del callback_data sin PREFIJO; ValueError si no es válido"""
+    try:
+        conjunto, orden_semilla, desde, generacion, clave = resto.split("|", 4)
+        cursor = Cursor(conjunto, clave, orden_semilla[:1], _entero36(orden_semilla[1:], 2 ** BITS_SEMILLA - 1),
+                        _entero36(desde, MAX_DESDE), generacion)
+    except IndexError:
+        raise ValueError(f"Cursor incompleto: {resto!r}")
+    if cursor.conjunto not in CONJUNTOS or cursor.orden not in (AZAR, NOTA):
+        raise ValueError(f"Cursor desconocido: {resto!r}")
+    return cursor
+
+def clave_paginable(conjunto, prefijo=""):
+    """
+    Parser de rutas para el texto con el que se abre una lista: lo acepta
+    solo si cualquier cursor sobre `prefijo + texto` cabe en el callback_data
+    (semilla y posición máximas); si no, ValueError y el botón se trata como
+    inválido en lugar de fallar al codificar la página.
+    """
+    def parsear_clave(texto):
+        peor = Cursor(conjunto, prefijo + texto, AZAR, 2 ** BITS_SEMILLA - 1, MAX_DESDE,
+                      "x" * utils_db.LARGO_GENERACION)
+        codificar(peor)
+        return texto
+    return parsear_clave
+
+def decodificar(datos):
+    """Cursor a partir del callback_data, o None si no es un cursor válido"""
+    if not datos.startswith(PREFIJO):
+        return None
+    try:
+        return parsear(datos[len(PREFIJO):])
+    except ValueError:
+        return None
+
+def nuevo_cursor(conjunto, clave, orden=AZAR, actual=None):
+    """Cursor de la primera página, con una semilla nueva si el orden es al azar"""
+    actual = actual or utils_db.estado_actual()
+    semilla = random.getrandbits(BITS_SEMILLA) if orden == AZAR else 0
+    return Cursor(conjunto, clave, orden, semilla, 0, actual.generacion)
+
+
+# -------------------
+# Permutación sin materializar
+# -------------------
+def _claves_rondas(semilla):
+    """Claves de ronda derivadas de la semilla (splitmix64)"""
+    claves, estado = [], semilla
+    for _ in range(RONDAS_FEISTEL):
+        estado = (estado + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        z = estado
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        claves.append(np.uint64(z ^ (z >> 31)))
+    return claves
+
+def permutar(posiciones, n, semilla):
+    """
+    Imagen de `posiciones` (enteros en [0, n)) por una permutación
+    pseudoaleatoria de range(n) fijada por la semilla. Es una red de
+    Feistel sobre el menor dominio 4^b >= n; los valores que caen fuera
+    de [0, n) se vuelven a cifrar hasta entrar (cycle-walking).
+    ValueError si alguna posición está fuera de [0, n): el ciclo podría no
+    volver nunca a entrar.
+    """
+    posiciones = np.asarray(posiciones, dtype=np.int64)
+    if len(posiciones) and (posiciones.min() < 0 or posiciones.max() >= n):
+        raise ValueError(f"Posiciones fuera de [0, {n})")
+    posiciones = posiciones.astype(np.uint64)
+    if n <= 1:
+        return posiciones.astype(np.int64)
+    mitad = (max(2, (n - 1).bit_length()) + 1) // 2
+    mascara = np.uint64((1 << mitad) - 1)
+    desplazamiento = np.uint64(mitad)
+    altos = np.uint64(64 - mitad)
+    claves = _claves_rondas(semilla)
+
+    def cifrar(x):
+        izquierda, derecha = x >> desplazamiento, x & mascara
+        for clave in claves:
+            # Hash multiplicativo: los bits altos del producto son los que mejor mezclan
+            mezcla = (derecha ^ clave) * np.uint64(0xBF58476D1CE4E5B9)
+            mezcla ^= mezcla >> np.uint64(31)
+            mezcla *= np.uint64(0x94D049BB133111EB)
+            izquierda, derecha = derecha, izquierda ^ (mezcla >> altos)
+        return (izquierda << desplazamiento) | derecha
+
+    resultado = cifrar(posiciones)
+    fuera = resultado >= np.uint64(n)
+    while fuera.any():
+        resultado[fuera] = cifrar(resultado[fuera])
+        fuera = resultado >= np.uint64(n)
+    return resultado.astype(np.int64)
+
+
+# -------------------
+# Páginas
+# -------------------
+class Paginador:
+    def __init__(self, max_ordenes=256):
+        self.max_ordenes = max_ordenes
+        self._por_nota = OrderedDict()  # {(versión del catálogo, conjunto, clave): filas de mejor a peor nota}, LRU
+
+    def _ordenadas_por_nota(self, cursor, filas, actual):
+        clave = (actual.version, cursor.conjunto, cursor.clave)
+        ordenadas = self._por_nota.get(clave)
+        if ordenadas is None:
+            ordenadas = filas[np.argsort(-actual.contenido.ratings[filas], kind='stable')]
+            self._por_nota[clave] = ordenadas
+            if len(self._por_nota) > self.max_ordenes:
+                self._por_nota.popitem(last=False)
+        else:
+            self._por_nota.move_to_end(clave)
+        return ordenadas
+
+    def pagina(self, cursor, tamano, actual=None):
+        """
+        Filas de la página del cursor y cursores codificados de la siguiente
+        y la anterior (None en los extremos). Si el catálogo se recargó desde
+        que se creó el cursor, se vuelve a la primera página.
+        """
+        actual = actual or utils_db.estado_actual()
+        if cursor.generacion != actual.generacion:
+            cursor = cursor._replace(desde=0, generacion=actual.generacion)
+
+        filas = CONJUNTOS[cursor.conjunto](cursor.clave, actual)
+        total = len(filas)
+        desde = max(0, min(cursor.desde, total - 1))
+        hasta = min(desde + tamano, total)
+
+        if cursor.orden == NOTA:
+            elegidas = self._ordenadas_por_nota(cursor, filas, actual)[desde:hasta]
+        else:
+            elegidas = filas[permutar(np.arange(desde, hasta), total, cursor.semilla)]
+
+        siguiente = codificar(cursor._replace(desde=hasta)) if hasta < total else None
+        anterior = codificar(cursor._replace(desde=max(0, desde - tamano))) if desde > 0 else None
+        return Pagina([int(i) for i in elegidas], total, desde, siguiente, anterior)
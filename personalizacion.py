@@ -0,0 +1,124 @@
+# personalizacion.py
+"""
+Recomendaciones "Para ti" a partir del historial de cada usuario.
+
+El perfil de un usuario es la suma de las filas TF-IDF de los títulos que
+ha visto, con más peso para las vistas recientes. Se actualiza de forma
+incremental con cada vista; solo se reconstruye desde el historial cuando
+no está en memoria o se publica otra versión del catálogo. Puntuar es un
+único producto disperso contra la matriz TF-IDF, y el resultado queda en
+caché hasta la siguiente vista del usuario.
+"""
+from collections import OrderedDict
+import numpy as np
+import utils_db
+
+DECAIMIENTO = 0.9  # peso relativo de cada vista respecto a la siguiente
+
+
+class _Perfil:
+    __slots__ = ("version", "vector", "vistas", "resultado")
+
+    def __init__(self, version, vector, vistas):
+        self.version = version  # EstadoCatalogo.version con el que se construyó
+        self.vector = vector  # fila dispersa (1, vocabulario)
+        self.vistas = vistas  # set de filas ya vistas
+        self.resultado = None  # filas recomendadas en caché
+
+
+class Personalizador:
+    def __init__(self, historial, max_vistas=50, max_usuarios=10000):
+        self.historial = historial
+        self.max_vistas = max_vistas
+        self.max_usuarios = max_usuarios
+        self._perfiles = OrderedDict()  # {user_id: _Perfil}, LRU
+        self._orden_por_nota = (None, None)  # (versión del catálogo, filas de mejor a peor nota)
+        self.hits = 0
+        self.misses = 0
+
+    def registrar_vista(self, user_id, fila, actual=None):
+        """Guarda la vista en el historial y actualiza el perfil en memoria si lo hay"""
+        actual = actual or utils_db.estado_actual()
+        self.historial.registrar(user_id, actual.contenido.titulos[fila])
+
+        perfil = self._perfiles.get(user_id)
+        if perfil is None or perfil.version != actual.version:
+            return
+        perfil.vector = perfil.vector * DECAIMIENTO + actual.tfidf_matrix[fila]
+        perfil.vistas.add(int(fila))
+        perfil.resultado = None
+
+    async def _perfil(self, user_id, actual):
+        perfil = self._perfiles.get(user_id)
+        if perfil is not None and perfil.version == actual.version:
+            self._perfiles.move_to_end(user_id)
+            return perfil
+
+        # Sin perfil en memoria (o de otro catálogo): se reconstruye desde el historial
+        titulos = await self.historial.ultimos(user_id, self.max_vistas)
+        filas = [utils_db.fila_por_titulo(t, actual) for t in titulos]
+        filas = [f for f in filas if f is not None]
+        if not filas:
+            return None
+
+        from scipy.sparse import csr_matrix
+
+        # La vista más reciente pesa 1, la anterior DECAIMIENTO, etc.
+        pesos = DECAIMIENTO ** np.arange(len(filas) - 1, -1, -1, dtype=np.float64)
+        vector = csr_matrix(pesos[np.newaxis, :]) @ actual.tfidf_matrix[filas]
+        perfil = _Perfil(actual.version, vector, set(filas))
+        self._perfiles[user_id] = perfil
+        if len(self._perfiles) > self.max_usuarios:
+            self._perfiles.popitem(last=False)
+        return perfil
+
+    def _mejor_nota(self, actual):
+        version, orden = self._orden_por_nota
+        if version != actual.version:
+            orden = np.argsort(-actual.contenido.ratings, kind='stable')
+            self._orden_por_nota = (actual.version, orden)
+        return orden
+
+    async def recomendar(self, user_id, n=10, actual=None):
+        """
+        Hasta n filas para el usuario, de más a menos afín, sin títulos ya
+        vistos. Si el perfil no da para n, se completa con los mejor valorados.
+        Devuelve [] si el usuario no tiene historial.
+        """
+        actual = actual or utils_db.estado_actual()
+        perfil = await self._perfil(user_id, actual)
+        if perfil is None:
+            return []
+        if perfil.resultado is not None and len(perfil.resultado) >= n:
+            self.hits += 1
+            return perfil.resultado[:n]
+        self.misses += 1
+
+        puntuaciones = (actual.tfidf_matrix @ perfil.vector.T).toarray().ravel()
+        vistas = np.fromiter(perfil.vistas, dtype=np.int64, count=len(perfil.vistas))
+        puntuaciones[vistas] = 0.0
+
+        candidatas = np.flatnonzero(puntuaciones > 0)
+        if len(candidatas) > n:
+            candidatas = candidatas[np.argpartition(-puntuaciones[candidatas], n - 1)[:n]]
+        filas = [int(i) for i in candidatas[np.argsort(-puntuaciones[candidatas], kind='stable')]]
+
+        if len(filas) < n:
+            elegidas = set(filas) | perfil.vistas
+            for fila in self._mejor_nota(actual):
+                if len(filas) >= n:
+                    break
+                if int(fila) not in elegidas:
+                    filas.append(int(fila))
+
+        perfil.resultado = filas
+        return filas
+
+    def estadisticas(self):
+        total = self.hits + self.misses
+        return {
+            "usuarios": len(self._perfiles),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,135 @@
+# precomputar.py
+"""
+Pasos de construcción offline para el bot.
+
+    python precomputar.py vecinos --csv movies_clean.csv --salida vecinos.npz
+    python precomputar.py snapshot --csv movies_clean.csv --salida catalogo.snapshot
+
+- vecinos: calcula los K vecinos más parecidos de cada título con productos
+  dispersos por bloques repartidos en un pool de procesos y los guarda en
+  un archivo compacto que el bot carga al arrancar.
+- snapshot: guarda catálogo, vocabulario TF-IDF, matriz dispersa e índice
+  de títulos en un formato binario que el bot abre con mmap.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# -------------------
+# Vecinos top-K
+# -------------------
+_matriz = None
+
+def _init_worker(matriz):
+    global _matriz
+    _matriz = matriz
+
+def _vecinos_bloque(args):
+    """Top-K de las filas [inicio, fin) contra todo el catálogo"""
+    inicio, fin, k = args
+    sims = (_matriz[inicio:fin] @ _matriz.T).toarray()
+
+    # Un título nunca es vecino de sí mismo
+    filas = np.arange(fin - inicio)
+    sims[filas, filas + inicio] = -1.0
+
+    k_real = min(k, sims.shape[1] - 1)
+    vecinos = np.full((fin - inicio, k), -1, dtype=np.int32)
+    puntuaciones = np.zeros((fin - inicio, k), dtype=np.float16)
+    if k_real <= 0:
+        return inicio, vecinos, puntuaciones
+
+    top = np.argpartition(-sims, k_real - 1, axis=1)[:, :k_real]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    orden = np.argsort(-top_sims, axis=1, kind='stable')
+    vecinos[:, :k_real] = np.take_along_axis(top, orden, axis=1)
+    puntuaciones[:, :k_real] = np.take_along_axis(top_sims, orden, axis=1)
+    return inicio, vecinos, puntuaciones
+
+def calcular_vecinos(matriz, k=20, bloque=256, procesos=None):
+    """
+    Devuelve (vecinos, puntuaciones) de forma (n, k). Las filas de la matriz
+    deben estar normalizadas (TF-IDF lo hace), así el producto es el coseno.
+    """
+    matriz = matriz.astype(np.float32).tocsr()
+    n = matriz.shape[0]
+    vecinos = np.empty((n, k), dtype=np.int32)
+    puntuaciones = np.empty((n, k), dtype=np.float16)
+
+    tareas = [(i, min(i + bloque, n), k) for i in range(0, n, bloque)]
+    procesos = procesos or os.cpu_count() or 1
+
+    if procesos == 1:
+        _init_worker(matriz)
+        resultados = map(_vecinos_bloque, tareas)
+    else:
+        pool = ProcessPoolExecutor(max_workers=procesos, initializer=_init_worker, initargs=(matriz,))
+        resultados = pool.map(_vecinos_bloque, tareas)
+
+    try:
+        for inicio, v, p in resultados:
+            vecinos[inicio:inicio + len(v)] = v
+            puntuaciones[inicio:inicio + len(p)] = p
+    finally:
+        if procesos != 1:
+            pool.shutdown()
+
+    return vecinos, puntuaciones
+
+def guardar_vecinos(ruta, vecinos, puntuaciones, huella):
+    # Se escribe aparte y se renombra: el bot puede estar vigilando el archivo para recargarlo
+    tmp = f"{ruta}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, vecinos=vecinos, puntuaciones=puntuaciones, huella=np.array(huella))
+    os.replace(tmp, ruta)
+
+def construir_vecinos(csv_file, salida, k=20, bloque=256, procesos=None):
+    import utils_db
+
+    utils_db.cargar_contenido(csv_file)
+    inicio = time.perf_counter()
+    vecinos, puntuaciones = calcular_vecinos(utils_db.tfidf_matrix, k=k, bloque=bloque, procesos=procesos)
+    guardar_vecinos(salida, vecinos, puntuaciones, utils_db.huella_catalogo())
+    print(f"✅ Vecinos top-{k} de {len(vecinos)} títulos guardados en {salida} "
+          f"({time.perf_counter() - inicio:.1f}s)")
+
+# -------------------
+# Snapshot binario
+# -------------------
+def construir_snapshot(csv_file, salida):
+    import utils_db
+
+    utils_db.cargar_contenido(csv_file)
+    inicio = time.perf_counter()
+    utils_db.guardar_snapshot(salida)
+    print(f"✅ Snapshot de {len(utils_db.contenido)} títulos guardado en {salida} "
+          f"({time.perf_counter() - inicio:.1f}s)")
+
+# -------------------
+# CLI
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description="Pasos de construcción offline de CineClass Bot")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_vecinos = sub.add_parser("vecinos", help="Precalcula los K títulos más parecidos de cada título")
+    p_vecinos.add_argument("--csv", default="movies_clean.csv")
+    p_vecinos.add_argument("--salida", default="vecinos.npz")
+    p_vecinos.add_argument("--k", type=int, default=20)
+    p_vecinos.add_argument("--bloque", type=int, default=256, help="Filas por producto disperso")
+    p_vecinos.add_argument("--procesos", type=int, default=None, help="Por defecto, uno por núcleo")
+
+    p_snapshot = sub.add_parser("snapshot", help="Genera el snapshot binario que carga el bot")
+    p_snapshot.add_argument("--csv", default="movies_clean.csv")
+    p_snapshot.add_argument("--salida", default="catalogo.snapshot")
+
+    args = parser.parse_args()
+    if args.comando == "vecinos":
+        construir_vecinos(args.csv, args.salida, k=args.k, bloque=args.bloque, procesos=args.procesos)
+    elif args.comando == "snapshot":
+        construir_snapshot(args.csv, args.salida)
+
+if __name__ == "__main__":
+    main()
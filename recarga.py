@@ -0,0 +1,90 @@
+# recarga.py
+"""
+Recarga del catálogo con el bot en marcha.
+
+El catálogo nuevo (snapshot o CSV, índices y vecinos) se construye en un
+hilo aparte mientras el bot sigue atendiendo con el anterior, y después se
+publica con una sola asignación desde el event loop. Los handlers que ya
+tenían el estado anterior terminan con él; los callbacks con filas de una
+generación anterior se remapean por título (ver utils_db.resolver_referencia).
+"""
+import asyncio
+import logging
+import os
+import time
+import utils_db
+
+logger = logging.getLogger(__name__)
+
+
+class RecargadorCatalogo:
+    def __init__(self, csv_file="movies_clean.csv", ruta_snapshot="catalogo.snapshot", ruta_vecinos="vecinos.npz"):
+        self.csv_file = csv_file
+        self.ruta_snapshot = ruta_snapshot
+        self.ruta_vecinos = ruta_vecinos
+        self.firma = self.calcular_firma()
+        self.recargas = 0
+        self._lock = asyncio.Lock()
+
+    def calcular_firma(self):
+        """(mtime, tamaño) de los archivos de origen; cambia cuando hay datos nuevos"""
+        if os.path.isdir(self.ruta_snapshot):
+            rutas = [os.path.join(self.ruta_snapshot, "manifest.json"), self.ruta_vecinos]
+        else:
+            rutas = [self.csv_file, self.ruta_vecinos]
+        firma = []
+        for ruta in rutas:
+            try:
+                st = os.stat(ruta)
+                firma.append((ruta, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                firma.append((ruta, None, None))
+        return tuple(firma)
+
+    def construir(self):
+        """Se ejecuta en un hilo: prepara el estado nuevo sin tocar el publicado"""
+        tiempos = {}
+        if os.path.isdir(self.ruta_snapshot):
+            nuevo = utils_db.construir_desde_snapshot(self.ruta_snapshot, tiempos)
+        else:
+            nuevo = utils_db.construir_desde_csv(self.csv_file, tiempos)
+        with utils_db.medir_fase("vecinos", tiempos):
+            utils_db.cargar_vecinos(self.ruta_vecinos, nuevo)
+        return nuevo, tiempos
+
+    async def recargar(self, forzar=False):
+        """
+        Reconstruye y publica el catálogo si los archivos cambiaron (o si
+        `forzar`). Devuelve el estado nuevo, o None si no hubo recarga.
+        """
+        if self._lock.locked():
+            return None
+        async with self._lock:
+            firma = self.calcular_firma()
+            if firma == self.firma and not forzar:
+                return None
+
+            inicio = time.perf_counter()
+            nuevo, tiempos = await asyncio.get_running_loop().run_in_executor(None, self.construir)
+            anterior = utils_db.estado
+            utils_db.publicar(nuevo)
+            self.firma = firma
+            self.recargas += 1
+
+            detalle = " · ".join(f"{fase} {segundos * 1000:.0f}ms" for fase, segundos in tiempos.items())
+            logger.info(
+                "Catálogo recargado: generación %s → %s, %d títulos en %.0fms (%s)",
+                anterior.generacion if anterior else "-", nuevo.generacion, len(nuevo.contenido),
+                (time.perf_counter() - inicio) * 1000, detalle
+            )
+            return nuevo
+
+    async def vigilar(self, intervalo=60.0):
+        """Comprueba los archivos cada `intervalo` segundos y recarga si cambiaron"""
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await self.recargar()
+            except Exception:
+                # Un archivo a medio escribir no tumba el bot: se sigue con el catálogo anterior
+                logger.exception("No se pudo recargar el catálogo; se mantiene el anterior")
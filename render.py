@@ -0,0 +1,163 @@
+# render.py
+"""
+Capa de presentación: menús y fichas que el bot envía en casi cada update.
+
+- Los menús estáticos (principal, géneros, filtros) se construyen una sola
+  vez; los InlineKeyboardMarkup son inmutables y se pueden compartir.
+- Las fichas de detalle, las de "Sorpréndeme" y los botones de las listas
+  dependen solo de la fila y del catálogo: se guardan en una LRU por fila,
+  una por cada versión publicada del catálogo (cada recarga publica una).
+"""
+from collections import OrderedDict
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+import utils_db
+
+LARGO_ETIQUETA = 60
+
+
+# -------------------
+# Menús estáticos
+# -------------------
+BOTON_MENU = InlineKeyboardButton("🏠 Menú principal", callback_data='menu')
+
+MENU_PRINCIPAL = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🎬 Buscar contenido", callback_data='browse_genres')],
+    [InlineKeyboardButton("✨ Para ti", callback_data='para_ti')],
+    [InlineKeyboardButton("🎲 Sorpréndeme", callback_data='random')],
+    [InlineKeyboardButton("📊 Filtrar por criterios", callback_data='filter')],
+    [InlineKeyboardButton("📜 Mi historial", callback_data='history')],
+    [InlineKeyboardButton("❓ Ayuda", callback_data='help')]
+])
+
+def menu_generos(generos):
+    """Teclado de géneros de dos en dos; el bot lo construye una vez al importar"""
+    keyboard = []
+    for i in range(0, len(generos), 2):
+        keyboard.append([InlineKeyboardButton(f"🎭 {g}", callback_data=f'genre_{g}') for g in generos[i:i + 2]])
+    keyboard.append([BOTON_MENU])
+    return InlineKeyboardMarkup(keyboard)
+
+MENU_TIPOS = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🎬 Película", callback_data='filter_type_película')],
+    [InlineKeyboardButton("📺 Serie", callback_data='filter_type_serie')],
+    [InlineKeyboardButton("🎭 Cualquiera", callback_data='filter_type_all')],
+    [InlineKeyboardButton("« Volver", callback_data='menu')]
+])
+
+MENU_PLATAFORMAS = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Netflix", callback_data='filter_platform_Netflix')],
+    [InlineKeyboardButton("Disney+", callback_data='filter_platform_Disney Plus')],
+    [InlineKeyboardButton("Amazon Prime", callback_data='filter_platform_Amazon Prime Video')],
+    [InlineKeyboardButton("HBO Max", callback_data='filter_platform_HBO Max')],
+    [InlineKeyboardButton("Apple TV+", callback_data='filter_platform_Apple TV Plus')],
+    [InlineKeyboardButton("Todas", callback_data='filter_platform_all')],
+    [InlineKeyboardButton("« Volver", callback_data='filter')]
+])
+
+MENU_SOLO_INICIO = InlineKeyboardMarkup([[BOTON_MENU]])
+
+
+# -------------------
+# Fichas por fila
+# -------------------
+def _emoji(item):
+    return "🎬" if item['type'] == 'película' else "📺"
+
+def _ficha(item):
+    mensaje = f"{_emoji(item)} **{item['title']}** ({item['year']})\n\n"
+    mensaje += f"🎯 **Disponible en:**\n"
+    mensaje += f"➤ {item['platform']}\n\n"
+    mensaje += f"⭐ Calificación: {item['rating']}/10\n"
+    mensaje += f"🎭 Género: {item['genre']}"
+    return mensaje
+
+def _ficha_sorpresa(item):
+    mensaje = f"🎲 **Te recomiendo:**\n\n"
+    mensaje += f"{_emoji(item)} **{item['title']}** ({item['year']})\n"
+    mensaje += f"🎯 Plataforma: {item['platform']}\n"
+    mensaje += f"⭐ Calificación: {item['rating']}/10\n"
+    mensaje += f"🎭 Género: {item['genre']}\n\n"
+    mensaje += f"📝 {item['overview'][:150]}...\n"
+    return mensaje
+
+def _etiqueta(item):
+    texto = f"{item['title']} ({item['year']}) {_emoji(item)}"
+    if len(texto) > LARGO_ETIQUETA:
+        texto = texto[:LARGO_ETIQUETA - 3] + "..."
+    return texto
+
+
+class CacheRender:
+    """
+    LRU de piezas renderizadas por (tipo, fila), una por versión publicada del
+    catálogo. Durante una recarga conviven handlers con el estado viejo y el
+    nuevo: cada uno usa la caché de su versión y no se vacían entre sí.
+    """
+
+    VERSIONES_RETENIDAS = 2
+
+    def __init__(self, max_entradas=4096):
+        self.max_entradas = max_entradas
+        self._por_version = OrderedDict()  # {versión: OrderedDict {(tipo, fila): pieza}}
+        self.entradas = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    def _datos(self, estado):
+        datos = self._por_version.get(estado.version)
+        if datos is None:
+            # Versión nueva (recarga): las filas ya no significan lo mismo
+            datos = self._por_version[estado.version] = OrderedDict()
+            while len(self._por_version) > self.VERSIONES_RETENIDAS:
+                # Se descarta la versión publicada hace más tiempo
+                self.entradas -= len(self._por_version.pop(min(self._por_version)))
+                self.invalidaciones += 1
+        return datos
+
+    def _obtener(self, tipo, fila, estado, construir):
+        datos = self._datos(estado)
+        clave = (tipo, int(fila))
+        valor = datos.get(clave)
+        if valor is not None:
+            datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+        self.misses += 1
+        valor = construir(fila, estado)
+        datos[clave] = valor
+        self.entradas += 1
+        if len(datos) > self.max_entradas:
+            datos.popitem(last=False)
+            self.entradas -= 1
+        return valor
+
+    def ficha(self, fila, estado):
+        """Texto de la ficha de detalle (Markdown)"""
+        return self._obtener("ficha", fila, estado, lambda f, e: _ficha(e.contenido[f]))
+
+    def ficha_sorpresa(self, fila, estado):
+        """Texto de "Sorpréndeme", con el principio de la sinopsis"""
+        return self._obtener("sorpresa", fila, estado, lambda f, e: _ficha_sorpresa(e.contenido[f]))
+
+    def boton_titulo(self, fila, estado):
+        """Botón de lista 'Título (año) 🎬' que abre la ficha"""
+        return self._obtener("boton", fila, estado, lambda f, e: InlineKeyboardButton(
+            _etiqueta(e.contenido[f]),
+            callback_data=f'details_{utils_db.referencia_fila(f, e)}'
+        ))
+
+    def botones_titulos(self, filas, estado):
+        """Una fila de teclado por título"""
+        return [[self.boton_titulo(fila, estado)] for fila in filas]
+
+    def estadisticas(self):
+        total = self.hits + self.misses
+        return {
+            "entradas": self.entradas,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidaciones": self.invalidaciones,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
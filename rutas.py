@@ -0,0 +1,75 @@
+# rutas.py
+"""
+Enrutado de los botones (callback_data) con una tabla de prefijos.
+
+Cada ruta de prefijo tiene un parser que convierte el resto del
+callback_data en un payload tipado (Referencia, Cursor...) y el handler
+que lo recibe: handler(update, context, payload). Las rutas exactas
+('menu', 'random'...) llaman a handler(update, context).
+
+Las exactas se buscan en un dict y las de prefijo en un dict por cada
+longitud de prefijo registrada (de la más larga a la más corta), así que
+resolver un botón cuesta unas pocas búsquedas en dict en lugar de recorrer
+una cadena de startswith. Si el parser falla (un botón antiguo o
+manipulado) se responde al callback sin llamar al handler.
+"""
+import logging
+
+
+class Enrutador:
+    def __init__(self):
+        self._exactas = {}
+        self._prefijos = {}  # {longitud: {prefijo: (parser, handler)}}
+        self._longitudes = []
+        self.invalidos = 0
+        self.sin_ruta = 0
+
+    def exacta(self, datos, handler):
+        self._exactas[datos] = handler
+
+    def prefijo(self, prefijo, handler, parser=str):
+        self._prefijos.setdefault(len(prefijo), {})[prefijo] = (parser, handler)
+        self._longitudes = sorted(self._prefijos, reverse=True)
+
+    def resolver(self, datos):
+        """
+        (handler, payload) para el callback_data; payload es None en las rutas
+        exactas y (None, None) si no hay ruta. ValueError si el payload no es válido.
+        """
+        handler = self._exactas.get(datos)
+        if handler is not None:
+            return handler, None
+        for largo in self._longitudes:
+            ruta = self._prefijos[largo].get(datos[:largo])
+            if ruta is not None:
+                parser, handler = ruta
+                return handler, parser(datos[largo:])
+        return None, None
+
+    async def __call__(self, update, context):
+        """Handler de CallbackQueryHandler que despacha según la tabla"""
+        query = update.callback_query
+        try:
+            handler, payload = self.resolver(query.data or "")
+        except ValueError:
+            self.invalidos += 1
+            await query.answer("Este botón ya no es válido 😅")
+            return
+        if handler is None:
+            self.sin_ruta += 1
+            logging.warning("Botón sin ruta: %r", query.data)
+            await query.answer()
+            return
+        if payload is None:
+            await handler(update, context)
+        else:
+            await handler(update, context, payload)
+
+
+def opcion(*validas):
+    """Parser que solo acepta uno de los valores dados"""
+    def parsear(texto):
+        if texto not in validas:
+            raise ValueError(f"Opción desconocida: {texto!r}")
+        return texto
+    return parsear
@@ -0,0 +1,203 @@
+# similitud.py
+"""
+Backends de similitud para "Ver similares".
+
+Todos responden a vecinos(fila, k): las k filas más parecidas a `fila`,
+de más a menos parecida y sin incluirla. Las filas de la matriz están
+normalizadas, así que el producto escalar es el coseno.
+
+- exacto: producto disperso contra todo el catálogo. Siempre correcto,
+  pero cuesta O(nnz) por consulta.
+- ivf: k-means esférico que parte el catálogo en listas; cada consulta
+  solo reordena con el coseno exacto las filas de las `sondeos` listas
+  más cercanas a ella.
+- tabla: vecinos precalculados (precomputar.py vecinos), con otro backend
+  de respaldo cuando se piden más de los que hay en la tabla.
+
+Se elige con SIMILITUD_BACKEND (exacto | ivf). medir() informa del recall
+y la latencia de un backend frente al exacto.
+"""
+import os
+import time
+import numpy as np
+from catalogo import filas_por_codigo
+
+
+def _top_k(similitudes, k, candidatas=None):
+    """Posiciones de las k mayores similitudes, ordenadas (estable ante empates)"""
+    k = min(k, len(similitudes))
+    if k <= 0:
+        return []
+    top = np.argpartition(-similitudes, k - 1)[:k]
+    top = top[np.argsort(-similitudes[top], kind='stable')]
+    if candidatas is not None:
+        top = candidatas[top]
+    return [int(i) for i in top]
+
+
+class BackendSimilitud:
+    nombre = "base"
+
+    def vecinos(self, fila, k):
+        raise NotImplementedError
+
+    def nbytes(self):
+        """Memoria adicional a la matriz que ocupa el backend"""
+        return 0
+
+
+class BackendExacto(BackendSimilitud):
+    nombre = "exacto"
+
+    def __init__(self, matriz):
+        self.matriz = matriz
+
+    def vecinos(self, fila, k):
+        similitudes = (self.matriz @ self.matriz[fila].T).toarray().ravel()
+        similitudes[fila] = -1.0
+        return _top_k(similitudes, min(k, len(similitudes) - 1))
+
+
+class BackendIVF(BackendSimilitud):
+    """
+    Índice de listas invertidas: k-means esférico sobre las filas dispersas
+    con centroides recortados a sus `terminos` columnas de más peso. Cada
+    fila va a la lista de su centroide más parecido; una consulta revisa
+    las `sondeos` listas más cercanas y reordena con el coseno exacto.
+    """
+    nombre = "ivf"
+
+    def __init__(self, matriz, listas=None, sondeos=16, terminos=200, iteraciones=5, semilla=0, bloque=8192):
+        rng = np.random.default_rng(semilla)
+        n = matriz.shape[0]
+        self.matriz = matriz
+        self.sondeos = sondeos
+        self.bloque = bloque
+        listas = min(n, listas or max(1, int(np.sqrt(n))))
+
+        # k-means sobre una muestra; los centroides iniciales son filas al azar
+        muestra = matriz[rng.choice(n, size=min(n, listas * 32), replace=False)]
+        centroides = _recortar(muestra[rng.choice(muestra.shape[0], size=listas, replace=False)], terminos)
+        for _ in range(iteraciones):
+            asignacion = self._asignar(muestra, centroides)
+            suma = _indicadora(asignacion, listas) @ muestra
+            vacias = np.flatnonzero(np.diff(suma.indptr) == 0)
+            if len(vacias):
+                # Una lista que se queda sin filas conserva su centroide anterior
+                suma = suma.tolil()
+                suma[vacias] = centroides[vacias]
+            centroides = _recortar(suma, terminos)
+        self.centroides = centroides
+
+        self.listas = filas_por_codigo(self._asignar(matriz, centroides), listas)
+
+    def _asignar(self, filas, centroides):
+        """Centroide más parecido de cada fila, por bloques densos de `bloque` filas"""
+        traspuesta = centroides.T.tocsr()
+        asignacion = np.empty(filas.shape[0], dtype=np.int32)
+        for inicio in range(0, filas.shape[0], self.bloque):
+            parecidos = (filas[inicio:inicio + self.bloque] @ traspuesta).toarray()
+            asignacion[inicio:inicio + self.bloque] = np.argmax(parecidos, axis=1)
+        return asignacion
+
+    def vecinos(self, fila, k):
+        consulta = self.matriz[fila]
+        orden = np.argsort(-(self.centroides @ consulta.T).toarray().ravel())
+
+        # Al menos `sondeos` listas, y más si no reúnen k candidatas
+        partes, total = [], 0
+        for i, lista in enumerate(orden):
+            if i >= self.sondeos and total > k:
+                break
+            partes.append(self.listas[lista])
+            total += len(self.listas[lista])
+        candidatas = np.concatenate(partes)
+        candidatas = candidatas[candidatas != fila]
+
+        similitudes = (self.matriz[candidatas] @ consulta.T).toarray().ravel()
+        return _top_k(similitudes, k, candidatas)
+
+    def nbytes(self):
+        centroides = self.centroides.data.nbytes + self.centroides.indices.nbytes + self.centroides.indptr.nbytes
+        return centroides + sum(lista.nbytes for lista in self.listas)
+
+
+def _indicadora(asignacion, listas):
+    """Matriz dispersa (listas, filas) con un 1 en la lista de cada fila"""
+    from scipy.sparse import csr_matrix
+
+    n = len(asignacion)
+    return csr_matrix((np.ones(n, dtype=np.float32), (asignacion, np.arange(n))), shape=(listas, n))
+
+def _recortar(matriz, terminos):
+    """Deja en cada fila sus `terminos` valores más altos y la normaliza"""
+    from scipy.sparse import csr_matrix
+
+    matriz = matriz.tocsr()
+    indptr, indices, datos = [0], [], []
+    for i in range(matriz.shape[0]):
+        a, b = matriz.indptr[i], matriz.indptr[i + 1]
+        valores, columnas = matriz.data[a:b], matriz.indices[a:b]
+        if len(valores) > terminos:
+            top = np.argpartition(-valores, terminos - 1)[:terminos]
+            valores, columnas = valores[top], columnas[top]
+        norma = np.linalg.norm(valores)
+        datos.append(valores / norma if norma else valores)
+        indices.append(columnas)
+        indptr.append(indptr[-1] + len(valores))
+    return csr_matrix(
+        (np.concatenate(datos).astype(np.float32), np.concatenate(indices), np.asarray(indptr)),
+        shape=matriz.shape
+    )
+
+
+class BackendTabla(BackendSimilitud):
+    nombre = "tabla"
+
+    def __init__(self, tabla, respaldo):
+        self.tabla = tabla
+        self.respaldo = respaldo
+
+    def vecinos(self, fila, k):
+        if k > self.tabla.shape[1]:
+            return self.respaldo.vecinos(fila, k)
+        return [int(i) for i in self.tabla[fila, :k] if i >= 0]
+
+    def nbytes(self):
+        return self.tabla.nbytes + self.respaldo.nbytes()
+
+
+BACKENDS = {"exacto": BackendExacto, "ivf": BackendIVF}
+
+def crear_backend(nombre, matriz, **opciones):
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend de similitud desconocido: {nombre!r} (válidos: {', '.join(BACKENDS)})")
+    return BACKENDS[nombre](matriz, **opciones)
+
+def backend_desde_entorno(matriz):
+    """Backend configurado con SIMILITUD_BACKEND, SIMILITUD_IVF_LISTAS y SIMILITUD_IVF_SONDEOS"""
+    nombre = os.getenv("SIMILITUD_BACKEND", "exacto")
+    opciones = {}
+    if nombre == "ivf":
+        if os.getenv("SIMILITUD_IVF_LISTAS"):
+            opciones["listas"] = int(os.getenv("SIMILITUD_IVF_LISTAS"))
+        opciones["sondeos"] = int(os.getenv("SIMILITUD_IVF_SONDEOS", "16"))
+    return crear_backend(nombre, matriz, **opciones)
+
+def medir(backend, referencia, filas, k=10):
+    """Recall@k frente a `referencia` (normalmente el exacto) y latencia p50/p95 de `backend`"""
+    aciertos, latencias = [], []
+    for fila in filas:
+        inicio = time.perf_counter()
+        obtenidos = backend.vecinos(fila, k)
+        latencias.append(time.perf_counter() - inicio)
+        esperados = set(referencia.vecinos(fila, k))
+        if esperados:
+            aciertos.append(len(esperados.intersection(obtenidos)) / len(esperados))
+    return {
+        "backend": backend.nombre,
+        "recall": float(np.mean(aciertos)) if aciertos else 1.0,
+        "p50": float(np.percentile(latencias, 50)),
+        "p95": float(np.percentile(latencias, 95)),
+        "memoria": backend.nbytes(),
+    }
@@ -0,0 +1,151 @@
+# snapshot.py
+"""
+Snapshot binario del catálogo: un directorio con un manifest.json y un
+archivo .npy por array (columnas del catálogo, vocabularios e idf de los
+vectores multi-campo, matriz dispersa en CSR e índice de títulos).
+
+Los .npy se abren con mmap, así que cargar es casi instantáneo y varios
+procesos del bot comparten las mismas páginas de memoria.
+
+Cada snapshot se escribe en su propio directorio versionado
+(`catalogo.snapshot.v<marca>`) y `catalogo.snapshot` es un enlace simbólico
+a la versión vigente, que se cambia con un único os.replace: quien abra la
+ruta ve siempre una versión completa, nunca un hueco. Se conservan las
+últimas VERSIONES_RETENIDAS para los procesos que aún leen la anterior.
+"""
+import glob
+import json
+import os
+import shutil
+import time
+import numpy as np
+from catalogo import Catalogo, TablaTextos
+
+FORMATO = 3  # 3: la huella cubre todas las columnas, no solo los títulos
+MANIFEST = "manifest.json"
+VERSIONES_RETENIDAS = 2
+
+
+def _guardar_array(directorio, nombre, array):
+    np.save(os.path.join(directorio, f"{nombre}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+
+def _abrir_array(directorio, nombre):
+    return np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode='r', allow_pickle=False)
+
+def resolver(ruta):
+    """Directorio de la versión a la que apunta `ruta` ahora mismo"""
+    return os.path.realpath(ruta)
+
+def _publicar(ruta, version):
+    """Apunta `ruta` a `version` de forma atómica y borra las versiones antiguas"""
+    if os.path.isdir(ruta) and not os.path.islink(ruta):
+        # Snapshot de antes de las versiones (un directorio normal): se convierte una única vez
+        os.rename(ruta, f"{ruta}.v0")
+    enlace = f"{ruta}.enlace-{os.getpid()}"
+    if os.path.lexists(enlace):
+        os.remove(enlace)
+    os.symlink(os.path.basename(version), enlace)
+    os.replace(enlace, ruta)
+
+    vigente = resolver(ruta)
+    versiones = sorted(glob.glob(f"{glob.escape(ruta)}.v*"), key=os.path.getmtime, reverse=True)
+    for antigua in versiones[VERSIONES_RETENIDAS:]:
+        if os.path.realpath(antigua) != vigente:
+            shutil.rmtree(antigua, ignore_errors=True)
+
+def guardar_snapshot(ruta, catalogo, tfidf_matrix, tfidf_vectorizer, indice_titulos, huella):
+    """
+    Escribe el snapshot en un directorio versionado nuevo y después apunta
+    `ruta` a él, así un bot que esté leyendo nunca ve un snapshot a medias.
+    """
+    tmp = f"{ruta}.v{time.time_ns()}"
+    os.makedirs(tmp)
+
+    # Columnas del catálogo
+    for nombre, tabla in (("titulos", catalogo.titulos), ("overviews", catalogo.overviews)):
+        _guardar_array(tmp, f"{nombre}_datos", tabla.datos)
+        _guardar_array(tmp, f"{nombre}_offsets", tabla.offsets)
+    for nombre in ("years", "ratings", "tipo_codigos", "genero_codigos", "plataforma_codigos"):
+        _guardar_array(tmp, nombre, getattr(catalogo, nombre))
+
+    # Vectores: vocabularios e idf de cada bloque (ver vectores.py) y matriz CSR
+    for nombre, array in tfidf_vectorizer.arrays().items():
+        _guardar_array(tmp, f"vectores_{nombre}", array)
+    matriz = tfidf_matrix.tocsr()
+    _guardar_array(tmp, "tfidf_data", matriz.data)
+    _guardar_array(tmp, "tfidf_indices", matriz.indices)
+    _guardar_array(tmp, "tfidf_indptr", matriz.indptr)
+
+    # Índice de títulos
+    for nombre, array in indice_titulos.arrays().items():
+        _guardar_array(tmp, f"indice_{nombre}", array)
+
+    manifest = {
+        "formato": FORMATO,
+        "registros": len(catalogo),
+        "huella": huella,
+        "tipos": catalogo.tipos,
+        "generos": catalogo.generos,
+        "plataformas": catalogo.plataformas,
+        "tfidf_shape": list(matriz.shape),
+        "vectores": tfidf_vectorizer.metadatos(),
+    }
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    _publicar(ruta, tmp)
+
+def cargar_snapshot(ruta):
+    """
+    Abre un snapshot con mmap. Devuelve (catalogo, tfidf_matrix,
+    tfidf_vectorizer, indice_titulos, huella). El vectorizador se devuelve
+    como None: solo hace falta para transformar texto nuevo y reconstruirlo
+    obliga a importar sklearn (ver cargar_vectorizador). Conviene pasar
+    resolver(ruta): así todos los arrays salen de la misma versión aunque
+    se publique otra a mitad de la carga.
+    """
+    from scipy.sparse import csr_matrix
+    from indice_titulos import IndiceTitulos
+
+    with open(os.path.join(ruta, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("formato") != FORMATO:
+        raise ValueError(
+            f"El snapshot {ruta} tiene formato {manifest.get('formato')} y este bot espera {FORMATO}. "
+            "Vuelve a generarlo con: python precomputar.py snapshot"
+        )
+
+    catalogo = Catalogo(
+        titulos=TablaTextos(_abrir_array(ruta, "titulos_datos"), _abrir_array(ruta, "titulos_offsets")),
+        overviews=TablaTextos(_abrir_array(ruta, "overviews_datos"), _abrir_array(ruta, "overviews_offsets")),
+        years=_abrir_array(ruta, "years"),
+        ratings=_abrir_array(ruta, "ratings"),
+        tipo_codigos=_abrir_array(ruta, "tipo_codigos"), tipos=manifest["tipos"],
+        genero_codigos=_abrir_array(ruta, "genero_codigos"), generos=manifest["generos"],
+        plataforma_codigos=_abrir_array(ruta, "plataforma_codigos"), plataformas=manifest["plataformas"]
+    )
+
+    tfidf_matrix = csr_matrix(
+        (_abrir_array(ruta, "tfidf_data"), _abrir_array(ruta, "tfidf_indices"), _abrir_array(ruta, "tfidf_indptr")),
+        shape=tuple(manifest["tfidf_shape"]), copy=False
+    )
+
+    indice_titulos = IndiceTitulos.desde_arrays(
+        {nombre: _abrir_array(ruta, f"indice_{nombre}") for nombre in IndiceTitulos.ARRAYS}
+    )
+
+    return catalogo, tfidf_matrix, None, indice_titulos, manifest["huella"]
+
+def cargar_vectorizador(ruta):
+    """Vectorizador multi-campo ya ajustado: vocabularios fijos + idf, sin volver a entrenar"""
+    from vectores import VectorizadorMultiCampo
+
+    with open(os.path.join(ruta, MANIFEST), encoding="utf-8") as f:
+        metadatos = json.load(f)["vectores"]
+    prefijo = "vectores_"
+    arrays = {
+        nombre[len(prefijo):-len(".npy")]: _abrir_array(ruta, nombre[:-len(".npy")])
+        for nombre in os.listdir(ruta) if nombre.startswith(prefijo)
+    }
+    return VectorizadorMultiCampo.desde_arrays(arrays, metadatos)
@@ -0,0 +1,26 @@
+# tests/conftest.py
+import os
+import sys
+import threading
+import pytest
+
+# Los módulos del bot viven en la raíz del repositorio, sin paquete
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def servidor_falso(request):
+    """
+    Servidor falso (fake_tmdb, fake_telegram, fake_redis...) en un puerto libre.
+    Se elige con parametrize indirecto: (módulo, {opciones de crear_servidor}),
+    o None para un caso sin servidor. El puerto: srv.server_address[1].
+    """
+    if request.param is None:
+        yield None
+        return
+    modulo, opciones = request.param
+    srv = modulo.crear_servidor(0, **opciones)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
@@ -0,0 +1,63 @@
+# tests/test_envios.py
+"""Planificador de envios.py contra la API de Telegram falsa"""
+import asyncio
+import time
+import pytest
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+from telegram.request import HTTPXRequest
+import fake_telegram
+from envios import PlanificadorEnvios
+
+CHAT = 42
+
+
+# Un envío por segundo en cada chat, sin ráfaga: el segundo mensaje seguido recibe un 429
+pytestmark = pytest.mark.parametrize(
+    "servidor_falso", [(fake_telegram, {"por_segundo": 1000, "por_chat": 1.0, "rafaga_chat": 1})], indirect=True,
+    ids=["telegram"],
+)
+
+
+async def enviar(srv, mensajes, planificador):
+    bot = ExtBot(
+        "123:falso",
+        base_url=f"http://127.0.0.1:{srv.server_address[1]}/bot",
+        request=HTTPXRequest(connection_pool_size=16),
+        rate_limiter=planificador,
+    )
+    async with bot:
+        inicio = time.monotonic()
+        resultados = await asyncio.gather(*(bot.send_message(CHAT, f"Mensaje {i}") for i in range(mensajes)),
+                                          return_exceptions=True)
+        return resultados, time.monotonic() - inicio
+
+
+def test_sin_planificador_llega_el_429(servidor_falso):
+    resultados, _ = asyncio.run(enviar(servidor_falso, 2, None))
+    errores = [r for r in resultados if isinstance(r, RetryAfter)]
+    assert len(errores) == 1
+    assert errores[0].retry_after == 1
+
+
+def test_reintenta_tras_retry_after(servidor_falso):
+    # El planificador cree que el chat admite mucho más: solo el 429 lo frena
+    planificador = PlanificadorEnvios(por_segundo=1000, por_chat=1000, rafaga_chat=1000)
+    resultados, tiempo = asyncio.run(enviar(servidor_falso, 3, planificador))
+
+    assert not [r for r in resultados if isinstance(r, Exception)]
+    assert [r.text for r in resultados] == ["Mensaje 0", "Mensaje 1", "Mensaje 2"]
+    assert servidor_falso.estadisticas()["peticiones"]["sendMessage"] == 3 + planificador.respuestas_429
+    assert planificador.respuestas_429 == servidor_falso.estadisticas()["respuestas_429"] >= 1
+    # Tras cada 429 se espera el retry_after entero antes de volver a ese chat
+    assert tiempo >= 2.0
+    assert planificador.estadisticas()["enviados"]["mensajes"] == 3
+
+
+def test_sin_429_si_respeta_el_limite(servidor_falso):
+    planificador = PlanificadorEnvios(por_segundo=1000, por_chat=1.0, rafaga_chat=1)
+    resultados, _ = asyncio.run(enviar(servidor_falso, 2, planificador))
+
+    assert not [r for r in resultados if isinstance(r, Exception)]
+    assert planificador.respuestas_429 == 0
+    assert servidor_falso.estadisticas()["respuestas_429"] == 0
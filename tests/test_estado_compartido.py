@@ -0,0 +1,130 @@
+# tests/test_estado_compartido.py
+"""Ida y vuelta del user_data entre réplicas, con Redis falso y con SQLite"""
+import asyncio
+import json
+import threading
+import pytest
+import fake_redis
+from estado_compartido import AlmacenLocal, AlmacenRedis, PersistenciaCompartida
+
+USUARIO = 1234
+DATOS = {"filter_type": "película", "ia": [{"role": "user", "content": "¿Algo de terror?"}]}
+
+
+CON_REDIS = pytest.mark.parametrize("servidor_falso", [(fake_redis, {})], indirect=True, ids=["redis"])
+# None: sin servidor, con SQLite local
+CON_CADA_ALMACEN = pytest.mark.parametrize("servidor_falso", [(fake_redis, {}), None], indirect=True,
+                                           ids=["redis", "local"])
+
+
+@pytest.fixture
+def nuevo_almacen(servidor_falso, tmp_path):
+    """Fábrica de almacenes que comparten los mismos datos, como dos réplicas"""
+    if servidor_falso is not None:
+        return lambda: AlmacenRedis(f"redis://127.0.0.1:{servidor_falso.server_address[1]}/0")
+    return lambda: AlmacenLocal(str(tmp_path / "estado.sqlite"))
+
+
+@CON_CADA_ALMACEN
+def test_ida_y_vuelta_entre_replicas(nuevo_almacen):
+    async def escenario():
+        escritora = PersistenciaCompartida(nuevo_almacen(), intervalo=0.05)
+        await escritora.update_user_data(USUARIO, DATOS)
+        await escritora.flush()
+
+        lectora = PersistenciaCompartida(nuevo_almacen(), ttl=0)
+        user_data = {}
+        await lectora.refresh_user_data(USUARIO, user_data)
+        await lectora.flush()
+        return escritora, user_data
+
+    escritora, user_data = asyncio.run(escenario())
+    assert user_data == DATOS
+    assert escritora.estadisticas()["escrituras"] == 1
+    assert escritora.estadisticas()["errores"] == 0
+
+
+@CON_CADA_ALMACEN
+def test_cambios_de_otra_replica_tras_el_ttl(nuevo_almacen):
+    async def escenario():
+        a = PersistenciaCompartida(nuevo_almacen(), ttl=0, intervalo=0.05)
+        b = PersistenciaCompartida(nuevo_almacen(), ttl=0, intervalo=0.05)
+        datos_b = {}
+        await b.refresh_user_data(USUARIO, datos_b)
+
+        await a.update_user_data(USUARIO, {"filter_type": "serie"})
+        await a.flush()
+        await b.refresh_user_data(USUARIO, datos_b)
+        await b.flush()
+        return datos_b
+
+    assert asyncio.run(escenario()) == {"filter_type": "serie"}
+
+
+@CON_REDIS
+def test_formato_en_redis(servidor_falso):
+    async def escenario():
+        persistencia = PersistenciaCompartida(
+            AlmacenRedis(f"redis://127.0.0.1:{servidor_falso.server_address[1]}/0"), intervalo=0.05
+        )
+        for user_id in range(3):
+            await persistencia.update_user_data(user_id, {"n": user_id})
+        await persistencia.flush()
+
+    asyncio.run(escenario())
+    assert json.loads(servidor_falso.datos[b"cineclass:usuario:2"]) == {"n": 2}
+    # Los tres usuarios salen en un único MSET
+    assert servidor_falso.comandos["MSET"] == 1
+
+
+class AlmacenRetenido:
+    """Almacén que retiene la primera escritura hasta que el test la suelta (y opcionalmente la hace fallar)"""
+
+    def __init__(self, almacen, falla=False):
+        self.almacen = almacen
+        self.falla = falla
+        self.escribiendo = threading.Event()
+        self.soltar = threading.Event()
+
+    def leer(self, claves):
+        return self.almacen.leer(claves)
+
+    def escribir(self, valores):
+        if not self.escribiendo.is_set():
+            self.escribiendo.set()
+            self.soltar.wait(5)
+            if self.falla:
+                raise OSError("almacén caído")
+        self.almacen.escribir(valores)
+
+    def borrar(self, claves):
+        self.almacen.borrar(claves)
+
+    def cerrar(self):
+        self.almacen.cerrar()
+
+
+@pytest.mark.parametrize("falla", [False, True], ids=["escritura_ok", "escritura_fallida"])
+def test_refresco_durante_la_escritura_no_pisa_lo_local(tmp_path, falla):
+    ruta = str(tmp_path / "estado.sqlite")
+    AlmacenLocal(ruta).escribir({f"usuario:{USUARIO}": json.dumps({"v": "viejo"}).encode()})
+
+    async def escenario():
+        almacen = AlmacenRetenido(AlmacenLocal(ruta), falla)
+        persistencia = PersistenciaCompartida(almacen, ttl=0, intervalo=0.01)
+        user_data = {"v": "nuevo"}
+        await persistencia.update_user_data(USUARIO, user_data)
+
+        # El hilo escritor ya tiene el lote y está escribiendo: el almacén aún tiene "viejo"
+        assert await asyncio.to_thread(almacen.escribiendo.wait, 5)
+        await persistencia.refresh_user_data(USUARIO, user_data)
+        assert user_data == {"v": "nuevo"}
+
+        almacen.soltar.set()
+        await persistencia.flush()
+        return persistencia
+
+    persistencia = asyncio.run(escenario())
+    assert persistencia.estadisticas()["errores"] == int(falla)
+    guardado = AlmacenLocal(ruta).leer([f"usuario:{USUARIO}"])[f"usuario:{USUARIO}"]
+    assert json.loads(guardado) == {"v": "nuevo"}
@@ -0,0 +1,126 @@
+# tests/test_fetch_tmdb.py
+"""Descarga de fetch_tmdb.py contra el servidor TMDB falso"""
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import fake_tmdb
+import fetch_tmdb
+
+PAGINAS = 4
+
+
+CON_TMDB = pytest.mark.parametrize("servidor_falso", [(fake_tmdb, {"paginas": 10})], indirect=True, ids=["tmdb"])
+
+
+def cliente_para(srv):
+    # Sin reintentos: una página caída falla a la primera
+    return fetch_tmdb.ClienteTMDB("falsa", f"http://127.0.0.1:{srv.server_address[1]}", workers=4, rps=1000,
+                                  reintentos=0)
+
+def descargar_peliculas(srv, salida, reanudar=False, previos=None):
+    cliente = cliente_para(srv)
+    sink = fetch_tmdb.SalidaParcial(str(salida), reanudar=reanudar)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            fetch_tmdb.descargar(cliente, pool, sink, fetch_tmdb.get_movies, fetch_tmdb.parse_movie, "movie",
+                                 PAGINAS, "películas", previos or {}, ventana=4, checkpoint_cada=2)
+        sink.checkpoint()
+    finally:
+        sink.cerrar()
+    return cliente, sink
+
+def leer_checkpoint(salida):
+    with open(f"{salida}.checkpoint.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@CON_TMDB
+def test_descarga_completa(servidor_falso, tmp_path):
+    salida = tmp_path / "movies_clean.csv"
+    cliente, sink = descargar_peliculas(servidor_falso, salida)
+
+    resumen = fetch_tmdb.finalizar(sink.ruta, str(salida), incremental=False)
+    assert resumen["total"] == PAGINAS * fake_tmdb.POR_PAGINA
+    with open(salida, newline="", encoding="utf-8") as f:
+        filas = list(csv.DictReader(f))
+    assert [fila["title"] for fila in filas[:2]] == ["Película 1", "Película 2"]
+    assert all(fila["platform"] for fila in filas)
+    # Los contadores del cliente se actualizan desde varios hilos a la vez
+    assert cliente.peticiones == servidor_falso.peticiones
+
+
+@CON_TMDB
+def test_pagina_fallida_no_se_da_por_hecha(servidor_falso, tmp_path):
+    salida = tmp_path / "movies_clean.csv"
+    servidor_falso.caidas = {("movie", 2)}
+    _, sink = descargar_peliculas(servidor_falso, salida)
+
+    checkpoint = leer_checkpoint(salida)
+    assert checkpoint["paginas"]["movie"] == PAGINAS
+    assert checkpoint["fallidas"]["movie"] == [2]
+    assert checkpoint["filas"] == (PAGINAS - 1) * fake_tmdb.POR_PAGINA
+    with open(sink.ruta, newline="", encoding="utf-8") as f:
+        titulos = {fila["title"] for fila in csv.DictReader(f)}
+    assert "Película 21" not in titulos  # primer título de la página 2
+
+
+@CON_TMDB
+def test_reanudar_reintenta_las_paginas_fallidas(servidor_falso, tmp_path):
+    salida = tmp_path / "movies_clean.csv"
+    servidor_falso.caidas = {("movie", 2)}
+    descargar_peliculas(servidor_falso, salida)
+
+    servidor_falso.caidas = set()
+    antes = servidor_falso.peticiones
+    _, sink = descargar_peliculas(servidor_falso, salida, reanudar=True)
+
+    assert leer_checkpoint(salida)["fallidas"]["movie"] == []
+    # Solo se vuelve a pedir la página caída (y las plataformas de sus títulos)
+    assert servidor_falso.peticiones - antes == 1 + fake_tmdb.POR_PAGINA
+
+    resumen = fetch_tmdb.finalizar(sink.ruta, str(salida), incremental=False)
+    assert resumen["total"] == PAGINAS * fake_tmdb.POR_PAGINA
+    with open(salida, newline="", encoding="utf-8") as f:
+        ids = [int(fila["id"]) for fila in csv.DictReader(f)]
+    assert sorted(ids) == list(range(1, PAGINAS * fake_tmdb.POR_PAGINA + 1))
+
+
+@CON_TMDB
+def test_plataforma_fallida_se_vuelve_a_consultar(servidor_falso, tmp_path):
+    salida = tmp_path / "movies_clean.csv"
+    # Un título con plataformas y otro sin ninguna (TMDB responde, pero vacío)
+    con = next(i for i in range(1, 21) if fake_tmdb.proveedores(i)["results"])
+    sin = next(i for i in range(1, 21) if not fake_tmdb.proveedores(i)["results"])
+    servidor_falso.proveedores_caidos = {con}
+    _, sink = descargar_peliculas(servidor_falso, salida)
+    fetch_tmdb.finalizar(sink.ruta, str(salida), incremental=False)
+    sink.limpiar()
+
+    previos = fetch_tmdb.cargar_previos(str(salida))
+    assert previos[("película", str(con))] == ("", fetch_tmdb.PLATAFORMA_DESCONOCIDA)
+    assert previos[("película", str(sin))][0] != ""
+
+    # Siguiente descarga incremental: solo se vuelve a consultar el que falló
+    servidor_falso.proveedores_caidos = set()
+    _, sink = descargar_peliculas(servidor_falso, salida, previos=previos)
+    assert sink.estado["consultados"] == 1
+    fetch_tmdb.finalizar(sink.ruta, str(salida), incremental=True)
+    with open(salida, newline="", encoding="utf-8") as f:
+        plataformas = {int(fila["id"]): fila["platform"] for fila in csv.DictReader(f)}
+    assert plataformas[con] != fetch_tmdb.PLATAFORMA_DESCONOCIDA
+    assert plataformas[sin] == fetch_tmdb.PLATAFORMA_DESCONOCIDA
+
+
+def test_finalizar_quita_repetidos(tmp_path):
+    parcial = tmp_path / "parcial.csv"
+    with open(parcial, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fetch_tmdb.COLUMNAS)
+        writer.writeheader()
+        for id_, titulo, tipo in [(1, "A", "película"), (2, "A", "película"), (1, "B", "película"),
+                                  (1, "C", "serie")]:
+            writer.writerow({"id": id_, "title": titulo, "type": tipo, "rating": 5})
+
+    resumen = fetch_tmdb.finalizar(str(parcial), str(tmp_path / "salida.csv"), incremental=False)
+    assert resumen["total"] == 2
+    assert resumen["película"] == 1 and resumen["serie"] == 1
@@ -0,0 +1,66 @@
+# tests/test_ia_chat.py
+"""Cola y concurrencia de MotorChatIA con un cliente de Groq falso"""
+import asyncio
+from types import SimpleNamespace
+import ia_chat
+
+
+class GroqFalso:
+    """Responde tras `demora` segundos; cuenta las llamadas simultáneas"""
+
+    def __init__(self, demora):
+        self.demora = demora
+        self.en_curso = 0
+        self.maximo = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **_):
+        self.en_curso += 1
+        self.maximo = max(self.maximo, self.en_curso)
+        try:
+            await asyncio.sleep(self.demora)
+        finally:
+            self.en_curso -= 1
+        mensaje = SimpleNamespace(content=f"Eco: {messages[-1]['content']}")
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=mensaje)])
+
+
+def nuevo_motor(demora, **opciones):
+    motor = ia_chat.MotorChatIA("falsa", **opciones)
+    motor.client = GroqFalso(demora)
+    return motor
+
+
+def test_timeouts_y_cancelaciones_no_pierden_permisos():
+    async def escenario():
+        motor = nuevo_motor(1.0, max_concurrencia=2, max_cola=10, timeout=0.05)
+        # Las llamadas vencen mientras otras aún esperan turno
+        respuestas = await asyncio.gather(*(motor.responder(f"hola {i}") for i in range(8)))
+        assert set(respuestas) == {ia_chat.MENSAJE_TIMEOUT}
+
+        # Cancelaciones en plena llamada y en plena espera de turno
+        tareas = [asyncio.create_task(motor.responder(f"adiós {i}")) for i in range(6)]
+        await asyncio.sleep(0.01)
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+        motor.client.demora = 0
+        respuestas = await asyncio.gather(*(motor.responder(f"otra {i}") for i in range(2)))
+        return motor, respuestas
+
+    motor, respuestas = asyncio.run(escenario())
+    assert respuestas == ["Eco: otra 0", "Eco: otra 1"]
+    assert motor._pendientes == 0
+    # Los dos permisos siguen libres y nunca hubo más de dos llamadas a la vez
+    assert motor._semaforo._value == 2
+    assert motor.client.maximo == 2
+
+
+def test_cola_llena_responde_saturado():
+    async def escenario():
+        motor = nuevo_motor(0.05, max_concurrencia=1, max_cola=1, timeout=1.0)
+        return await asyncio.gather(*(motor.responder(f"hola {i}") for i in range(3)))
+
+    respuestas = asyncio.run(escenario())
+    assert respuestas == ["Eco: hola 0", "Eco: hola 1", ia_chat.MENSAJE_SATURADO]
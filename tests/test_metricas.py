@@ -0,0 +1,43 @@
+# tests/test_metricas.py
+"""Métricas de caché leídas desde el hilo del endpoint mientras el bucle las modifica"""
+import sys
+import threading
+from types import SimpleNamespace
+import metricas
+from render import CacheRender
+
+
+def test_raspado_concurrente_con_la_cache():
+    cache = CacheRender(max_entradas=8)
+    metricas.registrar_caches({"render_test": lambda: cache, "apagada_test": lambda: None})
+    # Cambios de hilo muy frecuentes para que el raspado caiga a mitad de una recarga
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    parar = threading.Event()
+    errores = []
+
+    def raspar():
+        while not parar.is_set():
+            try:
+                metricas.texto()
+            except Exception as e:
+                errores.append(e)
+
+    hilo = threading.Thread(target=raspar)
+    hilo.start()
+    try:
+        for version in range(2000):
+            # Cada versión nueva descarta la más antigua de _por_version
+            estado = SimpleNamespace(version=version)
+            for fila in range(4):
+                cache._obtener("ficha", fila, estado, lambda f, e: str(f))
+    finally:
+        parar.set()
+        hilo.join()
+        sys.setswitchinterval(intervalo)
+
+    assert not errores
+    salida = metricas.texto()
+    assert 'cineclass_cache_fallos_total{cache="render_test"} 8000' in salida
+    assert 'cache="apagada_test"' not in salida
+    assert cache.estadisticas()["entradas"] == 8
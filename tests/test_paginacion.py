@@ -0,0 +1,99 @@
+# tests/test_paginacion.py
+"""Cursores y páginas de paginacion.py sobre un conjunto de filas sintético"""
+from types import SimpleNamespace
+import numpy as np
+import pytest
+import paginacion
+
+TOTAL = 103
+TAMANO = 10
+
+
+@pytest.fixture
+def estado(monkeypatch):
+    filas = np.arange(1000, 1000 + TOTAL, dtype=np.int32)
+    monkeypatch.setitem(paginacion.CONJUNTOS, "g", lambda clave, actual: filas)
+    contenido = SimpleNamespace(ratings=np.zeros(1000 + TOTAL))
+    contenido.ratings[filas] = np.random.default_rng(1).uniform(1, 10, TOTAL)
+    return SimpleNamespace(generacion="abc123", version=1, contenido=contenido)
+
+
+def recorrer(cursor, estado):
+    paginador = paginacion.Paginador()
+    vistas = []
+    while True:
+        pagina = paginador.pagina(cursor, TAMANO, estado)
+        vistas += pagina.filas
+        if pagina.siguiente is None:
+            return vistas
+        cursor = paginacion.decodificar(pagina.siguiente)
+
+
+def test_ida_y_vuelta():
+    cursor = paginacion.Cursor("g", "Ciencia ficción", paginacion.AZAR, 2 ** 32 - 1, 1234, "abc123")
+    datos = paginacion.codificar(cursor)
+    assert len(datos.encode("utf-8")) <= paginacion.LIMITE_CALLBACK
+    assert paginacion.decodificar(datos) == cursor
+
+    # La clave va al final y puede llevar '|'
+    filtro = cursor._replace(conjunto="f", clave="serie|HBO Max", orden=paginacion.NOTA, semilla=0)
+    assert paginacion.decodificar(paginacion.codificar(filtro)) == filtro
+
+
+@pytest.mark.parametrize("orden", [paginacion.AZAR, paginacion.NOTA])
+def test_recorrido_completo_sin_repetidos(estado, orden):
+    cursor = paginacion.nuevo_cursor("g", "Drama", orden, estado)
+    vistas = recorrer(cursor, estado)
+    assert len(vistas) == TOTAL
+    assert sorted(vistas) == list(range(1000, 1000 + TOTAL))
+    if orden == paginacion.NOTA:
+        notas = estado.contenido.ratings[vistas]
+        assert (np.diff(notas) <= 0).all()
+
+
+def test_permutacion_depende_de_la_semilla():
+    a = paginacion.permutar(np.arange(TOTAL), TOTAL, 1)
+    b = paginacion.permutar(np.arange(TOTAL), TOTAL, 2)
+    assert sorted(a) == sorted(b) == list(range(TOTAL))
+    assert list(a) != list(b)
+
+
+@pytest.mark.parametrize("resto", [
+    "g|a5|-1|abc123|Drama",       # posición negativa
+    "g|a5|+1|abc123|Drama",
+    "g|a5| 1|abc123|Drama",
+    "g|a5|1_0|abc123|Drama",
+    "g|a|0|abc123|Drama",         # semilla vacía
+    "g|a-5|0|abc123|Drama",
+    "g|azzzzzzz|0|abc123|Drama",  # semilla de más de 32 bits
+    "g|a5|zzzzz|abc123|Drama",    # posición por encima de MAX_DESDE
+    "g||0|abc123|Drama",
+    "x|a5|0|abc123|Drama",
+    "g|a5|0",
+])
+def test_rechaza_cursores_manipulados(resto):
+    with pytest.raises(ValueError):
+        paginacion.parsear(resto)
+    assert paginacion.decodificar(paginacion.PREFIJO + resto) is None
+
+
+def test_permutar_rechaza_posiciones_fuera_del_dominio():
+    with pytest.raises(ValueError):
+        paginacion.permutar(np.array([-1]), TOTAL, 5)
+    with pytest.raises(ValueError):
+        paginacion.permutar(np.array([TOTAL]), TOTAL, 5)
+
+
+def test_posicion_mas_alla_del_final(estado):
+    # Un cursor de una lista que ha encogido tras una recarga: se sirve la última página posible
+    cursor = paginacion.nuevo_cursor("g", "Drama", paginacion.AZAR, estado)._replace(desde=10 ** 6)
+    pagina = paginacion.Paginador().pagina(cursor, TAMANO, estado)
+    assert pagina.desde == TOTAL - 1
+    assert len(pagina.filas) == 1
+
+
+def test_posicion_negativa_sin_parsear(estado):
+    cursor = paginacion.nuevo_cursor("g", "Drama", paginacion.AZAR, estado)._replace(desde=-1)
+    pagina = paginacion.Paginador().pagina(cursor, TAMANO, estado)
+    assert pagina.desde == 0
+    assert len(pagina.filas) == TAMANO
@@ -0,0 +1,89 @@
+# tests/test_snapshot.py
+"""Publicación atómica del snapshot del catálogo"""
+import csv
+import json
+import os
+import threading
+import pytest
+import snapshot
+import utils_db
+
+FILAS = [
+    ("Película 1", 2001, "película", "Drama", "Netflix", 7.5, "Un drama sobre una familia"),
+    ("Película 2", 2010, "película", "Comedia", "HBO Max", 6.1, "Una comedia de enredos"),
+    ("Serie 1", 2019, "serie", "Drama, Crimen", "Netflix, Disney Plus", 8.2, "Detectives en la ciudad"),
+    ("Serie 2", 2022, "serie", "Ciencia ficción", "Apple TV Plus", 5.4, "Viajes en el tiempo"),
+]
+
+
+@pytest.fixture
+def catalogo_csv(tmp_path):
+    ruta = tmp_path / "movies_clean.csv"
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "year", "type", "genre", "platform", "rating", "overview"])
+        writer.writerows(FILAS)
+    return str(ruta)
+
+
+def publicar_version(ruta, marca):
+    version = f"{ruta}.v{marca}"
+    os.makedirs(version)
+    with open(os.path.join(version, snapshot.MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"marca": marca}, f)
+    snapshot._publicar(ruta, version)
+
+
+def test_guardar_y_cargar(tmp_path, catalogo_csv):
+    ruta = str(tmp_path / "catalogo.snapshot")
+    utils_db.publicar(utils_db.construir_desde_csv(catalogo_csv))
+    utils_db.guardar_snapshot(ruta)
+    utils_db.guardar_snapshot(ruta)
+
+    assert os.path.islink(ruta)
+    estado = utils_db.construir_desde_snapshot(ruta)
+    assert estado.ruta_snapshot == snapshot.resolver(ruta)
+    assert [estado.contenido.titulos[i] for i in range(len(FILAS))] == [f[0] for f in FILAS]
+    assert estado.huella == utils_db.estado.huella
+    assert estado.obtener_vectorizador() is not None
+
+
+def test_convierte_un_snapshot_antiguo(tmp_path):
+    ruta = str(tmp_path / "catalogo.snapshot")
+    os.makedirs(ruta)  # formato de antes: un directorio normal
+    publicar_version(ruta, 1)
+    assert os.path.islink(ruta)
+    with open(os.path.join(ruta, snapshot.MANIFEST), encoding="utf-8") as f:
+        assert json.load(f) == {"marca": 1}
+
+
+def test_conserva_solo_las_ultimas_versiones(tmp_path):
+    ruta = str(tmp_path / "catalogo.snapshot")
+    for marca in range(1, 6):
+        publicar_version(ruta, marca)
+        os.utime(f"{ruta}.v{marca}", (marca, marca))
+    restantes = sorted(n for n in os.listdir(tmp_path) if n.startswith("catalogo.snapshot.v"))
+    assert len(restantes) == snapshot.VERSIONES_RETENIDAS
+    assert snapshot.resolver(ruta) == os.path.realpath(f"{ruta}.v5")
+
+
+def test_la_ruta_nunca_desaparece(tmp_path):
+    ruta = str(tmp_path / "catalogo.snapshot")
+    publicar_version(ruta, 0)
+    parar = threading.Event()
+    huecos = []
+
+    def lector():
+        while not parar.is_set():
+            if not os.path.exists(os.path.join(ruta, snapshot.MANIFEST)):
+                huecos.append(1)
+
+    hilo = threading.Thread(target=lector)
+    hilo.start()
+    try:
+        for marca in range(1, 60):
+            publicar_version(ruta, marca)
+    finally:
+        parar.set()
+        hilo.join()
+    assert not huecos
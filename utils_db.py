@@ -1,60 +1,260 @@
 # utils_db.py
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
-import nltk
-nltk.download('stopwords')
-from nltk.corpus import stopwords
-
-# Variables globales
-contenido = None
-tfidf_matrix = None
-tfidf_vectorizer = None
+# pandas, sklearn y NLTK se importan dentro de las funciones que los usan:
+# un bot que arranca desde el snapshot no los necesita.
+import hashlib
+import itertools
+import os
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from contextlib import contextmanager
+import numpy as np
+from indice_titulos import IndiceTitulos, normalizar_titulo
+from catalogo import Catalogo, filas_por_codigo
+from stopwords_es import STOPWORDS_ES
+from filtros import CuboFiltros
+import metricas
+import similitud
+
+# Catálogo publicado (ver EstadoCatalogo). Se sustituye entero al recargar:
+# un handler que ya tiene una referencia al estado anterior sigue usándolo.
+estado = None
+tiempos_carga = {}  # {fase: segundos} de la última carga
+GENERACIONES_RETENIDAS = 8
+MAX_CONSULTAS_GENERO = 512  # textos de género distintos que se recuerdan por estado (el texto lo elige el usuario)
+LARGO_GENERACION = 6  # caracteres de la huella que identifican la generación en los callbacks
+_titulos_por_generacion = OrderedDict()  # {generación: TablaTextos} para remapear callbacks antiguos
+_publicaciones = itertools.count(1)  # numera cada publicar() (ver EstadoCatalogo.version)
+Referencia = namedtuple("Referencia", "generacion fila")  # referencia_fila() ya parseada
+
+# Duración de las consultas al catálogo, por función (ver metricas.py)
+CONSULTAS = metricas.Histograma(
+    "cineclass_consulta_catalogo_segundos", "Duración de las consultas al catálogo",
+    ("consulta",), metricas.LIMITES_RAPIDOS
+)
+
+# Nombres antiguos de las variables globales; se leen del estado publicado
+_ATRIBUTOS_ESTADO = ("contenido", "tfidf_matrix", "tfidf_vectorizer", "indice_generos",
+                     "indice_titulos", "tabla_vecinos", "huella")
+
+def __getattr__(nombre):
+    if nombre in _ATRIBUTOS_ESTADO:
+        return getattr(estado, nombre) if estado is not None else None
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+class EstadoCatalogo:
+    """
+    Todo lo que depende de un catálogo concreto: columnas, matriz TF-IDF,
+    índices y tabla de vecinos. Se construye completo antes de publicarse
+    y después no se modifica (salvo cachés internas).
+    """
+
+    def __init__(self, catalogo, matriz, vectorizador, indice, huella_nueva, ruta_snapshot=None, tiempos=None):
+        self.contenido = catalogo
+        self.tfidf_matrix = matriz
+        self.tfidf_vectorizer = vectorizador
+        self.indice_titulos = indice
+        self.huella = huella_nueva
+        # Etiqueta corta para los callback_data (details_{generacion}_{fila})
+        self.generacion = huella_nueva[:LARGO_GENERACION]
+        # Distinta en cada publicación, aunque se vuelva a publicar el mismo catálogo:
+        # clave de las cachés en memoria que dependen del estado (render, "Para ti", orden por nota)
+        self.version = 0
+        self.ruta_snapshot = ruta_snapshot
+        self.tabla_vecinos = None
+        self._filas_por_consulta_genero = OrderedDict()  # {texto en minúsculas: filas}, LRU
+
+        # Índice invertido de géneros y cubo de filtros tipo × plataforma
+        with medir_fase("indices", tiempos):
+            self.indice_generos = construir_indice_generos(catalogo.genero_codigos, catalogo.generos)
+            self.filtros = CuboFiltros(catalogo)
+
+        # Backend de similitud (SIMILITUD_BACKEND); cargar_vecinos le pone delante la tabla precalculada
+        with medir_fase("similitud", tiempos):
+            self.similitud = similitud.backend_desde_entorno(matriz)
+
+    def obtener_vectorizador(self):
+        """El vectorizador multi-campo ajustado; si el catálogo vino de un snapshot, se reconstruye la primera vez"""
+        if self.tfidf_vectorizer is None and self.ruta_snapshot is not None:
+            import snapshot
+            self.tfidf_vectorizer = snapshot.cargar_vectorizador(self.ruta_snapshot)
+        return self.tfidf_vectorizer
+
+@contextmanager
+def medir_fase(fase, tiempos=None):
+    tiempos = tiempos_carga if tiempos is None else tiempos
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tiempos[fase] = tiempos.get(fase, 0.0) + time.perf_counter() - inicio
+
+def obtener_stopwords():
+    """
+    Stopwords en español. Por defecto las incluidas en stopwords_es.py;
+    con STOPWORDS_NLTK=1 se usan las de NLTK (descargándolas si faltan).
+    """
+    if os.getenv("STOPWORDS_NLTK") == "1":
+        try:
+            import nltk
+            from nltk.corpus import stopwords
+            try:
+                return stopwords.words('spanish')
+            except LookupError:
+                nltk.download('stopwords', quiet=True)
+                return stopwords.words('spanish')
+        except Exception as e:
+            print(f"⚠️ No se pudieron cargar las stopwords de NLTK ({e}); uso las incluidas.")
+    return list(STOPWORDS_ES)
+
+def construir_desde_csv(csv_file="movies_clean.csv", tiempos=None, pesos=None):
+    """
+    Lee el CSV y prepara los vectores de contenido y los índices, sin
+    publicarlos. Los vectores combinan título, sinopsis, géneros y
+    plataformas con los pesos de VECTORES_PESOS (ver vectores.py).
+    """
+    import pandas as pd
+    from vectores import VectorizadorMultiCampo
+
+    with medir_fase("lectura", tiempos):
+        df = pd.read_csv(csv_file)
+
+        if df.empty:
+            raise ValueError("El CSV está vacío.")
+
+        # El DataFrame solo se usa para leer el CSV; el bot trabaja con el catálogo columnar
+        catalogo = Catalogo.desde_dataframe(df)
+        del df
+        titulos = list(catalogo.titulos)
+
+    # Vectores multi-campo (TF-IDF de título y sinopsis, one-hot de género y plataforma)
+    with medir_fase("tfidf", tiempos):
+        vectorizador, matriz = VectorizadorMultiCampo.ajustar(catalogo, pesos, obtener_stopwords())
+
+    with medir_fase("indices", tiempos):
+        indice = IndiceTitulos.construir(titulos)
+
+    huella_nueva = calcular_huella(catalogo, vectorizador.descripcion())
+    return EstadoCatalogo(catalogo, matriz, vectorizador, indice, huella_nueva, tiempos=tiempos)
+
+def construir_desde_snapshot(ruta="catalogo.snapshot", tiempos=None):
+    """Abre un snapshot binario con mmap, sin publicarlo"""
+    import snapshot
+
+    # La versión concreta, no el enlace: el vectorizador se lee más tarde de la misma
+    ruta = snapshot.resolver(ruta)
+    with medir_fase("lectura", tiempos):
+        partes = snapshot.cargar_snapshot(ruta)
+    return EstadoCatalogo(*partes, ruta_snapshot=ruta, tiempos=tiempos)
 
 def cargar_contenido(csv_file="movies_clean.csv"):
     """
-    Carga el CSV y prepara la matriz TF-IDF para recomendaciones.
-    Solo usa el título para TF-IDF, ya que el CSV actual no tiene géneros.
+    Carga el CSV y prepara los vectores de contenido para recomendaciones.
     """
-    global contenido, tfidf_matrix, tfidf_vectorizer
+    tiempos_carga.clear()
+    publicar(construir_desde_csv(csv_file))
 
-    contenido = pd.read_csv(csv_file)
+    print(f"✅ Contenido cargado y matriz TF-IDF lista. Total registros: {len(estado.contenido)}")
+    return estado.contenido, estado.tfidf_matrix
 
-    if contenido.empty:
-        raise ValueError("El CSV está vacío.")
+def cargar_snapshot(ruta="catalogo.snapshot"):
+    """
+    Carga el catálogo desde un snapshot binario (python precomputar.py snapshot).
+    Los arrays se abren con mmap: no se parsea el CSV ni se reentrena el TF-IDF.
+    """
+    tiempos_carga.clear()
+    publicar(construir_desde_snapshot(ruta))
 
-    # Creamos 'overview' solo con el título
-    contenido['overview'] = contenido['title'].astype(str)
+    print(f"✅ Snapshot {ruta} cargado. Total registros: {len(estado.contenido)}")
+    return estado.contenido, estado.tfidf_matrix
 
-    # Vectorización TF-IDF
-    tfidf_vectorizer = TfidfVectorizer(stop_words=stopwords.words('spanish'))
-    tfidf_matrix = tfidf_vectorizer.fit_transform(contenido['overview'])
+def guardar_snapshot(ruta="catalogo.snapshot"):
+    """Guarda el catálogo cargado como snapshot binario"""
+    import snapshot
 
-    print(f"✅ Contenido cargado y matriz TF-IDF lista. Total registros: {len(contenido)}")
-    return contenido, tfidf_matrix
+    actual = estado_actual()
+    snapshot.guardar_snapshot(ruta, actual.contenido, actual.tfidf_matrix, actual.obtener_vectorizador(),
+                              actual.indice_titulos, actual.huella)
 
-def recomendar_contenido(nombre, top_n=5):
+def obtener_vectorizador():
+    return estado_actual().obtener_vectorizador()
+
+def publicar(nuevo):
     """
-    Devuelve una lista de recomendaciones basadas en el título ingresado.
+    Sustituye el catálogo publicado por `nuevo` con una sola asignación.
+    Los títulos de la generación se guardan para remapear callbacks antiguos.
     """
-    if contenido is None or tfidf_matrix is None:
+    global estado
+    nuevo.version = next(_publicaciones)
+    _titulos_por_generacion[nuevo.generacion] = nuevo.contenido.titulos
+    _titulos_por_generacion.move_to_end(nuevo.generacion)
+    while len(_titulos_por_generacion) > GENERACIONES_RETENIDAS:
+        _titulos_por_generacion.popitem(last=False)
+    estado = nuevo
+
+def estado_actual():
+    if estado is None:
         raise ValueError("Primero debes cargar el contenido usando cargar_contenido()")
+    return estado
 
-    nombre = nombre.lower()
-    matches = contenido[contenido['title'].str.lower().str.contains(nombre)]
+def referencia_fila(fila, actual=None):
+    """Referencia estable a una fila para callback_data: '{generacion}_{fila}'"""
+    return f"{(actual or estado_actual()).generacion}_{fila}"
 
-    if matches.empty:
-        return []
+def parsear_referencia(texto):
+    """Referencia(generacion, fila) a partir de '{generacion}_{fila}' o '{fila}'; ValueError si no es válida"""
+    generacion, _, fila = texto.rpartition('_')
+    return Referencia(generacion, int(fila))
+
+def resolver_referencia(ref, actual=None):
+    """
+    Traduce una referencia de referencia_fila() (texto o Referencia ya
+    parseada) a una fila del catálogo `actual`. Si es de una generación
+    anterior se busca el mismo título; devuelve None si ya no existe o la
+    generación es desconocida. Las referencias antiguas sin generación
+    ('{fila}') se leen tal cual.
+    """
+    actual = actual or estado_actual()
+    generacion, fila = parsear_referencia(ref) if isinstance(ref, str) else ref
+    if not generacion or generacion == actual.generacion:
+        return fila if 0 <= fila < len(actual.contenido) else None
+
+    titulos = _titulos_por_generacion.get(generacion)
+    if titulos is None or not 0 <= fila < len(titulos):
+        return None
+    return fila_por_titulo(titulos[fila], actual)
 
-    # Tomamos el primer match
-    idx = matches.index[0]
+@metricas.medir(CONSULTAS)
+def recomendar_por_indice(idx, top_n=5, actual=None):
+    """
+    Devuelve las filas de los top_n títulos más parecidos a la fila idx,
+    de más a menos parecido, según el backend de similitud del estado
+    (tabla de vecinos si está cargada, y si no el de SIMILITUD_BACKEND).
+    """
+    return (actual or estado_actual()).similitud.vecinos(idx, top_n)
 
-    cosine_similarities = linear_kernel(tfidf_matrix[idx], tfidf_matrix).flatten()
-    related_indices = cosine_similarities.argsort()[-top_n-1:-1][::-1]
+@metricas.medir(CONSULTAS)
+def fila_por_titulo(titulo, actual=None):
+    """Primera fila con ese título exacto, o None si no existe (búsqueda en el índice, sin recorrer el catálogo)"""
+    actual = actual or estado_actual()
+    for fila in actual.indice_titulos.exactos(normalizar_titulo(titulo)):
+        if actual.contenido.titulos[fila] == titulo:
+            return int(fila)
+    return None
 
+def recomendar_contenido(nombre, top_n=5):
+    """
+    Devuelve una lista de recomendaciones basadas en el título ingresado.
+    """
+    actual = estado_actual()
+    matches = buscar_titulos(nombre, limite=1, actual=actual)
+
+    if not matches:
+        return []
+
+    # Tomamos el mejor match
     recomendaciones = []
-    for i in related_indices:
-        row = contenido.iloc[i]
+    for i in recomendar_por_indice(matches[0], top_n, actual):
+        row = actual.contenido[i]
         recomendaciones.append({
             "title": row['title'],
             "type": row['type'],
@@ -62,3 +262,106 @@ def recomendar_contenido(nombre, top_n=5):
         })
 
     return recomendaciones
+
+def calcular_huella(catalogo, config_vectores=""):
+    """
+    Hash de todas las columnas que se vectorizan o se muestran (título,
+    sinopsis, año, nota, tipo, género y plataforma) y de la configuración de
+    los vectores; identifica a qué catálogo corresponde una tabla precalculada
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for tabla in (catalogo.titulos, catalogo.overviews):
+        h.update(tabla.offsets.tobytes())
+        h.update(tabla.datos.tobytes())
+    for columna in (catalogo.years, catalogo.ratings):
+        h.update(np.ascontiguousarray(columna).tobytes())
+    for codigos, categorias in ((catalogo.tipo_codigos, catalogo.tipos),
+                                (catalogo.genero_codigos, catalogo.generos),
+                                (catalogo.plataforma_codigos, catalogo.plataformas)):
+        h.update(np.ascontiguousarray(codigos).tobytes())
+        h.update("\x1f".join(categorias).encode("utf-8"))
+        h.update(b"\x1e")
+    h.update(config_vectores.encode("utf-8"))
+    return h.hexdigest()
+
+def huella_catalogo():
+    return estado_actual().huella
+
+def cargar_vecinos(ruta="vecinos.npz", actual=None):
+    """
+    Carga la tabla de vecinos generada por `python precomputar.py vecinos`.
+    Si falta o corresponde a otro catálogo, se sigue calculando al vuelo.
+    """
+    actual = actual or estado_actual()
+
+    if not os.path.exists(ruta):
+        print(f"⚠️ No existe {ruta}; las similitudes se calcularán al vuelo.")
+        return None
+
+    with np.load(ruta, allow_pickle=False) as datos:
+        if str(datos['huella']) != actual.huella:
+            print(f"⚠️ {ruta} corresponde a otro catálogo; vuelve a ejecutar precomputar.py vecinos.")
+            return None
+        tabla_vecinos = actual.tabla_vecinos = datos['vecinos']
+
+    respaldo = actual.similitud.respaldo if isinstance(actual.similitud, similitud.BackendTabla) else actual.similitud
+    actual.similitud = similitud.BackendTabla(tabla_vecinos, respaldo)
+
+    print(f"✅ Tabla de vecinos cargada: top-{tabla_vecinos.shape[1]} para {tabla_vecinos.shape[0]} títulos")
+    return tabla_vecinos
+
+@metricas.medir(CONSULTAS)
+def buscar_titulos(texto, limite=10, actual=None):
+    """Filas cuyo título coincide con el texto, de mejor a peor coincidencia"""
+    return (actual or estado_actual()).indice_titulos.buscar(texto, limite=limite)
+
+@metricas.medir(CONSULTAS)
+def filtrar_filas(tipo='all', plataforma='all', actual=None, anio_min=None, anio_max=None, nota_min=None):
+    """
+    Filas que cumplen el tipo exacto y cuya plataforma contiene el texto dado,
+    opcionalmente entre dos años y con una nota mínima. Se leen del cubo de
+    filtros precalculado (ver filtros.py); el array es de solo lectura.
+    """
+    return (actual or estado_actual()).filtros.filas(tipo, plataforma, anio_min, anio_max, nota_min)
+
+# -------------------
+# Índice de géneros
+# -------------------
+def construir_indice_generos(codigos, categorias):
+    """
+    Parte cada combinación distinta de 'genre' (separada por comas) una sola
+    vez y devuelve {género: array ordenado de filas}.
+    """
+    partes = defaultdict(list)
+    for filas, valor in zip(filas_por_codigo(codigos, len(categorias)), categorias):
+        for genero in valor.split(','):
+            genero = genero.strip()
+            if genero:
+                partes[genero].append(filas)
+    return {genero: np.sort(np.concatenate(listas)) for genero, listas in partes.items()}
+
+@metricas.medir(CONSULTAS)
+def filas_por_genero(genero, actual=None):
+    """
+    Filas cuyo género contiene el texto dado, sin distinguir mayúsculas
+    (igual que el antiguo str.contains: "Acción" incluye "Acción y Aventura").
+    """
+    actual = actual or estado_actual()
+
+    clave = genero.lower()
+    memo = actual._filas_por_consulta_genero
+    filas = memo.get(clave)
+    if filas is not None:
+        memo.move_to_end(clave)
+    else:
+        partes = [ids for nombre, ids in actual.indice_generos.items() if clave in nombre.lower()]
+        if not partes:
+            filas = np.empty(0, dtype=np.int32)
+        elif len(partes) == 1:
+            filas = partes[0]
+        else:
+            filas = np.unique(np.concatenate(partes))
+        memo[clave] = filas
+        if len(memo) > MAX_CONSULTAS_GENERO:
+            memo.popitem(last=False)
+    return filas
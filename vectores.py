@@ -0,0 +1,163 @@
+# vectores.py
+"""
+Vectores de contenido multi-campo para las similitudes.
+
+Cada título se representa con varios bloques dispersos concatenados:
+- TF-IDF del título y TF-IDF de la sinopsis
+- one-hot de sus géneros y de sus plataformas
+
+Cada bloque se normaliza por fila y se escala por la raíz de su peso, así
+el producto escalar de dos filas es la suma ponderada de los cosenos de
+cada bloque. Al final se normaliza la fila entera: el producto sigue
+siendo el coseno, como espera el resto del bot.
+"""
+import os
+import numpy as np
+from catalogo import TablaTextos
+
+CAMPOS_TEXTO = ("titulo", "sinopsis")
+CAMPOS_CATEGORICOS = ("genero", "plataforma")
+PESOS_POR_DEFECTO = {"titulo": 1.0, "sinopsis": 0.5, "genero": 0.6, "plataforma": 0.1}
+
+# Valores de relleno que no deben hacer parecidos a dos títulos
+SIN_VALOR = {"", "N/A", "Sin descripción", "Sin género", "Desconocida"}
+
+
+def leer_pesos(texto=None):
+    """
+    Pesos de los bloques desde 'titulo:1,sinopsis:0.5,...' (por defecto la
+    variable VECTORES_PESOS). Los campos que no aparecen mantienen su peso
+    por defecto; un peso 0 quita el bloque.
+    """
+    texto = os.getenv("VECTORES_PESOS", "") if texto is None else texto
+    pesos = dict(PESOS_POR_DEFECTO)
+    for parte in texto.split(","):
+        if not parte.strip():
+            continue
+        campo, _, valor = parte.partition(":")
+        campo = campo.strip()
+        if campo not in pesos:
+            raise ValueError(f"Campo de VECTORES_PESOS desconocido: {campo!r} (válidos: {', '.join(pesos)})")
+        pesos[campo] = float(valor)
+    return pesos
+
+def partir_valores(valor):
+    """'Acción, Drama' → ['Acción', 'Drama'] sin valores de relleno"""
+    return [p.strip() for p in valor.split(",") if p.strip() not in SIN_VALOR]
+
+def _textos(catalogo, campo):
+    tabla = catalogo.titulos if campo == "titulo" else catalogo.overviews
+    return ["" if t in SIN_VALOR else t for t in tabla]
+
+def _categorias(catalogo, campo):
+    if campo == "genero":
+        return catalogo.genero_codigos, catalogo.generos
+    return catalogo.plataforma_codigos, catalogo.plataformas
+
+def _bloque_one_hot(codigos, categorias, vocabulario):
+    """
+    Bloque (filas, len(vocabulario)) normalizado por fila. Se construye una
+    fila por categoría distinta y después se indexa por código.
+    """
+    from scipy.sparse import csr_matrix
+
+    posiciones = {valor: i for i, valor in enumerate(vocabulario)}
+    indptr, indices, datos = [0], [], []
+    for valor in categorias:
+        columnas = sorted({posiciones[v] for v in partir_valores(valor) if v in posiciones})
+        indices.extend(columnas)
+        if columnas:
+            datos.extend([1.0 / np.sqrt(len(columnas))] * len(columnas))
+        indptr.append(len(indices))
+    por_categoria = csr_matrix(
+        (np.asarray(datos, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+        shape=(len(categorias), len(vocabulario))
+    )
+    return por_categoria[np.asarray(codigos, dtype=np.intp)]
+
+
+class VectorizadorMultiCampo:
+    """Vocabularios e idf ajustados de cada bloque, para transformar un catálogo"""
+
+    def __init__(self, pesos, tfidf, vocabularios):
+        self.pesos = pesos
+        self.tfidf = tfidf  # {campo de texto: TfidfVectorizer ajustado}
+        self.vocabularios = vocabularios  # {campo categórico: [valores]}
+
+    @classmethod
+    def ajustar(cls, catalogo, pesos=None, stop_words=None):
+        """Ajusta los bloques sobre el catálogo y devuelve (vectorizador, matriz)"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        pesos = pesos or leer_pesos()
+        tfidf = {}
+        for campo in CAMPOS_TEXTO:
+            if pesos[campo] <= 0:
+                continue
+            vectorizador = TfidfVectorizer(stop_words=stop_words, dtype=np.float32)
+            try:
+                vectorizador.fit(_textos(catalogo, campo))
+            except ValueError:
+                # Vocabulario vacío (p. ej. un CSV sin sinopsis): el bloque no aporta nada
+                continue
+            tfidf[campo] = vectorizador
+
+        vocabularios = {}
+        for campo in CAMPOS_CATEGORICOS:
+            if pesos[campo] <= 0:
+                continue
+            _, categorias = _categorias(catalogo, campo)
+            vocabularios[campo] = sorted({v for valor in categorias for v in partir_valores(valor)})
+
+        vectorizador = cls(pesos, tfidf, vocabularios)
+        return vectorizador, vectorizador.transformar(catalogo)
+
+    def transformar(self, catalogo):
+        from scipy.sparse import hstack
+        from sklearn.preprocessing import normalize
+
+        bloques = []
+        for campo in CAMPOS_TEXTO:
+            if campo in self.tfidf:
+                bloques.append(self.tfidf[campo].transform(_textos(catalogo, campo)) * np.sqrt(self.pesos[campo]))
+        for campo in CAMPOS_CATEGORICOS:
+            if campo in self.vocabularios:
+                codigos, categorias = _categorias(catalogo, campo)
+                bloque = _bloque_one_hot(codigos, categorias, self.vocabularios[campo])
+                bloques.append(bloque * np.sqrt(self.pesos[campo]))
+
+        matriz = hstack(bloques, format="csr", dtype=np.float32)
+        return normalize(matriz, norm="l2", copy=False)
+
+    def descripcion(self):
+        """Identifica la configuración (entra en la huella del catálogo)"""
+        return ",".join(f"{campo}:{peso:g}" for campo, peso in self.pesos.items())
+
+    # -------------------
+    # Snapshot
+    # -------------------
+    def arrays(self):
+        arrays = {}
+        for campo, vectorizador in self.tfidf.items():
+            vocabulario = TablaTextos.desde_lista(vectorizador.get_feature_names_out())
+            arrays[f"{campo}_vocabulario_datos"] = vocabulario.datos
+            arrays[f"{campo}_vocabulario_offsets"] = vocabulario.offsets
+            arrays[f"{campo}_idf"] = vectorizador.idf_
+        return arrays
+
+    def metadatos(self):
+        return {"pesos": self.pesos, "campos_tfidf": list(self.tfidf), "vocabularios": self.vocabularios}
+
+    @classmethod
+    def desde_arrays(cls, arrays, metadatos):
+        """Vectorizador ya ajustado a partir de vocabulario + idf, sin volver a entrenar"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        tfidf = {}
+        for campo in metadatos["campos_tfidf"]:
+            vocabulario = TablaTextos(arrays[f"{campo}_vocabulario_datos"], arrays[f"{campo}_vocabulario_offsets"])
+            vectorizador = TfidfVectorizer(vocabulary={termino: i for i, termino in enumerate(vocabulario)},
+                                           dtype=np.float32)
+            vectorizador.idf_ = np.asarray(arrays[f"{campo}_idf"])
+            tfidf[campo] = vectorizador
+        return cls(metadatos["pesos"], tfidf, metadatos["vocabularios"])
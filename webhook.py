@@ -0,0 +1,234 @@
+# webhook.py
+"""
+Modo webhook con varios procesos.
+
+Un proceso frontal recibe los POST de Telegram en un servidor HTTP asyncio
+mínimo (sin dependencias extra) y reparte cada update a uno de N procesos
+worker según el usuario (user_id % N). Así cada usuario cae siempre en el
+mismo worker: sus updates llegan en orden y su user_data vive en un solo
+proceso. Cada worker corre su propia Application de python-telegram-bot y
+abre el snapshot del catálogo con mmap, de modo que todos comparten las
+mismas páginas en memoria en lugar de cargar una copia cada uno.
+
+Parada ordenada con SIGTERM/SIGINT: se deja de aceptar conexiones, cada
+worker termina los updates que tenía en cola, ejecuta post_shutdown
+(volcado del historial) y sale.
+
+GET /salud devuelve los workers listos y los updates pendientes de cada uno.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+MAX_CUERPO = 1 << 20  # Telegram no manda updates de más de unos pocos KB
+
+
+def usuario_de(update):
+    """user_id (o chat_id) del update para repartirlo; update_id si no tiene ninguno"""
+    for valor in update.values():
+        if isinstance(valor, dict):
+            if isinstance(valor.get("from"), dict):
+                return valor["from"]["id"]
+            if isinstance(valor.get("chat"), dict):
+                return valor["chat"]["id"]
+    return update.get("update_id", 0)
+
+
+# -------------------
+# Worker
+# -------------------
+def _worker(construir_app, indice, cola, listos):
+    # Ctrl+C y un SIGTERM al grupo de procesos (systemd, docker stop...) llegan
+    # también a los workers: la parada la coordina el frontal, que les deja
+    # vaciar su cola y volcar el historial antes de salir
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    # Para lo que deba ser distinto en cada worker (p. ej. el puerto de las métricas)
+    os.environ["WEBHOOK_WORKER"] = str(indice)
+    app = construir_app()
+    asyncio.run(_procesar(app, indice, cola, listos))
+
+def _siguiente(cola, espera=1.0):
+    """Siguiente update de la cola; None si el frontal lo pide o ya no existe"""
+    frontal = multiprocessing.parent_process()
+    while True:
+        try:
+            return cola.get(timeout=espera)
+        except queue.Empty:
+            # Sin frontal nadie mandará el aviso de parada (y SIGTERM se ignora)
+            if frontal is not None and not frontal.is_alive():
+                return None
+
+async def _procesar(app, indice, cola, listos):
+    from telegram import Update
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    with listos.get_lock():
+        listos.value += 1
+    logging.info("Worker %d listo (pid %d)", indice, os.getpid())
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            datos = await loop.run_in_executor(None, _siguiente, cola)
+            if datos is None:
+                break
+            try:
+                update = Update.de_json(json.loads(datos), app.bot)
+            except Exception:
+                logging.exception("Update inválido descartado en el worker %d", indice)
+                continue
+            await app.update_queue.put(update)
+    finally:
+        # stop() procesa antes los updates que quedan en la cola
+        await app.stop()
+        if app.post_stop:
+            await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+        logging.info("Worker %d detenido", indice)
+
+
+# -------------------
+# Frontal HTTP
+# -------------------
+class Frontal:
+    def __init__(self, colas, listos, ruta="/webhook", secreto=None):
+        self.colas = colas
+        self.listos = listos
+        self.ruta = ruta
+        self.secreto = secreto
+        self.recibidos = 0
+        self.rechazados = 0
+
+    async def atender(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                metodo, ruta, _ = linea.decode("latin-1").split(" ", 2)
+                cabeceras = {}
+                while True:
+                    linea = await reader.readline()
+                    if linea in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+                largo = int(cabeceras.get("content-length", "0"))
+                if largo > MAX_CUERPO:
+                    await self._responder(writer, 413, b"demasiado grande", cerrar=True)
+                    break
+                cuerpo = await reader.readexactly(largo) if largo else b""
+
+                codigo, respuesta = self._despachar(metodo, ruta, cabeceras, cuerpo)
+                cerrar = cabeceras.get("connection", "").lower() == "close"
+                await self._responder(writer, codigo, respuesta, cerrar)
+                if cerrar:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _despachar(self, metodo, ruta, cabeceras, cuerpo):
+        if metodo == "GET" and ruta == "/salud":
+            estado = {
+                "workers": len(self.colas),
+                "listos": self.listos.value,
+                "recibidos": self.recibidos,
+                "pendientes": [cola.qsize() for cola in self.colas],
+            }
+            return 200, json.dumps(estado).encode()
+        if metodo != "POST" or ruta != self.ruta:
+            return 404, b"no encontrado"
+        if self.secreto and cabeceras.get("x-telegram-bot-api-secret-token") != self.secreto:
+            self.rechazados += 1
+            return 403, b"prohibido"
+        try:
+            update = json.loads(cuerpo)
+            worker = int(usuario_de(update)) % len(self.colas)
+        except (ValueError, TypeError, KeyError):
+            return 400, b"update invalido"
+        # Se responde 200 enseguida: Telegram no espera a que se procese
+        self.colas[worker].put(cuerpo)
+        self.recibidos += 1
+        return 200, b"ok"
+
+    @staticmethod
+    async def _responder(writer, codigo, cuerpo, cerrar=False):
+        motivos = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 413: "Payload Too Large"}
+        cabecera = (f"HTTP/1.1 {codigo} {motivos.get(codigo, '')}\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\n"
+                    f"Connection: {'close' if cerrar else 'keep-alive'}\r\n\r\n")
+        writer.write(cabecera.encode("latin-1") + cuerpo)
+        await writer.drain()
+
+
+async def _registrar_webhook(token, url, secreto, base_url=None):
+    from telegram import Bot, Update
+
+    opciones = {"base_url": base_url} if base_url else {}
+    async with Bot(token, **opciones) as bot:
+        await bot.set_webhook(url, secret_token=secreto, allowed_updates=Update.ALL_TYPES)
+    logging.info("Webhook registrado en %s", url)
+
+async def _servir(frontal, host, puerto):
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(senal, parar.set)
+
+    servidor = await asyncio.start_server(frontal.atender, host, puerto, backlog=1024)
+    print(f"🌐 Webhook escuchando en http://{host}:{puerto}{frontal.ruta} con {len(frontal.colas)} workers",
+          flush=True)
+    async with servidor:
+        await parar.wait()
+    logging.info("Parando: %d updates recibidos", frontal.recibidos)
+
+def ejecutar(construir_app, workers=None, host="0.0.0.0", puerto=8443, ruta="/webhook",
+             secreto=None, url=None, token=None, base_url=None, espera_cierre=30.0):
+    """
+    Arranca `workers` procesos (por defecto uno por núcleo) que ejecutan
+    construir_app() y el frontal HTTP en este proceso. Bloquea hasta SIGTERM/SIGINT.
+    Si se da `url`, registra el webhook en Telegram con setWebhook.
+    """
+    workers = workers or os.cpu_count() or 1
+    # spawn: cada worker importa el bot desde cero (sin hilos heredados del frontal)
+    ctx = multiprocessing.get_context("spawn")
+    listos = ctx.Value("i", 0)
+    colas = [ctx.Queue() for _ in range(workers)]
+    procesos = [
+        ctx.Process(target=_worker, args=(construir_app, i, colas[i], listos), name=f"worker-{i}")
+        for i in range(workers)
+    ]
+    for proceso in procesos:
+        proceso.start()
+
+    if url:
+        asyncio.run(_registrar_webhook(token, url, secreto, base_url))
+
+    frontal = Frontal(colas, listos, ruta, secreto)
+    try:
+        asyncio.run(_servir(frontal, host, puerto))
+    finally:
+        # Cada worker vacía su cola antes de recibir el aviso de parada
+        for cola in colas:
+            cola.put(None)
+        limite = time.monotonic() + espera_cierre
+        for proceso in procesos:
+            proceso.join(max(0.0, limite - time.monotonic()))
+            if proceso.is_alive():
+                logging.warning("%s no terminó en %.0fs: se fuerza la salida", proceso.name, espera_cierre)
+                proceso.kill()  # ignoran SIGTERM, así que terminate() no bastaría
+                proceso.join()
+        print("👋 Webhook detenido", flush=True)